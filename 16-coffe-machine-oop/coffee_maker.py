@@ -1,3 +1,6 @@
+import metrics
+
+
 class CoffeeMaker:
     """Models the machine that makes the coffee"""
     def __init__(self):
@@ -19,11 +22,15 @@ class CoffeeMaker:
         for item in drink.ingredients:
             if drink.ingredients[item] > self.resources[item]:
                 print(f"Sorry there is not enough {item}.")
+                metrics.STOCKOUTS.inc(item)
                 can_make = False
+        if not can_make:
+            metrics.DRINKS_REFUSED.inc(drink.name, "resources")
         return can_make
 
     def make_coffee(self, order):
         """Deducts the required ingredients from the resources."""
         for item in order.ingredients:
             self.resources[item] -= order.ingredients[item]
+        metrics.DRINKS_SERVED.inc(order.name)
         print(f"Here is your {order.name} ☕️. Enjoy!")
@@ -0,0 +1,269 @@
+"""
+Which drinks the coffee machine should still make with what is left in it.
+
+main.py only checks the order in front of it: is_resource_sufficient() compares one drink with
+the resources. Whether 2 of each drink can still be made, or which drinks to make with the
+remaining stock to earn the most, isn't answered anywhere. DrinkOptimizer answers both:
+  - shortfall() and can_make() check a whole order with one matrix product of the recipes,
+  - best_mix() finds the most valuable mix of drinks for the stock, optionally with a cap on
+    some drinks (the expected demand) and other values than the price (the margin).
+It works with the Menu of this folder and with the MENU dict of 15-coffe-machine.
+"""
+
+from collections import namedtuple
+import time
+
+import numpy as np
+
+Mix = namedtuple("Mix", ["counts", "value", "optimal", "bound"])
+Recipe = namedtuple("Recipe", ["name", "ingredients", "cost"])
+
+# Most simplex pivots (and bound flips) used to price the ingredients in DrinkOptimizer.best_mix()
+LP_ITERATIONS = 1000
+
+
+def _number(value):
+    """A NumPy amount as a plain int when it is whole, else a float."""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+class DrinkOptimizer:
+    """Finds the most valuable mix of drinks the resources can still make.
+
+    Which drinks to make with the remaining stock is a bounded knapsack with one constraint per
+    ingredient (an integer linear program), solved by branch and bound:
+      - the LP relaxation (fractional servings allowed) is solved with a small simplex: its duals
+        price every ingredient, and stock * prices + sum of the positive (value - price of the
+        recipe) * max servings is the LP value, an upper bound of the best mix,
+      - the drinks are sorted by value per price of their recipe. The greedy mix in that order,
+        and the LP servings rounded down then topped up in that order, are the first solutions.
+        Rounding down loses less than one serving of each fractional drink, and the LP has at
+        most one of those per ingredient,
+      - the search tries the largest possible count of each drink first and cuts a branch when its
+        value plus the same bound for the remaining drinks and stock isn't better. With suffix sums
+        that bound costs O(1) per branch.
+    A time limit keeps the answer within a few milliseconds even with hundreds of drinks: the
+    best mix found so far is returned with optimal=False, and bound tells how far it can be from
+    the best one. With 300 drinks and 20 ingredients that is about 1% after 5ms.
+    """
+
+    def __init__(self, items, values=None):
+        self.items = list(items)
+        self.ingredients = sorted({ingredient for item in self.items for ingredient in item.ingredients})
+        self.needs = np.array([[item.ingredients.get(ingredient, 0) for ingredient in self.ingredients]
+                               for item in self.items], dtype=float).reshape(len(self.items), len(self.ingredients))
+        self.values = np.array([(values or {}).get(item.name, item.cost) for item in self.items], dtype=float)
+        self.positions = {item.name: i for i, item in enumerate(self.items)}
+        # (ingredient position, amount) of every recipe, for the loops of the search
+        self.recipes = [[(j, need) for j, need in enumerate(row) if need > 0] for row in self.needs.tolist()]
+
+    @classmethod
+    def from_menu(cls, menu, values=None):
+        """Optimizer for the items of a Menu."""
+        return cls(menu.menu, values)
+
+    @classmethod
+    def from_dict(cls, menu, values=None):
+        """Optimizer for a MENU dict like the one of 15-coffe-machine/main.py."""
+        return cls([Recipe(name, drink["ingredients"], drink["cost"]) for name, drink in menu.items()], values)
+
+    def _stock(self, resources):
+        return np.array([resources.get(ingredient, 0) for ingredient in self.ingredients], dtype=float)
+
+    def shortfall(self, resources, counts):
+        """Returns what is missing of every ingredient to make counts (a {drink: count} dict,
+        or one number for that many of each drink). Empty when the order can be made."""
+        if isinstance(counts, dict):
+            vector = np.zeros(len(self.items))
+            for name, count in counts.items():
+                vector[self.positions[name]] = count
+        else:
+            vector = np.full(len(self.items), counts, dtype=float)
+        missing = vector @ self.needs - self._stock(resources)
+        return {self.ingredients[j]: _number(missing[j]) for j in np.flatnonzero(missing > 0)}
+
+    def can_make(self, resources, counts):
+        """Returns True when the resources are enough for counts (see shortfall())."""
+        return not self.shortfall(resources, counts)
+
+    def max_servings(self, resources, name):
+        """Returns how many of one drink the resources can make."""
+        need = self.needs[self.positions[name]]
+        used = need > 0
+        return int((self._stock(resources)[used] // need[used]).min()) if used.any() else 0
+
+    @staticmethod
+    def _relaxation(needs, values, uppers, stock, deadline):
+        """Returns (servings, prices, bound) of the LP relaxation of the mix, where drinks can be
+        made in fractions: its servings, the ingredient prices (the duals) and the upper bound of
+        the best mix they give.
+
+        A bounded-variable simplex on the tableau of the ingredient rows: the servings start at 0
+        with the slacks (unused stock) as basis, and a serving that enters moves towards its upper
+        bound, which may make it flip there without a pivot. Whatever basis it stops at (time
+        limit, iteration cap), any non-negative prices p give the Lagrangian bound
+        p.stock + sum of the positive (value - p.recipe) * max servings, so the bound is valid;
+        at the LP optimum it equals the LP value.
+        """
+        m, n = needs.shape[1], needs.shape[0]
+        tableau = np.hstack([needs.T, np.eye(m)])
+        costs = np.concatenate([values, np.zeros(m)])
+        upper = np.concatenate([uppers, np.full(m, np.inf)])
+        reduced = costs.copy()  # value - prices . column, with the slacks as basis the prices are 0
+        basis = np.arange(n, n + m)
+        basic = stock.astype(float)
+        at_upper = np.zeros(n + m, dtype=bool)
+        for iteration in range(LP_ITERATIONS):
+            gains = np.where(at_upper, -reduced, reduced)
+            entering = int(np.argmax(gains))
+            if gains[entering] <= 1e-9 or (iteration % 16 == 15 and time.perf_counter() > deadline):
+                break
+            direction = -1.0 if at_upper[entering] else 1.0
+            column = direction * tableau[:, entering]
+            # How far the entering serving can move before a basic variable hits one of its bounds
+            limits = np.full(m, np.inf)
+            down, up = column > 1e-12, column < -1e-12
+            limits[down] = basic[down] / column[down]
+            limits[up] = (upper[basis[up]] - basic[up]) / -column[up]
+            row = int(np.argmin(limits))
+            step = limits[row]
+            if upper[entering] <= step:
+                # The entering serving reaches its own bound first: it flips, the basis stays
+                basic -= upper[entering] * column
+                at_upper[entering] = not at_upper[entering]
+                continue
+            basic -= step * column
+            leaving = basis[row]
+            at_upper[leaving] = column[row] < 0
+            value = (upper[entering] if at_upper[entering] else 0.0) + direction * step
+            at_upper[entering] = False
+            pivot = tableau[row] / tableau[row, entering]
+            tableau -= np.outer(tableau[:, entering], pivot)
+            tableau[row] = pivot
+            reduced -= reduced[entering] * pivot
+            basis[row], basic[row] = entering, value
+            np.maximum(basic, 0.0, out=basic)
+
+        servings = np.where(at_upper[:n], uppers, 0.0)
+        in_basis = basis < n
+        servings[basis[in_basis]] = basic[in_basis]
+        prices = np.maximum(0.0, costs[basis] @ tableau[:, n:])
+        bound = prices @ stock + np.maximum(0.0, values - needs @ prices) @ uppers
+        return servings, prices, bound
+
+    def best_mix(self, resources, limits=None, values=None, time_limit=0.005):
+        """Returns the Mix (counts, value, optimal, bound) of the most valuable drinks the resources
+        make. bound is an upper bound of the best value (equal to value when optimal).
+
+        limits caps the count of some drinks (e.g. the expected demand of the day) and values
+        replaces their cost as what is maximized (e.g. margin or demand-weighted revenue).
+        """
+        deadline = time.perf_counter() + time_limit
+        stock = self._stock(resources)
+        all_values = self.values.copy()
+        for name, value in (values or {}).items():
+            all_values[self.positions[name]] = value
+        with np.errstate(divide="ignore", invalid="ignore"):
+            uppers = np.where(self.needs > 0, stock / self.needs, np.inf).min(axis=1, initial=np.inf)
+        for name, limit in (limits or {}).items():
+            uppers[self.positions[name]] = min(uppers[self.positions[name]], limit)
+        if np.isinf(uppers).any():
+            raise ValueError(f"{self.items[int(np.argmax(np.isinf(uppers)))].name!r} needs no ingredient, give it a limit")
+
+        # Drinks worth making, with their upper bound of servings
+        keep = np.flatnonzero((np.floor(uppers) > 0) & (all_values > 0))
+        needs, values, uppers = self.needs[keep], all_values[keep], np.floor(uppers[keep])
+        recipes = [self.recipes[i] for i in keep]
+        uppers_list, values_list = uppers.tolist(), values.tolist()
+        stock_list = stock.tolist()
+
+        def greedy(order, planned=()):
+            """Makes the planned (drink, count) first, then as many as it can of each drink in order."""
+            remaining, counts, total = list(stock_list), {}, 0.0
+            for i, wanted in list(planned) + [(i, uppers_list[i]) for i in order]:
+                count = min([wanted - counts.get(i, 0)] + [remaining[j] // need for j, need in recipes[i]])
+                if count > 0:
+                    counts[i] = counts.get(i, 0) + count
+                    total += count * values_list[i]
+                    for j, need in recipes[i]:
+                        remaining[j] -= count * need
+            return total, counts
+
+        # A first mix from the value per share of the stock, then the LP prices and the mixes they
+        # give: in price order, and the LP servings rounded down, topped up in price order
+        with np.errstate(divide="ignore"):
+            shares = needs @ np.where(stock > 0, 1 / stock, 0.0)
+        first = greedy(np.argsort(-values / shares, kind="stable").tolist())
+        servings, prices, root_bound = self._relaxation(needs, values, uppers, stock, deadline)
+        with np.errstate(divide="ignore"):
+            order = np.argsort(-values / (needs @ prices), kind="stable")
+        second = greedy(order.tolist())
+        rounded = np.floor(servings + 1e-9)
+        third = greedy(order.tolist(), [(int(i), rounded[i]) for i in np.flatnonzero(rounded > 0)])
+        best_value, best_counts = max(first, second, third, key=lambda mix: mix[0])
+
+        # Branch and bound in price order, from the best greedy mix
+        order = order.tolist()
+        costs = (needs @ prices)[order].tolist()
+        gains = np.maximum(0.0, values - needs @ prices)[order] * uppers[order]
+        suffix = np.concatenate([np.cumsum(gains[::-1])[::-1], [0.0]]).tolist()
+        best = {"value": best_value, "counts": best_counts, "optimal": True, "nodes": 0}
+        counts = {}
+
+        def search(depth, remaining, value, priced_stock):
+            if value > best["value"] + 1e-9:
+                best["value"], best["counts"] = value, dict(counts)
+            if depth == len(order) or value + priced_stock + suffix[depth] <= best["value"] + 1e-9:
+                return
+            best["nodes"] += 1
+            if best["nodes"] % 16 == 0 and time.perf_counter() > deadline:
+                best["optimal"] = False
+            i = order[depth]
+            most = int(min([uppers_list[i]] + [remaining[j] // need for j, need in recipes[i]]))
+            for count in range(most, -1, -1):
+                if not best["optimal"]:
+                    return
+                if count:
+                    counts[i] = count
+                else:
+                    counts.pop(i, None)
+                left = list(remaining)
+                for j, need in recipes[i]:
+                    left[j] -= count * need
+                search(depth + 1, left, value + count * values_list[i], priced_stock - count * costs[depth])
+
+        search(0, stock_list, 0.0, float(prices @ stock))
+        mix = {self.items[keep[i]].name: int(count) for i, count in sorted(best["counts"].items())}
+        value = float(best["value"])
+        return Mix(mix, value, best["optimal"], value if best["optimal"] else max(value, float(root_bound)))
+
+
+if __name__ == "__main__":
+    import random
+
+    from coffee_maker import CoffeeMaker
+    from menu import Menu
+
+    optimizer = DrinkOptimizer.from_menu(Menu())
+    resources = CoffeeMaker().resources
+    print(f"Resources: {resources}")
+    print(f"Best mix: {optimizer.best_mix(resources)}")
+    print(f"Only 2 espressos will sell: {optimizer.best_mix(resources, limits={'espresso': 2})}")
+    print(f"2 of each? missing {optimizer.shortfall(resources, 2)}")
+
+    # A big menu: 300 drinks, 20 ingredients
+    rng = random.Random(0)
+    ingredients = [f"ingredient{j}" for j in range(20)]
+    drinks = [Recipe(f"drink{i}", {name: rng.randint(5, 60) for name in rng.sample(ingredients, 4)},
+                     round(rng.uniform(1, 6), 2)) for i in range(300)]
+    optimizer = DrinkOptimizer(drinks)
+    stock = {name: rng.randint(500, 3000) for name in ingredients}
+    start = time.perf_counter()
+    mix = optimizer.best_mix(stock)
+    elapsed = time.perf_counter() - start
+    print(f"300 drinks, 20 ingredients: {sum(mix.counts.values())} drinks for ${mix.value:.2f} "
+          f"({'optimal' if mix.optimal else f'best found, at most ${mix.bound:.2f}'}) in {elapsed * 1000:.1f}ms")
+    start = time.perf_counter()
+    optimizer.can_make(stock, mix.counts)
+    print(f"can_make: {(time.perf_counter() - start) * 1000:.2f}ms")
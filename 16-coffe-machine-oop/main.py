@@ -1,24 +1,52 @@
+import os
+import time
+
+import metrics
 from menu import Menu
 from coffee_maker import CoffeeMaker
 from money_machine import MoneyMachine
 
-money_machine = MoneyMachine()
-coffee_maker = CoffeeMaker()
-menu = Menu()
 
-is_on = True
+def main():
+    money_machine = MoneyMachine()
+    coffee_maker = CoffeeMaker()
+    menu = Menu()
+    # Scrape the counters on http://127.0.0.1:<port>/metrics while the machine runs
+    if os.environ.get("METRICS_PORT"):
+        metrics.METRICS.serve(int(os.environ["METRICS_PORT"]))
+
+    is_on = True
+
+    while is_on:
+        options = menu.get_items()
+        choice = input(f"What would you like? ({options}): ")
+        if choice == "off":
+            is_on = False
+        elif choice == "report":
+            coffee_maker.report()
+            money_machine.report()
+        else:
+            drink = menu.find_drink(choice)
+            if drink is None:
+                # Not labelled with the typed text: every typo would become a new series
+                metrics.DRINKS_REFUSED.inc("other", "unknown")
+                continue
 
-while is_on:
-    options = menu.get_items()
-    choice = input(f"What would you like? ({options}): ")
-    if choice == "off":
-        is_on = False
-    elif choice == "report":
-        coffee_maker.report()
-        money_machine.report()
-    else:
-        drink = menu.find_drink(choice)
+            # The machine's work only: the time spent at the coin prompts is the payment's
+            start = time.perf_counter_ns()
+            sufficient = coffee_maker.is_resource_sufficient(drink)
+            machine_ns = time.perf_counter_ns() - start
+            if sufficient:
+                with metrics.PAYMENT_SECONDS.time(drink.name):
+                    paid = money_machine.make_payment(drink.cost)
+                if paid:
+                    start = time.perf_counter_ns()
+                    coffee_maker.make_coffee(drink)
+                    machine_ns += time.perf_counter_ns() - start
+                else:
+                    metrics.DRINKS_REFUSED.inc(drink.name, "payment")
+            metrics.MACHINE_SECONDS.record(machine_ns, drink.name)
 
-        if coffee_maker.is_resource_sufficient(drink) and money_machine.make_payment(drink.cost):
-          coffee_maker.make_coffee(drink)
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+Counters and latency histograms of the coffee machine, exported for Prometheus.
+
+The machine printed its resources on "report" and nothing else: how many drinks were made or
+refused, why, how long the machine worked on an order and how long the customer took to pay
+were not kept anywhere. This module keeps them:
+  - a Counter or Histogram keeps its values per thread, in a dict that only that thread
+    updates, so an update takes no lock. Reading the metrics adds up the dicts of all the
+    threads,
+  - a Histogram puts the values in log-linear (HDR) buckets: the bucket is computed with
+    bit_length() and a shift, there is no list of bounds to search,
+  - a Registry exports all the metrics as a dict or in the Prometheus text format, served on
+    /metrics by an http.server thread.
+
+An update costs about 0.3 microseconds for Counter.inc() and 0.5 for Histogram.record() with
+CPython 3.11, up to around a microsecond on slower machines (python metrics.py measures them):
+small next to the input() and print() of an order.
+"""
+
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+
+# Sub-buckets per power of two in a Histogram: 8 keeps every bucket within 12.5% of its values
+SUB_BUCKET_BITS = 3
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# The exported buckets of a Histogram end at these powers of two of its unit: ~1µs to ~69s
+EXPORT_BITS = range(10, 37)
+
+
+def bucket_index(value):
+    """Returns the HDR bucket of a positive integer: exact under 2 * SUB_BUCKETS, then
+    SUB_BUCKETS buckets of equal width per power of two."""
+    if value < SUB_BUCKETS:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift << SUB_BUCKET_BITS) + (value >> shift)
+
+
+def bucket_lowest(index):
+    """Returns the smallest value of an HDR bucket."""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    return (index % SUB_BUCKETS + SUB_BUCKETS) << (index // SUB_BUCKETS - 1)
+
+
+def bucket_highest(index):
+    """Returns the largest value of an HDR bucket."""
+    return bucket_lowest(index + 1) - 1
+
+
+# The last bucket of every histogram series in the Prometheus format
+INF = 'le="+Inf"'
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """A metric whose values are kept per thread: every thread updates its own dict without any
+    lock, and the reads add up the dicts of all the threads."""
+
+    kind = None
+    # Value of a new combination of label values
+    initial = int
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        """Returns the dict of the current thread, created on its first update."""
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = defaultdict(self.initial)
+            with self._lock:
+                self._shards.append(values)
+            return values
+
+    def _copies(self):
+        # dict.copy() runs without releasing the GIL, so a thread updating its dict can't break it
+        with self._lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]
+
+
+class Counter(_Metric):
+    """A number that only goes up, per combination of label values."""
+
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        """Adds amount to the counter of the label values."""
+        try:
+            self._local.values[labels] += amount
+        except AttributeError:
+            self._shard()[labels] += amount
+
+    def values(self):
+        """Returns {label values: total} over all the threads."""
+        totals = {}
+        for shard in self._copies():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def snapshot(self):
+        return {labels: total for labels, total in sorted(self.values().items())}
+
+    def prometheus(self):
+        return [f"{self.name}{_labels(self.labels, labels)} {total}" for labels, total in sorted(self.values().items())]
+
+
+class HistogramSnapshot:
+    """Merged HDR buckets of a Histogram for one combination of label values."""
+
+    def __init__(self, buckets, count, total, unit):
+        self.buckets = dict(sorted(buckets.items()))
+        self.count = count
+        self.sum = total * unit
+        self.unit = unit
+
+    def quantile(self, q):
+        """Returns the highest value of the bucket holding the q quantile (HDR style)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for index, count in self.buckets.items():
+            seen += count
+            if seen >= rank:
+                return bucket_highest(index) * self.unit
+        return bucket_highest(index) * self.unit
+
+    def summary(self):
+        """Returns the count, sum, p50, p90, p99 and max."""
+        return {"count": self.count, "sum": self.sum, "p50": self.quantile(0.5), "p90": self.quantile(0.9),
+                "p99": self.quantile(0.99), "max": self.quantile(1.0)}
+
+    def __repr__(self):
+        return f"HistogramSnapshot({self.summary()})"
+
+
+class Histogram(_Metric):
+    """Distribution of durations in log-linear (HDR) buckets, per combination of label values.
+
+    Values are recorded as integers of unit (nanoseconds by default): the bucket is found with
+    bit_length() and a shift, with no search and no list of bounds to configure, and the buckets
+    cover any range with a relative error under 1 / SUB_BUCKETS. The Prometheus export gives the
+    cumulative counts at the powers of two of unit in export_bits, the same for every scrape.
+    """
+
+    kind = "histogram"
+
+    @staticmethod
+    def initial():
+        return [0, 0, defaultdict(int)]  # count, sum, {bucket: count}
+
+    def __init__(self, name, help, labels=(), unit=1e-9, export_bits=EXPORT_BITS):
+        super().__init__(name, help, labels)
+        self.unit = unit
+        self.export_bits = export_bits
+
+    def record(self, value, *labels):
+        """Records one value, as an integer count of unit."""
+        try:
+            series = self._local.values[labels]
+        except AttributeError:
+            series = self._shard()[labels]
+        series[0] += 1
+        series[1] += value
+        # bucket_index(value), inlined
+        if value < SUB_BUCKETS:
+            series[2][max(value, 0)] += 1
+        else:
+            shift = value.bit_length() - SUB_BUCKET_BITS - 1
+            series[2][(shift << SUB_BUCKET_BITS) + (value >> shift)] += 1
+
+    def observe(self, seconds, *labels):
+        """Records one duration in seconds."""
+        self.record(round(seconds / self.unit), *labels)
+
+    def time(self, *labels):
+        """Returns a context manager that records the time spent in its block."""
+        return _Timer(self, labels)
+
+    def values(self):
+        """Returns {label values: HistogramSnapshot} over all the threads."""
+        merged = {}
+        for shard in self._copies():
+            for labels, (count, total, buckets) in shard.items():
+                series = merged.setdefault(labels, [0, 0, {}])
+                series[0] += count
+                series[1] += total
+                for index, value in buckets.copy().items():
+                    series[2][index] = series[2].get(index, 0) + value
+        return {labels: HistogramSnapshot(buckets, count, total, self.unit)
+                for labels, (count, total, buckets) in merged.items()}
+
+    def snapshot(self):
+        return {labels: snapshot.summary() for labels, snapshot in sorted(self.values().items())}
+
+    def prometheus(self):
+        lines = []
+        # The same bounds for every series and every scrape, each one the first value of an HDR
+        # bucket, so the cumulative counts are exact
+        bounds = [1 << bits for bits in self.export_bits]
+        for labels, snapshot in sorted(self.values().items()):
+            buckets = list(snapshot.buckets.items())
+            cumulative = position = 0
+            for bound in bounds:
+                first = bucket_index(bound)
+                while position < len(buckets) and buckets[position][0] < first:
+                    cumulative += buckets[position][1]
+                    position += 1
+                le = f'le="{bound * self.unit:.9g}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.labels, labels, INF)} {snapshot.count}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, labels)} {snapshot.sum:.9g}")
+            lines.append(f"{self.name}_count{_labels(self.labels, labels)} {snapshot.count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter_ns() - self.start
+        unit = self.histogram.unit
+        self.histogram.record(elapsed if unit == 1e-9 else round(elapsed * 1e-9 / unit), *self.labels)
+
+
+class Registry:
+    """The metrics of a program, and their export."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def counter(self, name, help, labels=()):
+        """Returns a new Counter registered under name."""
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), unit=1e-9, export_bits=EXPORT_BITS):
+        """Returns a new Histogram registered under name."""
+        return self._register(Histogram(name, help, labels, unit, export_bits))
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"A metric named {metric.name!r} already exists")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self):
+        """Returns {metric name: {label values: value}} with the current totals (a summary dict
+        for the histograms)."""
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def prometheus(self):
+        """Returns all the metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.prometheus())
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9100, host="127.0.0.1"):
+        """Serves the metrics on http://host:port/metrics from a daemon thread, returns the server."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # keep the scrapes out of the coffee machine prompts
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+# The metrics of the coffee machine
+METRICS = Registry()
+DRINKS_SERVED = METRICS.counter("coffee_drinks_served_total", "Drinks made.", ["drink"])
+DRINKS_REFUSED = METRICS.counter("coffee_drinks_refused_total", "Orders not made, by reason.", ["drink", "reason"])
+STOCKOUTS = METRICS.counter("coffee_stockouts_total", "Orders refused for lack of an ingredient.", ["ingredient"])
+PAYMENTS = METRICS.counter("coffee_payments_total", "Payments, accepted or refused.", ["result"])
+REVENUE = METRICS.counter("coffee_revenue_dollars_total", "Money earned.")
+# Kept apart: the coin prompts wait for the customer, the machine time is only the machine's work
+MACHINE_SECONDS = METRICS.histogram("coffee_machine_seconds", "Time spent checking the stock and making the drink.",
+                                    ["drink"])
+PAYMENT_SECONDS = METRICS.histogram("coffee_payment_seconds", "Time the customer took to insert the coins.", ["drink"])
+
+
+if __name__ == "__main__":
+    import random
+    from urllib.request import urlopen
+
+    # 4 threads serving orders, then one read of everything
+    def serve_orders(seed):
+        rng = random.Random(seed)
+        for _ in range(25_000):
+            drink = rng.choice(["latte", "espresso", "cappuccino"])
+            if rng.random() < 0.1:
+                DRINKS_REFUSED.inc(drink, "resources")
+                STOCKOUTS.inc(rng.choice(["water", "milk", "coffee"]))
+            else:
+                DRINKS_SERVED.inc(drink)
+                MACHINE_SECONDS.observe(rng.lognormvariate(-3, 0.5), drink)
+                PAYMENT_SECONDS.observe(rng.lognormvariate(2, 0.5), drink)
+
+    threads = [threading.Thread(target=serve_orders, args=(seed,)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for name, values in METRICS.snapshot().items():
+        print(name, values)
+
+    # Cost of one update, on metrics outside of METRICS
+    scratch = Registry()
+    counter, histogram = scratch.counter("counter", "Test."), scratch.histogram("histogram", "Test.")
+    start = time.perf_counter()
+    for _ in range(100_000):
+        counter.inc("latte")
+    print(f"Counter.inc: {(time.perf_counter() - start) * 1e9 / 100_000:.0f}ns")
+    start = time.perf_counter()
+    for _ in range(100_000):
+        histogram.record(1_234_567, "latte")
+    print(f"Histogram.record: {(time.perf_counter() - start) * 1e9 / 100_000:.0f}ns")
+
+    server = METRICS.serve(port=0)
+    with urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+        print("\n".join(response.read().decode().splitlines()[:12]))
+    server.shutdown()
@@ -1,3 +1,6 @@
+import metrics
+
+
 class MoneyMachine:
 
     CURRENCY = "$"
@@ -32,10 +35,13 @@ class MoneyMachine:
             print(f"Here is {self.CURRENCY}{change} in change.")
             self.profit += cost
             self.money_received = 0
+            metrics.PAYMENTS.inc("accepted")
+            metrics.REVENUE.inc(amount=cost)
             return True
         else:
             print("Sorry that's not enough money. Money refunded.")
             self.money_received = 0
+            metrics.PAYMENTS.inc("refused")
             return False
 
 
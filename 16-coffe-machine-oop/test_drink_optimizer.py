@@ -0,0 +1,70 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from drink_optimizer import DrinkOptimizer, Recipe
+
+MENU = [
+    Recipe("espresso", {"water": 50, "coffee": 18}, 1.5),
+    Recipe("latte", {"water": 200, "milk": 150, "coffee": 24}, 2.5),
+    Recipe("cappuccino", {"water": 250, "milk": 100, "coffee": 24}, 3.0),
+]
+
+
+def brute_force(optimizer, stock, limits, values):
+    """The best value over every mix of drinks the stock and the limits allow."""
+    uppers = [min(limits.get(item.name, np.inf), optimizer.max_servings(stock, item.name)) for item in optimizer.items]
+    grid = np.array(list(itertools.product(*(range(int(upper) + 1) for upper in uppers))), dtype=float)
+    feasible = ((grid @ optimizer.needs) <= optimizer._stock(stock)).all(axis=1)
+    return (grid[feasible] @ values).max()
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_best_mix_matches_brute_force(seed):
+    rng = random.Random(seed)
+    ingredients = ["water", "milk", "coffee"]
+    drinks = [Recipe(f"drink{i}", {name: rng.randint(1, 8) for name in rng.sample(ingredients, rng.randint(1, 3))},
+                     rng.randint(1, 9)) for i in range(4)]
+    stock = {name: rng.randint(0, 15) for name in ingredients}
+    limits = {drink.name: rng.randint(0, 6) for drink in drinks if rng.random() < 0.3}
+    optimizer = DrinkOptimizer(drinks)
+
+    mix = optimizer.best_mix(stock, limits=limits, time_limit=1)
+    assert mix.optimal
+    assert mix.value == pytest.approx(brute_force(optimizer, stock, limits, optimizer.values))
+    assert mix.bound == pytest.approx(mix.value)
+    assert optimizer.can_make(stock, mix.counts)
+    assert all(mix.counts.get(name, 0) <= limit for name, limit in limits.items())
+
+
+def test_values_replace_the_prices():
+    optimizer = DrinkOptimizer(MENU)
+    stock = {"water": 1000, "milk": 600, "coffee": 200}
+    values = {"espresso": 4.0}
+    mix = optimizer.best_mix(stock, values=values, time_limit=1)
+    expected = brute_force(optimizer, stock, {}, np.array([4.0, 2.5, 3.0]))
+    assert mix.optimal and mix.value == pytest.approx(expected)
+
+
+def test_shortfall_and_can_make():
+    optimizer = DrinkOptimizer(MENU)
+    stock = {"water": 300, "milk": 200, "coffee": 100}
+    assert optimizer.shortfall(stock, {"latte": 1}) == {}
+    assert optimizer.shortfall(stock, 1) == {"water": 200, "milk": 50}
+    assert not optimizer.can_make(stock, {"cappuccino": 2})
+    assert optimizer.max_servings(stock, "espresso") == 5
+
+
+def test_time_limit_gives_a_bound():
+    rng = random.Random(7)
+    ingredients = [f"ingredient{j}" for j in range(20)]
+    drinks = [Recipe(f"drink{i}", {name: rng.randint(5, 60) for name in rng.sample(ingredients, 4)},
+                     round(rng.uniform(1, 6), 2)) for i in range(300)]
+    optimizer = DrinkOptimizer(drinks)
+    stock = {name: rng.randint(500, 3000) for name in ingredients}
+    mix = optimizer.best_mix(stock, time_limit=0.005)
+    assert optimizer.can_make(stock, mix.counts)
+    assert mix.value <= mix.bound
+    assert mix.value >= 0.95 * mix.bound
@@ -0,0 +1,227 @@
+"""
+Near-duplicate questions in a quiz bank, with MinHash and LSH.
+
+QuizBrain asks every question of question_data. Banks merged from several sources are full of
+the same question written a bit differently ("The HTML5 standard was published in 2014." and
+"HTML5 standard was published in 2014?"), and comparing every pair of questions is impossible
+with millions of them. Here:
+  - every question is normalized (HTML entities, case, punctuation; letters of any script are
+    kept) and cut into shingles of k bytes of its UTF-8 text, hashed to 64 bits, all at once
+    with NumPy over the concatenated text. A question left without any word (only punctuation
+    or emoji) has nothing to compare and is never merged,
+  - its MinHash signature is the minimum of num_perm hash functions over its shingles. Two
+    signatures agree on a position with a probability equal to the Jaccard similarity of the
+    shingle sets,
+  - LSH banding: the signature is cut into bands of rows values and the questions whose band is
+    identical land in the same bucket. Each bucket only links its members to its first member,
+    so a huge bucket costs its size, not its size squared. The similarity of every candidate pair
+    is then estimated from the signatures and the pairs under the threshold are dropped,
+  - the remaining pairs are merged into clusters (union-find with NumPy), and the cleaned bank
+    keeps the first question of every cluster. A cluster whose questions have different answers
+    is kept whole and listed: keeping one of them would pick an answer without telling anyone.
+Everything is linear in the number of shingles, except the sort of the band keys.
+
+Run it from this folder: python dedup.py [bank.json] --threshold 0.5 --output clean.json
+"""
+
+import html
+import re
+
+import numpy as np
+
+# Shingles hashed per block in MinHasher.signatures(): the (num_perm, block) values stay in cache
+BLOCK_SHINGLES = 1 << 13
+
+
+def normalize(text):
+    """Casefolded words of a question (in any script), without HTML entities and punctuation."""
+    text = html.unescape(text).casefold()
+    return " ".join(re.findall(r"\w+", text))
+
+
+def _mix64(x):
+    """splitmix64 finalizer: spreads the bits of uint64 values."""
+    x = x.astype(np.uint64, copy=True)
+    with np.errstate(over="ignore"):
+        x ^= x >> np.uint64(30)
+        x *= np.uint64(0xBF58476D1CE4E5B9)
+        x ^= x >> np.uint64(27)
+        x *= np.uint64(0x94D049BB133111EB)
+        x ^= x >> np.uint64(31)
+    return x
+
+
+def shingles(texts, k=5):
+    """Returns (hashes, owners): the 64-bit hash of every k-byte shingle of the normalized texts
+    (UTF-8) and the position of the text it comes from, sorted by text."""
+    if not 1 <= k <= 8:
+        raise ValueError(f"k must be between 1 and 8, got {k}")
+    # Texts shorter than k are padded so that every text has at least one shingle
+    encoded = [normalize(text).encode().ljust(k) for text in texts]
+    lengths = np.array([len(text) for text in encoded], dtype=np.int64)
+    codes = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+
+    # The k bytes of every window packed into one uint64
+    windows = len(codes) - k + 1
+    packed = np.zeros(windows, dtype=np.uint64)
+    for j in range(k):
+        packed |= codes[j:j + windows] << np.uint64(8 * j)
+
+    # Keep the windows that don't run into the next text
+    owners = np.repeat(np.arange(len(texts)), lengths)[:windows]
+    offsets = np.arange(windows) - starts[owners]
+    valid = offsets <= lengths[owners] - k
+    return _mix64(packed[valid]), owners[valid]
+
+
+class MinHasher:
+    """num_perm multiply-shift hash functions, and the MinHash signatures they give."""
+
+    def __init__(self, num_perm=128, k=5, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.k = k
+        self.a = rng.integers(0, 2**63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)  # odd
+        self.b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+
+    def signatures(self, texts):
+        """Returns the (len(texts), num_perm) uint32 signatures of the texts."""
+        hashes, owners = shingles(texts, self.k)
+        signatures = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        # Blocks of whole texts, so that every minimum is computed in one block
+        text_starts = np.searchsorted(owners, np.arange(len(texts) + 1))
+        bounds = np.searchsorted(text_starts, np.arange(0, len(hashes), BLOCK_SHINGLES), side="right") - 1
+        bounds = np.unique(np.concatenate([bounds, [len(texts)]]))
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            block = hashes[text_starts[first]:text_starts[last]]
+            segments = text_starts[first:last] - text_starts[first]
+            # One row per hash function: the minimum of every text is over a contiguous slice
+            with np.errstate(over="ignore"):
+                values = np.multiply(self.a[:, None], block)
+                np.add(values, self.b[:, None], out=values)
+            np.right_shift(values, np.uint64(32), out=values)
+            signatures[first:last] = np.minimum.reduceat(values, segments, axis=1).T
+        return signatures
+
+
+def lsh_bands(threshold, num_perm):
+    """Returns (bands, rows) with bands * rows <= num_perm and (1 / bands) ** (1 / rows), the
+    similarity where a pair becomes a candidate with probability ~1/2, closest to threshold."""
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1)]
+    return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - threshold))
+
+
+def candidate_pairs(signatures, bands, rows):
+    """Returns (u, v) arrays of the pairs of texts that share at least one band, u < v."""
+    n = len(signatures)
+    pairs = []
+    for band in range(bands):
+        columns = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+        keys = np.zeros(n, dtype=np.uint64)
+        for column in columns.T:
+            keys = _mix64(keys ^ column)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        new_bucket = np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]])
+        # Position (in order) of the first member of the bucket of every text
+        firsts = np.maximum.accumulate(np.where(new_bucket, np.arange(n), 0))
+        members = ~new_bucket
+        pairs.append(order[firsts[members]].astype(np.int64) * n + order[members])
+    if not pairs:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    unique = np.unique(np.concatenate(pairs))
+    u, v = unique // n, unique % n
+    return np.minimum(u, v), np.maximum(u, v)
+
+
+def similarities(signatures, u, v, block=1 << 16):
+    """Estimated Jaccard similarity of the pairs (u, v): the share of equal signature values."""
+    result = np.empty(len(u))
+    for start in range(0, len(u), block):
+        a, b = signatures[u[start:start + block]], signatures[v[start:start + block]]
+        result[start:start + block] = (a == b).mean(axis=1)
+    return result
+
+
+def connected_components(n, u, v):
+    """Returns the label of every node: the smallest node of its component."""
+    labels = np.arange(n)
+    while True:
+        lu, lv = labels[u], labels[v]
+        linked = lu != lv
+        if not linked.any():
+            return labels
+        # Hook the larger root on the smaller one, then compress the paths
+        np.minimum.at(labels, np.maximum(lu[linked], lv[linked]), np.minimum(lu[linked], lv[linked]))
+        while True:
+            parents = labels[labels]
+            if (parents == labels).all():
+                break
+            labels = parents
+
+
+def dedupe(texts, threshold=0.5, num_perm=128, k=5, seed=1):
+    """Returns (keep, clusters): the positions of the texts to keep (the first of every cluster)
+    and the clusters of near duplicates, as arrays of positions."""
+    if not len(texts):
+        return np.empty(0, dtype=np.int64), []
+    signatures = MinHasher(num_perm, k, seed).signatures(texts)
+    bands, rows = lsh_bands(threshold, num_perm)
+    u, v = candidate_pairs(signatures, bands, rows)
+    similar = similarities(signatures, u, v) >= threshold
+    # Texts without any word all have the same padding shingle: they stay alone
+    wordless = np.array([not normalize(text) for text in texts])
+    similar &= ~(wordless[u] | wordless[v])
+    labels = connected_components(len(texts), u[similar], v[similar])
+
+    keep = np.flatnonzero(labels == np.arange(len(texts)))
+    order = np.argsort(labels, kind="stable")
+    starts = np.flatnonzero(np.concatenate([[True], labels[order][1:] != labels[order][:-1]]))
+    groups = np.split(order, starts[1:])
+    return keep, [group for group in groups if len(group) > 1]
+
+
+def main(argv=None):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Finds the near-duplicate questions of a quiz bank.")
+    parser.add_argument("bank", nargs="?", help="JSON list of questions like data.py (default: data.py)")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Jaccard similarity of duplicates")
+    parser.add_argument("--output", help="JSON file for the cleaned bank")
+    args = parser.parse_args(argv)
+
+    if args.bank:
+        with open(args.bank) as f:
+            questions = json.load(f)
+    else:
+        from data import question_data
+        # data.py has no duplicates, add a few rewritten questions to find
+        questions = question_data + [
+            {**question_data[0], "question": "The HTML5 standard was published in 2014?"},
+            {**question_data[4], "question": "Linus Torvalds created both Linux and Git."},
+            {**question_data[7], "question": "&quot;HTML&quot; stands for HyperText Markup Language.",
+             "correct_answer": "False"},
+        ]
+
+    keep, clusters = dedupe([question["question"] for question in questions], args.threshold)
+    conflicts = []
+    for cluster in clusters:
+        answers = {questions[i]["correct_answer"] for i in cluster}
+        if len(answers) > 1:
+            conflicts.append(cluster)
+        print(f"{len(cluster)} questions{' (different answers! all kept, check them)' if len(answers) > 1 else ''}:")
+        for i in cluster:
+            print(f"  [{i}] {questions[i]['question']} -> {questions[i]['correct_answer']}")
+    if conflicts:
+        keep = np.union1d(keep, np.concatenate(conflicts))
+    print(f"{len(questions)} questions, {len(clusters)} clusters of duplicates "
+          f"({len(conflicts)} with different answers), {len(keep)} kept")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump([questions[i] for i in keep], f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
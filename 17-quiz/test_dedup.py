@@ -0,0 +1,42 @@
+import numpy as np
+
+from dedup import dedupe, normalize
+
+
+def test_normalize_keeps_letters_of_any_script():
+    assert normalize("Pokémon &amp; Straße?") == "pokémon strasse"
+    assert normalize("Какая столица России?") == "какая столица россии"
+
+
+def test_rewritten_questions_are_one_cluster():
+    keep, clusters = dedupe([
+        "The HTML5 standard was published in 2014.",
+        "Linus Torvalds created Linux and Git.",
+        "HTML5 standard was published in 2014?",
+    ])
+    assert keep.tolist() == [0, 1]
+    assert [cluster.tolist() for cluster in clusters] == [[0, 2]]
+
+
+def test_non_ascii_questions_are_not_merged():
+    keep, clusters = dedupe(["Какая столица России?", "Кто написал Войну и мир?", "日本の首都はどこですか？"])
+    assert keep.tolist() == [0, 1, 2]
+    assert clusters == []
+
+
+def test_non_ascii_duplicates_are_found():
+    keep, clusters = dedupe(["Какая столица России?", "какая столица россии", "日本の首都はどこですか？"])
+    assert keep.tolist() == [0, 2]
+    assert [cluster.tolist() for cluster in clusters] == [[0, 1]]
+
+
+def test_questions_without_words_stay_alone():
+    keep, clusters = dedupe(["?!", "...", "?!"])
+    assert keep.tolist() == [0, 1, 2]
+    assert clusters == []
+
+
+def test_empty_bank():
+    keep, clusters = dedupe([])
+    assert keep.dtype == np.int64 and len(keep) == 0
+    assert clusters == []
@@ -0,0 +1,149 @@
+"""
+Map-reduce over many squirrel census files, in a process pool.
+
+squirrel.py counts the fur colors of the one squirrel_data_main.csv. With one census file per
+park and per year, the runner takes a glob of files and:
+  - map: every file is cut into byte ranges of about chunk_size bytes, ending on a line break,
+    and every range is parsed by a worker process on its own (the header is prepended, only the
+    needed columns are parsed) into a Partial: fur color counts, behavior counts and the number
+    of sightings per hectare,
+  - reduce: the partials are added up per file and over all the files, as they come back.
+The ranges are submitted one by one to the pool, and an idle worker takes the next one in the
+queue. A huge file is just many ranges, so the other files aren't stuck behind it and no worker
+sits idle while one of them grinds through it, which is what work stealing is for.
+
+The census files have no line breaks inside quoted fields, which is what makes cutting them at
+any line break safe.
+
+Run it from this folder: python census_runner.py "censuses/*.csv" --workers 4 --output report
+"""
+
+import argparse
+import glob
+import io
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas
+
+FUR_COLOR = "Primary Fur Color"
+HECTARE = "Hectare"
+BEHAVIORS = [
+    "Running", "Chasing", "Climbing", "Eating", "Foraging", "Kuks", "Quaas", "Moans", "Tail flags",
+    "Tail twitches", "Approaches", "Indifferent", "Runs from",
+]
+CHUNK_SIZE = 16 * 2**20
+
+Partial = namedtuple("Partial", ["rows", "fur_colors", "behaviors", "hectares"])
+
+
+def empty_partial():
+    return Partial(0, pandas.Series(dtype="int64"), pandas.Series(0, index=BEHAVIORS, dtype="int64"),
+                   pandas.Series(dtype="int64"))
+
+
+def merge(a, b):
+    """Returns the sum of two partials."""
+    return Partial(
+        a.rows + b.rows,
+        a.fur_colors.add(b.fur_colors, fill_value=0).astype("int64"),
+        a.behaviors.add(b.behaviors, fill_value=0).astype("int64"),
+        a.hectares.add(b.hectares, fill_value=0).astype("int64"),
+    )
+
+
+def byte_ranges(path, chunk_size=CHUNK_SIZE):
+    """Returns the header line and the (start, end) byte ranges of the rows, cut at line breaks."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+        ranges = []
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_size, size))
+            f.readline()  # move on to the end of the line
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return header, ranges
+
+
+def map_range(path, header, start, end):
+    """Parses the rows between two byte offsets of a census file, returns their Partial."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    columns = header.decode().strip().split(",")
+    behaviors = [column for column in BEHAVIORS if column in columns]
+    frame = pandas.read_csv(io.BytesIO(header + data), usecols=[FUR_COLOR, HECTARE, *behaviors],
+                            dtype={FUR_COLOR: "category", HECTARE: "category"},
+                            true_values=["true", "TRUE", "True"], false_values=["false", "FALSE", "False"])
+    return Partial(
+        len(frame),
+        frame[FUR_COLOR].cat.add_categories("Unknown").fillna("Unknown").value_counts(),
+        frame[behaviors].eq(True).sum().reindex(BEHAVIORS, fill_value=0),
+        frame[HECTARE].value_counts(),
+    )
+
+
+def run(paths, workers=None, chunk_size=CHUNK_SIZE):
+    """Maps every file of paths in a process pool, returns ({path: Partial}, combined Partial)."""
+    per_file = {path: empty_partial() for path in paths}
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {}
+        for path in paths:
+            header, ranges = byte_ranges(path, chunk_size)
+            for start, end in ranges:
+                futures[pool.submit(map_range, path, header, start, end)] = path
+        for future in as_completed(futures):
+            path = futures[future]
+            per_file[path] = merge(per_file[path], future.result())
+
+    combined = empty_partial()
+    for partial in per_file.values():
+        combined = merge(combined, partial)
+    return per_file, combined
+
+
+def report(per_file, combined):
+    """Returns the report tables: rows and fur colors per file, behaviors and hectares overall."""
+    files = pandas.DataFrame(
+        {Path(path).name: {"rows": partial.rows, **partial.fur_colors} for path, partial in per_file.items()}
+    ).T.fillna(0).astype("int64")
+    files.index.name = "file"
+    return {
+        "files": files,
+        "fur_colors": combined.fur_colors.sort_values(ascending=False).rename("count"),
+        "behaviors": combined.behaviors.rename_axis("Behavior").rename("count"),
+        "hectares": combined.hectares.sort_index().rename("count"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Counts of many squirrel census files, in parallel.")
+    parser.add_argument("pattern", nargs="?", default="squirrel_data_main.csv", help="glob of the census files")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="bytes per task")
+    parser.add_argument("--output", type=Path, default=None, help="folder for the report CSVs")
+    args = parser.parse_args(argv)
+
+    paths = sorted(glob.glob(args.pattern))
+    if not paths:
+        parser.error(f"No file matches {args.pattern!r}")
+    per_file, combined = run(paths, args.workers, args.chunk_size)
+    tables = report(per_file, combined)
+    print(tables["files"])
+    print(f"\n{combined.rows} squirrels in {len(paths)} files")
+    print(tables["fur_colors"].to_string())
+    print(tables["behaviors"].to_string())
+    if args.output:
+        args.output.mkdir(parents=True, exist_ok=True)
+        for name, table in tables.items():
+            table.to_csv(args.output / f"{name}.csv")
+        print(f"Saved {len(tables)} tables to {args.output}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -27,13 +27,27 @@
 # Doc: https://pandas.pydata.org/docs/
 # Api: https://pandas.pydata.org/docs/reference/index.html
 
+import sys
+from pathlib import Path
+
 import pandas
 
-def print_separator():
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.csv_cache import read_csv
+from common.tracing import section
+
+def print_separator(step=None):
     print("-----------------------------------")
+    # Ends the previous traced step and starts the next one (TRACE_STEPS=flame, see common/tracing.py).
+    # The last separator starts nothing: the trace report ends the running step.
+    if step is not None:
+        section(step)
     ############################################
     
-data = pandas.read_csv("weather_data.csv")
+section("read")
+# read_csv from common/csv_cache.py works like pandas.read_csv, but keeps a parsed binary copy
+# of the file in .csv_cache/ so next runs don't have to parse the CSV again.
+data = read_csv("weather_data.csv", optimize=True)
 print(data)
 """
          day  temp condition
@@ -47,7 +61,7 @@ print(data)
 """
 
 ############################################
-print_separator()
+print_separator("columns")
 print(type(data["temp"]))
 # <class 'pandas.core.series.Series'>
 print(data["temp"])
@@ -61,24 +75,24 @@ print(data["temp"])
 4    21
 5    22
 6    24
-Name: temp, dtype: int64
+Name: temp, dtype: int32
 """
 
 ############################################
-print_separator()
+print_separator("to_list")
 data_list = data["temp"].to_list()  # this is a python list
 print(data_list)  # [12, 14, 15, 14, 21, 22, 24]
 
 ############################################
-print_separator()
+print_separator("to_dict")
 print(data.to_dict())
 
 ############################################
-print_separator()
+print_separator("dot notation")
 print(data["temp"].all() == data.temp.all()) # True, means we can access series(columns) with dot notation
 
 ############################################
-print_separator()
+print_separator("rows")
 print("How do we access rows?")
 # We have to make a filter with unique ID in the seria, and that will return a row
 monday_row = data[data.day == "Monday"] # Get hole DF and then filter the column value
@@ -96,7 +110,7 @@ print(data[data.temp == data.temp.max()])
 """
 
 ############################################
-print_separator()
+print_separator("from dict")
 # How do we create a DF from a dict
 
 students_dict = {
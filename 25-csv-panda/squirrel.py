@@ -1,16 +1,29 @@
+import sys
+from pathlib import Path
+
 import pandas
 
-# DF
-data = pandas.read_csv("squirrel_data_main.csv")
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.csv_cache import read_csv
+
+
+def main():
+    # DF
+    # optimize shrinks the dtypes (common/dtypes.py), report prints the memory it saved
+    data = read_csv("squirrel_data_main.csv", optimize=True, report=True)
+
+    gray_squirrels = data[data["Primary Fur Color"] == "Gray"]
+    red_squirrels = data[data["Primary Fur Color"] == "Cinnamon"]
+    black_squirrels = data[data["Primary Fur Color"] == "Black"]
+
+    data_dict = {
+        "Fur Color": ["Gray", "Cinnamon", "Black"],
+        "Color": [len(gray_squirrels), len(red_squirrels), len(black_squirrels)]
+    }
 
-gray_squirrels = data[data["Primary Fur Color"] == "Gray"]
-red_squirrels = data[data["Primary Fur Color"] == "Cinnamon"]
-black_squirrels = data[data["Primary Fur Color"] == "Black"]
+    df = pandas.DataFrame(data_dict)
+    df.to_csv("squirrel_color_count.csv")
 
-data_dict = {
-    "Fur Color": ["Gray", "Cinnamon", "Black"],
-    "Color": [len(gray_squirrels), len(red_squirrels), len(black_squirrels)]
-}
 
-df = pandas.DataFrame(data_dict)
-df.to_csv("squirrel_color_count.csv")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Spatial index over the squirrel census sightings.
+
+Every row of squirrel_data_main.csv has a "Lat/Long" column like "POINT (-73.956 40.794)".
+We parse all of them at once into a NumPy (N, 2) array, project them to metres and bucket
+them into a uniform grid. Points are stored sorted by cell, so each row of grid cells is a
+contiguous slice of the arrays, and a query only touches the cells it overlaps instead of
+scanning every sighting.
+"""
+
+import numpy as np
+import pandas
+
+EARTH_RADIUS_M = 6_371_000
+POINT_PATTERN = r"POINT \((?P<lon>[-+\d.eE]+) (?P<lat>[-+\d.eE]+)\)"
+
+
+def parse_points(points):
+    """Returns an (N, 2) float array of (lon, lat) parsed from WKT POINT strings."""
+    coords = pandas.Series(points).str.extract(POINT_PATTERN)
+    return coords.astype(float).to_numpy()
+
+
+class SquirrelGrid:
+    """Uniform grid index over (lon, lat) points for radius, bounding-box and density queries."""
+
+    def __init__(self, lon_lat, cell_size=50):
+        lon_lat = np.asarray(lon_lat, dtype=float).reshape(-1, 2)
+        self.cell_size = cell_size
+        valid = ~np.isnan(lon_lat).any(axis=1)
+        # Local equirectangular projection: fine for an area the size of a park or a city.
+        self.lon0, self.lat0 = np.nanmean(lon_lat, axis=0) if valid.any() else (0.0, 0.0)
+        self.cos_lat0 = np.cos(np.radians(self.lat0))
+        xy = self.to_metres(lon_lat[:, 0], lon_lat[:, 1])
+
+        if valid.any():
+            self.x_min, self.y_min = xy[valid].min(axis=0)
+            x_max, y_max = xy[valid].max(axis=0)
+            self.nx = int((x_max - self.x_min) // cell_size) + 1
+            self.ny = int((y_max - self.y_min) // cell_size) + 1
+        else:
+            # No sighting has coordinates: a grid without cells, every query returns no rows
+            self.x_min = self.y_min = 0.0
+            self.nx = self.ny = 0
+
+        rows = np.flatnonzero(valid)
+        ix, iy = self._cell_coords(xy[valid])
+        cell_ids = iy * self.nx + ix
+        order = np.argsort(cell_ids, kind="stable")
+
+        # CSR layout: points of cell c are at positions offsets[c]:offsets[c + 1]
+        self.rows = rows[order]
+        self.xy = xy[valid][order]
+        self.offsets = np.searchsorted(cell_ids[order], np.arange(self.nx * self.ny + 1))
+
+    @classmethod
+    def from_frame(cls, df, column="Lat/Long", cell_size=50):
+        """Builds the index from a census DataFrame. Returned rows are positions in df."""
+        return cls(parse_points(df[column]), cell_size=cell_size)
+
+    def to_metres(self, lon, lat):
+        """Projects lon/lat degrees to (x, y) metres relative to the centre of the data."""
+        x = EARTH_RADIUS_M * np.radians(np.asarray(lon, dtype=float) - self.lon0) * self.cos_lat0
+        y = EARTH_RADIUS_M * np.radians(np.asarray(lat, dtype=float) - self.lat0)
+        return np.column_stack([x, y])
+
+    def _cell_coords(self, xy):
+        ix = ((xy[:, 0] - self.x_min) // self.cell_size).astype(np.int64)
+        iy = ((xy[:, 1] - self.y_min) // self.cell_size).astype(np.int64)
+        return ix, iy
+
+    def _candidates(self, x_lo, y_lo, x_hi, y_hi):
+        """Returns positions (into self.xy) of every point in the cells overlapping the box."""
+        (ix0, ix1), (iy0, iy1) = self._cell_coords(np.array([[x_lo, y_lo], [x_hi, y_hi]]))
+        ix0, ix1 = max(ix0, 0), min(ix1, self.nx - 1)
+        iy0, iy1 = max(iy0, 0), min(iy1, self.ny - 1)
+        if ix0 > ix1 or iy0 > iy1:
+            return np.empty(0, dtype=np.int64)
+        # Cells ix0..ix1 of one grid row are contiguous, so each row is a single slice.
+        row_starts = np.arange(iy0, iy1 + 1) * self.nx
+        starts = self.offsets[row_starts + ix0]
+        stops = self.offsets[row_starts + ix1 + 1]
+        return np.concatenate([np.arange(a, b) for a, b in zip(starts, stops)])
+
+    def within_radius(self, lon, lat, radius_m):
+        """Returns the rows of the sightings within radius_m metres of (lon, lat)."""
+        cx, cy = self.to_metres(lon, lat)[0]
+        candidates = self._candidates(cx - radius_m, cy - radius_m, cx + radius_m, cy + radius_m)
+        dx = self.xy[candidates, 0] - cx
+        dy = self.xy[candidates, 1] - cy
+        return np.sort(self.rows[candidates[dx * dx + dy * dy <= radius_m * radius_m]])
+
+    def in_bbox(self, min_lon, min_lat, max_lon, max_lat):
+        """Returns the rows of the sightings inside the lon/lat bounding box."""
+        (x_lo, y_lo), (x_hi, y_hi) = self.to_metres([min_lon, max_lon], [min_lat, max_lat])
+        candidates = self._candidates(x_lo, y_lo, x_hi, y_hi)
+        x = self.xy[candidates, 0]
+        y = self.xy[candidates, 1]
+        inside = (x >= x_lo) & (x <= x_hi) & (y >= y_lo) & (y <= y_hi)
+        return np.sort(self.rows[candidates[inside]])
+
+    def density(self):
+        """Returns a (ny, nx) array with the number of sightings per grid cell (row 0 is south)."""
+        return np.diff(self.offsets).reshape(self.ny, self.nx)
+
+
+if __name__ == "__main__":
+    data = pandas.read_csv("squirrel_data_main.csv")
+    grid = SquirrelGrid.from_frame(data)
+
+    near_zoo = grid.within_radius(-73.9719, 40.7678, 200)
+    print(f"{len(near_zoo)} sightings within 200m of the Central Park Zoo")
+    print(data.iloc[near_zoo]["Primary Fur Color"].value_counts())
+
+    heatmap = grid.density()
+    print(f"Grid of {grid.ny}x{grid.nx} cells of {grid.cell_size}m, busiest cell has {heatmap.max()} sightings")
@@ -0,0 +1,157 @@
+"""
+Lazy pipeline for the questions main.py asks about salaries_by_college_major.csv.
+
+In main.py every step runs right away: .dropna() copies the frame, .insert() adds a column,
+and each question does a full .sort_values() only to keep the first 5 rows with .head().
+Here the steps are just recorded, and collect() runs an optimized plan:
+  - dropna and the derived columns are applied once, each derived column seeing the ones
+    before it,
+  - "sort then head" becomes .nlargest() / .nsmallest(), which only keep the top n rows,
+  - all the max/min lookups (.idxmax() / .idxmin()) share one pass over the numeric columns.
+
+    results = (
+        SalaryPipeline(df)
+        .dropna()
+        .with_column("Salary Diff", lambda d: d[P90] - d[P10], position=1)
+        .argmax("max_start", "Starting Median Salary")
+        .top("low_risk", "Salary Diff", ascending=True, columns=["Undergraduate Major", "Salary Diff"])
+        .collect()
+    )
+"""
+
+import numpy as np
+
+P10 = "Mid-Career 10th Percentile Salary"
+P90 = "Mid-Career 90th Percentile Salary"
+
+
+class SalaryPipeline:
+    """Records analysis steps on a DataFrame and only runs them on collect()."""
+
+    def __init__(self, df):
+        self.df = df
+        self.drop_missing = False
+        self.derived = []
+        self.extremes = []
+        self.tops = []
+
+    def dropna(self):
+        """Drops the rows with missing values, like DataFrame.dropna()."""
+        self.drop_missing = True
+        return self
+
+    def with_column(self, name, func, position=None):
+        """Adds a column computed as func(frame), like DataFrame.insert(position, name, ...)."""
+        self.derived.append((name, func, position))
+        return self
+
+    def argmax(self, name, column):
+        """Index label of the row with the largest value of column, like Series.idxmax()."""
+        self.extremes.append((name, column, "max"))
+        return self
+
+    def argmin(self, name, column):
+        """Index label of the row with the smallest value of column, like Series.idxmin()."""
+        self.extremes.append((name, column, "min"))
+        return self
+
+    def top(self, name, column, n=5, ascending=False, columns=None):
+        """First n rows of the frame sorted by column, like df.sort_values(column).head(n)."""
+        self.tops.append((name, column, n, ascending, columns))
+        return self
+
+    def explain(self):
+        """Returns the optimized plan, one step per line."""
+        plan = []
+        if self.drop_missing:
+            plan.append("filter rows with missing values")
+        if self.derived:
+            plan.append(f"build frame once with derived columns {[d[0] for d in self.derived]}")
+        if self.extremes:
+            columns = sorted({column for _, column, _ in self.extremes})
+            plan.append(f"one max/min pass over {columns}")
+        for name, column, n, ascending, _ in self.tops:
+            method = "nsmallest" if ascending else "nlargest"
+            plan.append(f"{name}: {method}({n}, {column!r})")
+        return "\n".join(plan)
+
+    def collect(self):
+        """Runs the plan. Returns a dict with every named result plus the final "frame"."""
+        frame = self._build_frame()
+        results = {"frame": frame}
+        results.update(self._extremes(frame))
+
+        for name, column, n, ascending, columns in self.tops:
+            # Partial selection instead of a full sort. keep="first" keeps ties in their
+            # original order, same as a stable sort followed by .head(n).
+            if ascending:
+                top = frame.nsmallest(n, column, keep="first")
+            else:
+                top = frame.nlargest(n, column, keep="first")
+            results[name] = top if columns is None else top[columns]
+        return results
+
+    def _build_frame(self):
+        df = self.df
+        if self.drop_missing:
+            df = df[df.notna().all(axis=1).to_numpy()]
+        if not self.derived:
+            return df
+
+        # Every func gets the frame with the columns derived before it. assign() adds a column
+        # without copying the others (copy on write), instead of one copy per .insert()
+        order = list(df.columns)
+        for name, func, position in self.derived:
+            df = df.assign(**{name: func(df)})
+            if name not in order:
+                order.insert(len(order) if position is None else position, name)
+        return df[order]
+
+    def _extremes(self, frame):
+        if not self.extremes:
+            return {}
+        columns = sorted({column for _, column, _ in self.extremes})
+        values = frame[columns].to_numpy(dtype=float)
+        max_positions = dict(zip(columns, np.nanargmax(values, axis=0)))
+        min_positions = dict(zip(columns, np.nanargmin(values, axis=0)))
+
+        results = {}
+        for name, column, kind in self.extremes:
+            positions = max_positions if kind == "max" else min_positions
+            results[name] = frame.index[positions[column]]
+        return results
+
+
+def salary_report(df):
+    """Runs the questions of main.py about the best, worst and riskiest majors."""
+    return (
+        SalaryPipeline(df)
+        .dropna()
+        .with_column("Salary Diff", lambda d: d[P90] - d[P10], position=1)
+        .argmax("max_starting", "Starting Median Salary")
+        .argmin("min_starting", "Starting Median Salary")
+        .argmax("max_mid_career", "Mid-Career Median Salary")
+        .argmin("min_mid_career", "Mid-Career Median Salary")
+        .top("low_risk", "Salary Diff", ascending=True, columns=["Undergraduate Major", "Salary Diff"])
+        .top("highest_potential", P90, columns=["Undergraduate Major", P90])
+        .top("highest_spread", "Salary Diff", columns=["Undergraduate Major", "Salary Diff"])
+        .collect()
+    )
+
+
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from common.csv_cache import read_csv
+
+    results = salary_report(read_csv("salaries_by_college_major.csv"))
+    majors = results["frame"]["Undergraduate Major"]
+    print(f"Highest starting salary: {majors[results['max_starting']]}")
+    print(f"Lowest starting salary: {majors[results['min_starting']]}")
+    print(f"Highest mid-career salary: {majors[results['max_mid_career']]}")
+    print(f"Lowest mid-career salary: {majors[results['min_mid_career']]}")
+    for name in ("low_risk", "highest_potential", "highest_spread"):
+        print("-----------------------------------")
+        print(results[name])
@@ -0,0 +1,134 @@
+"""
+Top-k, rank and percentile queries over the salary columns, overall and per Group.
+
+main.py answers "highest starting salary", "lowest risk" or "highest potential" with a full
+.sort_values() of clean_df every time. SalaryIndex sorts each salary column once when it is
+built (O(n log n)) and keeps the sorted values together with the row positions, both for the
+whole table and for each Group (rows of a group are a contiguous slice). After that:
+  - top(k) / bottom(k) just slice the first or last k positions: O(k),
+  - rank() and percentile() are a binary search over the sorted values: O(log n),
+  - band() returns the rows between two percentiles with two index computations.
+This scales to millions of (school, major) rows, where re-sorting per question is too slow.
+"""
+
+import numpy as np
+import pandas as pd
+
+from salary_pipeline import P10, P90
+
+SALARY_COLUMNS = ["Starting Median Salary", "Mid-Career Median Salary", P10, P90]
+
+
+class SortedColumn:
+    """Values of one column sorted ascending (missing values dropped) and their row positions.
+
+    descending has the row positions from the highest value to the lowest one, with equal
+    values in row order like in positions (not reversed)."""
+
+    def __init__(self, values, positions, descending):
+        self.values = values
+        self.positions = positions
+        self.descending = descending
+
+    def __len__(self):
+        return len(self.values)
+
+
+class SalaryIndex:
+    """Precomputed sort permutations of the salary columns, for the whole table and per group."""
+
+    def __init__(self, df, columns=SALARY_COLUMNS, group_column="Group"):
+        self.df = df
+        self.columns = list(columns)
+        self.group_column = group_column
+        self.overall = {}
+        self.by_group = {}
+
+        codes, self.groups = pd.factorize(df[group_column], sort=True)
+        for column in self.columns:
+            values = df[column].to_numpy(dtype=float)
+            # Rows without a group are in the overall index, not in any group
+            valid = np.flatnonzero(~np.isnan(values))
+            order = valid[np.argsort(values[valid], kind="stable")]
+            descending = valid[np.argsort(-values[valid], kind="stable")]
+            self.overall[column] = SortedColumn(values[order], order, descending)
+
+            # Sort by (group, value): each group becomes one contiguous, sorted slice.
+            valid = valid[codes[valid] >= 0]
+            order = valid[np.lexsort((values[valid], codes[valid]))]
+            descending = valid[np.lexsort((-values[valid], codes[valid]))]
+            starts = np.searchsorted(codes[order], np.arange(len(self.groups) + 1))
+            self.by_group[column] = {
+                group: SortedColumn(values[order[a:b]], order[a:b], descending[a:b])
+                for group, a, b in zip(self.groups, starts[:-1], starts[1:])
+            }
+
+    def _sorted(self, column, group=None):
+        if column not in self.overall:
+            raise KeyError(f"{column!r} is not indexed. Indexed columns: {self.columns}")
+        if group is None:
+            return self.overall[column]
+        if group not in self.by_group[column]:
+            raise KeyError(f"Unknown {self.group_column} {group!r}")
+        return self.by_group[column][group]
+
+    def top(self, column, k=5, group=None):
+        """Returns the k rows with the highest values of column, highest first (equal values in
+        row order)."""
+        return self.df.iloc[self._sorted(column, group).descending[:k]]
+
+    def bottom(self, column, k=5, group=None):
+        """Returns the k rows with the lowest values of column, lowest first."""
+        return self.df.iloc[self._sorted(column, group).positions[:k]]
+
+    def rank(self, column, value, group=None):
+        """Returns the rank value would have from the top: 1 means higher than every row."""
+        sorted_column = self._sorted(column, group)
+        return len(sorted_column) - np.searchsorted(sorted_column.values, value, side="right") + 1
+
+    def percentile(self, column, value, group=None):
+        """Returns the percentage of rows with a value lower than or equal to value."""
+        sorted_column = self._sorted(column, group)
+        if not len(sorted_column):
+            return np.nan
+        return 100 * np.searchsorted(sorted_column.values, value, side="right") / len(sorted_column)
+
+    def value_at(self, column, pct, group=None):
+        """Returns the value at percentile pct, the nearest rank without interpolation: like
+        Series.quantile(pct / 100, interpolation="nearest"). NaN for an empty group."""
+        values = self._sorted(column, group).values
+        position = self._position(pct, len(values))
+        return values[position] if len(values) else np.nan
+
+    def band(self, column, low_pct, high_pct, group=None):
+        """Returns the rows between the low_pct and high_pct percentiles of column, sorted."""
+        sorted_column = self._sorted(column, group)
+        n = len(sorted_column)
+        start = self._position(low_pct, n)
+        stop = self._position(high_pct, n) + 1
+        return self.df.iloc[sorted_column.positions[start:stop]]
+
+    @staticmethod
+    def _position(pct, n):
+        if not 0 <= pct <= 100:
+            raise ValueError(f"Percentile must be between 0 and 100, got {pct}")
+        return min(int(round(pct / 100 * (n - 1))), n - 1)
+
+
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from common.csv_cache import read_csv
+
+    clean_df = read_csv("salaries_by_college_major.csv").dropna()
+    clean_df.insert(1, "Salary Diff", clean_df[P90] - clean_df[P10])
+    index = SalaryIndex(clean_df, columns=SALARY_COLUMNS + ["Salary Diff"])
+
+    print(index.top("Starting Median Salary", 1)["Undergraduate Major"])
+    print(index.bottom("Salary Diff")[["Undergraduate Major", "Salary Diff"]])
+    print(index.top(P90, group="STEM")[["Undergraduate Major", P90]])
+    print(f"A 60,000 starting salary ranks #{index.rank('Starting Median Salary', 60000)}")
+    print(f"and is above {index.percentile('Starting Median Salary', 60000):.0f}% of the majors")
+    print(index.band("Mid-Career Median Salary", 45, 55, group="Business")[["Undergraduate Major"]])
@@ -0,0 +1,77 @@
+"""
+Benchmark: KeyIndex lookups vs pd.merge() for sets.theme_id -> themes.
+
+Both tables are scaled up by copying them 1x, 10x and 100x (each copy of themes gets new ids,
+and the matching copy of sets points to them). For each size we time:
+  - pd.merge(sets, themes, left_on="theme_id", right_on="id") for the theme name and parent,
+  - building the KeyIndex of themes (done once, then reused),
+  - the same lookup answered by KeyIndex.take().
+
+Run it from this folder: python benchmark_join.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from key_index import KeyIndex
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.csv_cache import read_csv
+
+SCALES = [1, 10, 100]
+REPEAT = 5
+
+
+def scale_tables(sets, themes, factor):
+    """Returns factor copies of sets and themes, with the theme ids shifted in every copy."""
+    id_step = int(themes.id.max()) + 1
+    offsets = np.repeat(np.arange(factor) * id_step, len(themes))
+    big_themes = pd.DataFrame({
+        "id": np.tile(themes.id.to_numpy(dtype=np.int64), factor) + offsets,
+        "name": np.tile(themes.name.to_numpy(dtype=object), factor),
+        "parent_id": np.tile(themes.parent_id.to_numpy(), factor) + offsets,
+    })
+    set_offsets = np.repeat(np.arange(factor) * id_step, len(sets))
+    big_sets = pd.DataFrame({
+        "set_num": np.tile(sets.set_num.to_numpy(dtype=object), factor),
+        "theme_id": np.tile(sets.theme_id.to_numpy(dtype=np.int64), factor) + set_offsets,
+        "num_parts": np.tile(sets.num_parts.to_numpy(), factor),
+    })
+    return big_sets, big_themes
+
+
+def best_time(func):
+    return min(timeit.repeat(func, number=1, repeat=REPEAT))
+
+
+def main():
+    sets = read_csv("data/sets.csv")
+    themes = read_csv("data/themes.csv")
+    columns = ["name", "parent_id"]
+
+    print(f"{'scale':>6} {'sets':>10} {'merge':>10} {'build':>10} {'take':>10} {'speedup':>8}")
+    for factor in SCALES:
+        big_sets, big_themes = scale_tables(sets, themes, factor)
+
+        def merge():
+            return pd.merge(big_sets[["theme_id"]], big_themes, how="left",
+                            left_on="theme_id", right_on="id")[columns]
+
+        index = KeyIndex(big_themes)
+        merged = merge()
+        taken = index.take(big_sets.theme_id, columns)
+        assert (merged.name.to_numpy() == taken.name.to_numpy()).all()
+
+        merge_time = best_time(merge)
+        build_time = best_time(lambda: KeyIndex(big_themes))
+        take_time = best_time(lambda: index.take(big_sets.theme_id, columns))
+        print(f"{factor:>5}x {len(big_sets):>10} {merge_time * 1000:>8.2f}ms "
+              f"{build_time * 1000:>8.2f}ms {take_time * 1000:>8.2f}ms {merge_time / take_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Primary key index for the LEGO tables, to answer foreign key lookups without pd.merge().
+
+themes.id and colors.id are primary keys: unique per row. sets.theme_id is a foreign key to
+themes.id. main.py joins them with pd.merge(), which builds a hash table of the keys and a new
+merged DataFrame every time it is called.
+
+KeyIndex builds the key -> row position mapping once per table:
+  - small integer keys (like our ids) use a plain array: position = lookup[key - min_key],
+  - any other key uses the sorted keys and a binary search.
+Looking up a whole foreign key column is then one vectorized np.take per requested column.
+
+    themes_index = KeyIndex(themes)
+    sets["theme_name"] = themes_index.lookup(sets.theme_id, "name")
+    sets_with_themes = themes_index.take(sets.theme_id, ["name", "parent_id"])
+"""
+
+import numpy as np
+import pandas as pd
+
+# Use the direct array lookup when the key range is at most this many times the number of rows.
+MAX_DENSE_RATIO = 8
+
+
+class KeyIndex:
+    """Maps the primary key of a table to row positions, and looks up columns by foreign key."""
+
+    def __init__(self, table, key="id"):
+        self.table = table
+        self.key = key
+        keys = table[key].to_numpy()
+        if pd.Index(keys).has_duplicates:
+            raise ValueError(f"{key!r} is not a primary key: it has duplicated values")
+        self._columns = {}
+
+        self.dense = (
+            np.issubdtype(keys.dtype, np.integer)
+            and len(keys) > 0
+            and int(keys.max()) - int(keys.min()) + 1 <= MAX_DENSE_RATIO * len(keys) + 1024
+        )
+        if self.dense:
+            self.min_key = int(keys.min())
+            self.lookup_table = np.full(int(keys.max()) - self.min_key + 1, -1, dtype=np.int64)
+            self.lookup_table[keys.astype(np.int64) - self.min_key] = np.arange(len(keys))
+        else:
+            self.sort_order = np.argsort(keys, kind="stable")
+            self.sorted_keys = keys[self.sort_order]
+
+    def positions(self, foreign_keys):
+        """Returns the row position of each foreign key, -1 where the key doesn't exist."""
+        foreign_keys = np.asarray(foreign_keys)
+        if self.dense:
+            if np.issubdtype(foreign_keys.dtype, np.integer):
+                offsets = foreign_keys.astype(np.int64) - self.min_key
+            else:
+                # e.g. parent_id is float because of NaN: only whole numbers can match
+                keys = foreign_keys.astype(float)
+                whole = np.isfinite(keys) & (keys == np.floor(keys))
+                offsets = np.where(whole, keys, self.min_key - 1).astype(np.int64) - self.min_key
+            inside = (offsets >= 0) & (offsets < len(self.lookup_table))
+            return np.where(inside, self.lookup_table[np.where(inside, offsets, 0)], -1)
+
+        if not len(self.sorted_keys):
+            return np.full(len(foreign_keys), -1, dtype=np.int64)
+        found = np.minimum(np.searchsorted(self.sorted_keys, foreign_keys), len(self.sorted_keys) - 1)
+        return np.where(self.sorted_keys[found] == foreign_keys, self.sort_order[found], -1)
+
+    def _column(self, column):
+        # Column arrays are extracted once and reused by every lookup. Text columns are kept as
+        # categorical codes: taking small integers is much cheaper than taking Python strings.
+        if column not in self._columns:
+            series = self.table[column]
+            if pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+                self._columns[column] = series.to_numpy()
+            else:
+                self._columns[column] = pd.Categorical(series)
+        return self._columns[column]
+
+    def lookup(self, foreign_keys, column, positions=None):
+        """Returns column's value for each foreign key (NaN where the key doesn't exist).
+
+        Numeric columns come back as a NumPy array, text columns as a pandas Categorical.
+        """
+        if positions is None:
+            positions = self.positions(foreign_keys)
+        values = self._column(column)
+        if isinstance(values, pd.Categorical):
+            # Code -1 is a missing value, which is exactly what a missing key should give.
+            codes = np.where(positions < 0, -1, values.codes.take(positions, mode="clip"))
+            return pd.Categorical.from_codes(codes, dtype=values.dtype)
+
+        values = values.take(positions, mode="clip")
+        missing = positions < 0
+        if missing.any():
+            values = values.astype(float if values.dtype.kind in "iub" else object)
+            values[missing] = np.nan
+        return values
+
+    def take(self, foreign_keys, columns):
+        """Returns a DataFrame with the requested columns looked up for each foreign key."""
+        positions = self.positions(foreign_keys)
+        index = foreign_keys.index if isinstance(foreign_keys, pd.Series) else None
+        return pd.DataFrame(
+            {column: self.lookup(None, column, positions) for column in columns}, index=index
+        )
@@ -0,0 +1,195 @@
+"""
+LEGO colour palette: hex decoding, Lab colour space and nearest colour lookups.
+
+colors.csv stores each colour as a hex string ("05131D"). LegoPalette decodes all of them at
+once into a (N, 3) uint8 array, converts them to CIE Lab (where the euclidean distance is close
+to how different two colours look) and builds a KD-tree over the Lab values, so
+"what's the closest LEGO colour to this RGB?" visits O(log n) nodes instead of every colour.
+
+map_image() maps every pixel of an image to its closest palette colour. Photos have many
+repeated pixels, so we only solve the unique colours (np.unique over the packed 24-bit values)
+and scatter the answers back to the pixels. The unique colours go down the KD-tree together
+(KDTree.query_many()): every node is visited once with the array of queries that reach it.
+"""
+
+import numpy as np
+
+# sRGB (D65) -> CIE XYZ matrix and D65 white point
+RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+WHITE_D65 = np.array([0.95047, 1.0, 1.08883])
+
+
+def decode_hex(hex_colors):
+    """Returns an (N, 3) uint8 array from hex strings like "05131D"."""
+    joined = "".join(str(color) for color in hex_colors)
+    return np.frombuffer(bytes.fromhex(joined), dtype=np.uint8).reshape(-1, 3)
+
+
+def rgb_to_lab(rgb):
+    """Converts an (..., 3) array of 0-255 sRGB values to CIE Lab."""
+    srgb = np.asarray(rgb, dtype=np.float64) / 255
+    linear = np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ RGB_TO_XYZ.T / WHITE_D65
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    lightness = 116 * f[..., 1] - 16
+    a = 500 * (f[..., 0] - f[..., 1])
+    b = 200 * (f[..., 1] - f[..., 2])
+    return np.stack([lightness, a, b], axis=-1)
+
+
+class KDTree:
+    """Static KD-tree for nearest neighbour queries over a small (N, k) array of points."""
+
+    def __init__(self, points, leaf_size=8):
+        self.points = np.asarray(points, dtype=np.float64)
+        self.leaf_size = leaf_size
+        # Nodes are stored in flat lists: split axis/value, children, and a slice of self.order
+        self.order = np.arange(len(self.points))
+        self.axis, self.split, self.left, self.right, self.start, self.stop = [], [], [], [], [], []
+        self._build(0, len(self.points))
+
+    def _build(self, start, stop):
+        node = len(self.axis)
+        for values in (self.axis, self.split, self.left, self.right):
+            values.append(-1)
+        self.start.append(start)
+        self.stop.append(stop)
+        if stop - start <= self.leaf_size:
+            self.order[start:stop].sort()  # ties go to the lowest index, like np.argmin()
+            return node
+
+        points = self.points[self.order[start:stop]]
+        axis = int(np.argmax(points.max(axis=0) - points.min(axis=0)))  # widest spread
+        middle = (stop - start) // 2
+        partition = np.argpartition(points[:, axis], middle)
+        self.order[start:stop] = self.order[start:stop][partition]
+        self.axis[node] = axis
+        self.split[node] = self.points[self.order[start + middle], axis]
+        self.left[node] = self._build(start, start + middle)
+        self.right[node] = self._build(start + middle, stop)
+        return node
+
+    def query(self, point):
+        """Returns (index, distance) of the point closest to point."""
+        point = np.asarray(point, dtype=np.float64)
+        best_index, best_distance = -1, np.inf
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if bound >= best_distance:
+                continue
+            if self.axis[node] < 0:
+                candidates = self.order[self.start[node]:self.stop[node]]
+                distances = np.sqrt(((self.points[candidates] - point) ** 2).sum(axis=1))
+                closest = int(np.argmin(distances))
+                if distances[closest] < best_distance:
+                    best_index, best_distance = int(candidates[closest]), float(distances[closest])
+                continue
+            offset = point[self.axis[node]] - self.split[node]
+            near, far = (self.left[node], self.right[node]) if offset < 0 else (self.right[node], self.left[node])
+            # Push the far side first so the near side is explored first
+            stack.append((far, abs(offset)))
+            stack.append((near, bound))
+        return best_index, best_distance
+
+    def query_many(self, points):
+        """Returns (indices, distances) of the points closest to each row of an (M, k) array."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, self.points.shape[1])
+        best_index = np.full(len(points), -1, dtype=np.int64)
+        best_distance = np.full(len(points), np.inf)
+        # Same walk as query(), for arrays of queries: (node, query positions, their bounds)
+        stack = [(0, np.arange(len(points)), np.zeros(len(points)))]
+        while stack:
+            node, queries, bounds = stack.pop()
+            keep = bounds <= best_distance[queries]
+            queries, bounds = queries[keep], bounds[keep]
+            if not len(queries):
+                continue
+            if self.axis[node] < 0:
+                candidates = self.order[self.start[node]:self.stop[node]]
+                differences = points[queries, None, :] - self.points[candidates][None, :, :]
+                distances = np.sqrt((differences ** 2).sum(axis=2))
+                closest = np.argmin(distances, axis=1)
+                distances = distances[np.arange(len(queries)), closest]
+                better = (distances < best_distance[queries]) | (
+                    (distances == best_distance[queries]) & (candidates[closest] < best_index[queries]))
+                best_index[queries[better]] = candidates[closest[better]]
+                best_distance[queries[better]] = distances[better]
+                continue
+            offset = points[queries, self.axis[node]] - self.split[node]
+            left = offset < 0
+            # Far sides first so the near sides are explored first
+            stack.append((self.right[node], queries[left], np.abs(offset[left])))
+            stack.append((self.left[node], queries[~left], np.abs(offset[~left])))
+            stack.append((self.left[node], queries[left], bounds[left]))
+            stack.append((self.right[node], queries[~left], bounds[~left]))
+        return best_index, best_distance
+
+
+class LegoPalette:
+    """The LEGO colours of colors.csv, with nearest colour lookups in Lab space."""
+
+    def __init__(self, colors, include_transparent=False):
+        if not include_transparent:
+            colors = colors[~colors["is_trans"].astype(str).str.lower().isin(["t", "true"]).to_numpy()]
+        self.ids = colors["id"].to_numpy()
+        self.names = colors["name"].to_numpy(dtype=object)
+        self.rgb = decode_hex(colors["rgb"])
+        self.lab = rgb_to_lab(self.rgb)
+        self.tree = KDTree(self.lab)
+
+    def nearest(self, rgb):
+        """Returns (id, name, Lab distance) of the LEGO colour closest to an (r, g, b) colour."""
+        index, distance = self.tree.query(rgb_to_lab(rgb))
+        return self.ids[index], self.names[index], distance
+
+    def nearest_indices(self, rgb):
+        """Returns the palette index closest to each colour of an (N, 3) array, with the KD-tree."""
+        return self.tree.query_many(rgb_to_lab(rgb))[0]
+
+    def map_image(self, image):
+        """Returns an (H, W) array with the palette index of every pixel of an RGB(A) or grayscale
+        image, with values in 0-255 or, for float images (plt.imread() of a PNG), in 0-1."""
+        pixels = np.asarray(image)
+        if pixels.ndim == 2:
+            pixels = pixels[..., None]
+        # Grayscale (with or without alpha): the gray value on all three channels
+        pixels = pixels[..., :3] if pixels.shape[-1] >= 3 else np.repeat(pixels[..., :1], 3, axis=-1)
+        if pixels.dtype.kind == "f":
+            pixels = np.rint(np.clip(pixels, 0, 1) * 255)
+        pixels = pixels.reshape(-1, 3).astype(np.uint32)
+        packed = (pixels[:, 0] << 16) | (pixels[:, 1] << 8) | pixels[:, 2]
+        unique, inverse = np.unique(packed, return_inverse=True)
+        unique_rgb = np.stack([unique >> 16, (unique >> 8) & 255, unique & 255], axis=1)
+        return self.nearest_indices(unique_rgb)[inverse.ravel()].reshape(np.shape(image)[:2])
+
+    def recolor(self, image):
+        """Returns the image redrawn with LEGO colours only."""
+        return self.rgb[self.map_image(image)]
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from pathlib import Path
+
+    import matplotlib.pyplot as plt
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from common.csv_cache import read_csv
+
+    palette = LegoPalette(read_csv("data/colors.csv"))
+    print(palette.nearest((200, 30, 40)))
+
+    image = plt.imread("assets/bricks.jpg")
+    start = time.perf_counter()
+    indices = palette.map_image(image)
+    elapsed = time.perf_counter() - start
+    print(f"Mapped {image.shape[0] * image.shape[1]:,} pixels in {elapsed:.2f}s")
+    counts = np.bincount(indices.ravel(), minlength=len(palette.names))
+    for index in np.argsort(counts)[::-1][:5]:
+        print(f"  {palette.names[index]}: {counts[index] / indices.size:.1%}")
@@ -15,285 +15,336 @@ How to create scatter plots, bar charts, and line charts with two axes in Matplo
 Understand database schemas that are organised by primary and foreign keys.
 How to merge DataFrames that share a common key
 
-NOTE: If you want to see plots, uncomment plot and scatter lines
+NOTE: The charts are drawn with common/charts.py. They open in a window when there is a display,
+otherwise (or with CHARTS_DIR=some/folder) they are saved as PNG/SVG files at the end of the script.
+If you want to see the other plots, uncomment the plot and scatter lines
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
-
-colors = pd.read_csv("data/colors.csv")
-
-"""
-   id            name     rgb is_trans
-0  -1         Unknown  0033B2        f
-1   0           Black  05131D        f
-...
-"""
-
-##### How many colors do we have? #####
-len_of_colors_df = len(colors)
-print(f"There are {len_of_colors_df} different colors")
-# Same. Unique count for each column
-un = colors.nunique() # <class 'pandas.core.series.Series'>
-"""
-id          135
-name        135
-rgb         124
-is_trans      2
-"""
-print(f"There are {un.id} different colors")
-# Same. Count number of names
-num_of_colours = colors['name'].nunique()
-
-##### How many are transparent and how many opaque? #####
-transparency_count = colors.groupby(['is_trans']).count()
-"""
-is_trans  id  name  rgb
-f         107   107  107
-t          28    28   28
-"""
-transparency_count_dict = transparency_count.id.to_dict()
-print(f"There are {transparency_count_dict['f']} opaque colours and {transparency_count_dict['t']} transparent")
-print(f"There are {transparency_count.id.f} opaque colours and {transparency_count.id.t} transparent")
-# Same. value_counts: Return a Series containing counts of unique values.
-is_trans_count = colors.is_trans.value_counts()
-print(is_trans_count)
-"""
-is_trans
-f    107
-t     28
-Name: count, dtype: int64
-"""
-
-############################################################
-############################################################
-############################################################
-print("-----------------------------------------------------")
-
-sets = pd.read_csv("data/sets.csv")
-print(sets.head())
-"""
-  set_num                        name  year  theme_id  num_parts
-0   001-1                       Gears  1965         1         43
-1  0011-2           Town Mini-Figures  1978        84         12
-2  0011-3  Castle 2 for 1 Bonus Offer  1987       199          0
-3  0012-1          Space Mini-Figures  1979       143         12
-4  0013-1          Space Mini-Figures  1979       143         12
-"""
-min_year = sets.year.min() # 1949
-min_year_2 = sets.sort_values('year').year.values[0]
-min_year_3 = sets.loc[sets.year.idxmin()].year  # this may not be just one value in case of not unique values?
-min_year_4 = sets.loc[sets.year.idxmin(), "year"]
-print(min_year, min_year_2, min_year_3, min_year_4)
-
-print("\n--- All LEGOs in the first year")
-all_legos_first_year = sets[sets.year == min_year]
-print(all_legos_first_year)
-
-print("\n--- LEGO with more parts")
-sets.sort_values("num_parts", ascending=False).head()
-
-############################################################
-################# Sets by year, and plot result ############
-############################################################
-
-print("\n--- Sets by year")
-sets_by_year = sets.groupby("year")
-sets_by_year_count = sets_by_year.count()
-print(sets_by_year_count.set_num)
-#plt.plot(sets_by_year_count.index, sets_by_year_count.set_num)
-# Take out last value, because 2021 year info is wrong
-#plt.plot(sets_by_year_count.index[:-1], sets_by_year_count.set_num[:-1])
-#plt.title("Sets released by year")
-# This is needed so we can see when we ran in bash, and image does not close automatically
-plt.show(block=True)
-
-############################################################
-############# Aggregate functions ##########################
-############################################################
-
-# We want to calculate the number of different themes by calendar year
-# This means we have to group the data by year and then count the number of unique theme_ids for that year
-
-# Agg takes a dict as an arg. And we specify wich operation to apply to each column
-# In our case, we just want to calculate the number of unique entries in the theme_id column
-# by using our old friend, the .nunique() method.
-
-# Number of themes by year
-print("\n--- Themes by year")
-themes_by_year = sets.groupby("year").agg({'theme_id': pd.Series.nunique})
-
-# Rename column
-themes_by_year.rename(columns={"theme_id":"themes_count"}, inplace=True)
-print(themes_by_year)
-#plt.plot(themes_by_year.index[:-1], themes_by_year.themes_count[:-1])
-#plt.title("Themes released by year")
-#plt.show(block=True)
-
-############# Plot both in same graph ######################
-
-"""
-The problem is that they have very different scale in the Y axis
-The theme number ranges between 0 and 90, while the number of sets ranges between 0 and 900.
-So what can we do?
-
-We need to be able to configure and plot our data on two separate axes on the same chart.
-This involves getting hold of an axis object from Matplotlib.
-"""
-ax1 = plt.gca()   # get current axis
-ax2 = ax1.twinx() # By using the .twinx() method allows ax1 and ax2 to share the same x-axis
-
-#ax1.plot(sets_by_year_count.index[:-1], sets_by_year_count.set_num[:-1], color='g')
-#ax2.plot(themes_by_year.index[:-1], themes_by_year.themes_count[:-1], 'b')
-ax1.set_xlabel("Year")
-ax1.set_ylabel("Number of sets", color="green")
-ax2.set_ylabel("Number of themes", color="blue")
-plt.title("Themes and Sets released by year")
-#plt.show(block=True)
-
-############# Average ######################
-
-# Has the year as the index and contains the average number of parts per LEGO set in that year
-print("\n--- Avergate parts per set in each year")
-parts_per_set = sets.groupby("year").agg({'num_parts': pd.Series.mean})
-print(parts_per_set)
-
-# Scatter plot: simply uses dots to represent the values of each data point.
-#plt.scatter(themes_by_year.index[:-1], themes_by_year.themes_count[:-1])
-#plt.title("Themes released by year")
-#plt.show(block=True)
-
-
-##############################################################
-### Relational Database Schemas: Primary and Foreign Keys ####
-##############################################################
-
-# Number of Sets per LEGO Theme
-# But we have no idea which theme is, we just see the id
-print("\n--- set_theme_count")
-set_theme_count = sets.theme_id.value_counts()
-print(set_theme_count)
-"""
-theme_id
-158    753
-501    656
-      ...
-414      1
-Name: count, Length: 571, dtype: int64
-"""
+import sys
+from pathlib import Path
 
-"""
-The themes.csv file has the actual theme names.
-How is this table linked to the others tables? Well,
-the sets .csv has theme_ids which match the id column in the themes.csv.
-
-This means that the theme_id is the foreign key inside the sets.csv.
-Many different sets can be part of the same theme.
-But inside the themes.csv, each theme_id, which is just called id is unique.
-This uniqueness makes the id column the primary key inside the themes.csv.
-To see this in action, explore the themes.csv.
-"""
-
-print("\n--- Themes structure")
-themes = pd.read_csv("data/themes.csv")
-print(themes.head())
-"""
-   id            name  parent_id
-0   1         Technic        NaN
-1   2  Arctic Technic        1.0
-2   3     Competition        1.0
-"""
-
-print("\n--- Star wars themes")
-print(themes[themes.name == "Star Wars"])
-"""
-      id       name  parent_id
-17    18  Star Wars        1.0
-150  158  Star Wars        NaN
-174  209  Star Wars      207.0
-211  261  Star Wars      258.0
-"""
-
-print("\n--- Sets with star wars themes")
-sw_theme_ids = themes[themes.name == "Star Wars"].id.values  # array([ 18, 158, 209, 261])
-print(sets[sets.theme_id.isin(sw_theme_ids)])
-"""
-           set_num                                               name  year  theme_id  num_parts
-850        11912-1                Star Wars: Build Your Own Adventure  2016       158         73
-855        11920-1  Parts for Star Wars Build Your Own Adventure: ...  2019       158         70
-1717       20006-1                            Clone Turbo Tank - Mini  2008       158         64
-1728       20007-1                     Republic Attack Cruiser - Mini  2009       158         84
-1738       20009-1                                AT-TE Walker - Mini  2009       158         94
-...            ...                                                ...   ...       ...        ...
-15686         VP-4            Star Wars Co-Pack of 7101 7111 and 7171  2000       158          0
-15689         VP-8                 Star Wars Co-Pack of 7130 and 7150  2000       158          0
-15707      XWING-1                                Mini X-Wing Fighter  2019       158         60
-15708      XWING-2                                  X-Wing Trench Run  2019       158         52
-15709  YODACHRON-1                    Yoda Chronicles Promotional Set  2013       158        413
-"""
-
-##############################################################
-############### Merge DataFrames #############################
-##############################################################
-
-"""
-The .merge() method to combine two separate DataFrames into one.
-The merge method works on columns with the same name in both DataFrames
-"""
-
-# Convert series into DF
-set_theme_count = pd.DataFrame({
-  "id": set_theme_count.index,
-  "set_count": set_theme_count.values
-})
-"""
-    id    set_count
- 0  158    753   
- 1 . . .
-"""
-
-"""
-To .merge() two DataFrame along a particular column, we need to provide our two DataFrames
-and then the column name on which to merge. This is why we set on='id'.
-Both our set_theme_count and our themes DataFrames have a column with this name.
-"""
-print("\n--- Merged themes info")
-# Order matters, merge will be in the order of id "id" of the first arg of merge
-# so if set_theme_count is ordered some way, it will respect that order
-# in this case, set_count descending
-merged_df = pd.merge(set_theme_count, themes , on='id')
-print(merged_df[:3])
-
-##### Plot
-
-plt.figure(figsize=(14,8))
-plt.xticks(fontsize=14, rotation=45)
-plt.yticks(fontsize=14)
-plt.ylabel('Nr of sets', fontsize=14)
-plt.xlabel('Theme', fontsize=14)
-plt.bar(merged_df.name[:10], merged_df.set_count[:10])
-
-
-"""
-In this lesson we looked at how to:
-
-  combine the groupby() and count() functions to aggregate data
-
-  use the .value_counts() function
-
-  slice DataFrames using the square bracket notation e.g., df[:-2] or df[:10]
-
-  use the .agg() function to run an operation on a particular column
-
-  rename() columns of DataFrames
-
-  create a line chart with two separate axes to visualise data that have different scales.
-
-  create a scatter plot in Matplotlib
-
-  work with tables in a relational database by using primary and foreign keys
-
-  .merge() DataFrames along a particular column
+import pandas as pd
 
-  create a bar chart with Matplotlib  
-"""
\ No newline at end of file
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.charts import Chart, ChartReport
+from common.csv_cache import read_csv
+from key_index import KeyIndex
+from theme_hierarchy import ThemeHierarchy
+from year_stats import YearStats
+
+
+def main():
+    colors = read_csv("data/colors.csv", optimize={"parse_booleans": False})  # is_trans stays "t"/"f"
+
+    """
+       id            name     rgb is_trans
+    0  -1         Unknown  0033B2        f
+    1   0           Black  05131D        f
+    ...
+    """
+
+    ##### How many colors do we have? #####
+    len_of_colors_df = len(colors)
+    print(f"There are {len_of_colors_df} different colors")
+    # Same. Unique count for each column
+    un = colors.nunique() # <class 'pandas.core.series.Series'>
+    """
+    id          135
+    name        135
+    rgb         124
+    is_trans      2
+    """
+    print(f"There are {un.id} different colors")
+    # Same. Count number of names
+    num_of_colours = colors['name'].nunique()
+
+    ##### How many are transparent and how many opaque? #####
+    transparency_count = colors.groupby(['is_trans']).count()
+    """
+    is_trans  id  name  rgb
+    f         107   107  107
+    t          28    28   28
+    """
+    transparency_count_dict = transparency_count.id.to_dict()
+    print(f"There are {transparency_count_dict['f']} opaque colours and {transparency_count_dict['t']} transparent")
+    print(f"There are {transparency_count.id.f} opaque colours and {transparency_count.id.t} transparent")
+    # Same. value_counts: Return a Series containing counts of unique values.
+    is_trans_count = colors.is_trans.value_counts()
+    print(is_trans_count)
+    """
+    is_trans
+    f    107
+    t     28
+    Name: count, dtype: int64
+    """
+
+    ############################################################
+    ############################################################
+    ############################################################
+    print("-----------------------------------------------------")
+
+    # optimize shrinks the dtypes (common/dtypes.py), report prints the memory it saved
+    sets = read_csv("data/sets.csv", optimize=True, report=True)
+    print(sets.head())
+    """
+      set_num                        name  year  theme_id  num_parts
+    0   001-1                       Gears  1965         1         43
+    1  0011-2           Town Mini-Figures  1978        84         12
+    2  0011-3  Castle 2 for 1 Bonus Offer  1987       199          0
+    3  0012-1          Space Mini-Figures  1979       143         12
+    4  0013-1          Space Mini-Figures  1979       143         12
+    """
+    min_year = sets.year.min() # 1949
+    min_year_2 = sets.sort_values('year').year.values[0]
+    min_year_3 = sets.loc[sets.year.idxmin()].year  # this may not be just one value in case of not unique values?
+    min_year_4 = sets.loc[sets.year.idxmin(), "year"]
+    print(min_year, min_year_2, min_year_3, min_year_4)
+
+    print("\n--- All LEGOs in the first year")
+    all_legos_first_year = sets[sets.year == min_year]
+    print(all_legos_first_year)
+
+    print("\n--- LEGO with more parts")
+    sets.sort_values("num_parts", ascending=False).head()
+
+    ############################################################
+    ################# Sets by year, and plot result ############
+    ############################################################
+
+    print("\n--- Sets by year")
+    sets_by_year = sets.groupby("year")
+    sets_by_year_count = sets_by_year.count()
+    print(sets_by_year_count.set_num)
+    #plt.plot(sets_by_year_count.index, sets_by_year_count.set_num)
+    # Take out last value, because 2021 year info is wrong
+    #plt.plot(sets_by_year_count.index[:-1], sets_by_year_count.set_num[:-1])
+    #plt.title("Sets released by year")
+    # plt.show(block=True) is needed so we can see when we ran in bash, and image does not close
+    # automatically. A ChartReport shows the chart the same way, or just queues it when there is no
+    # display, so the script doesn't stop until the window is closed.
+    # Like the plots above, the chart is left empty:
+    #sets_chart.line(sets_by_year_count.index[:-1], sets_by_year_count.set_num[:-1])
+    #sets_chart.title = "Sets released by year"
+    report = ChartReport()
+    sets_chart = Chart("sets_by_year")
+    report.show(sets_chart)
+
+    ############################################################
+    ############# Aggregate functions ##########################
+    ############################################################
+
+    # We want to calculate the number of different themes by calendar year
+    # This means we have to group the data by year and then count the number of unique theme_ids for that year
+
+    # Agg takes a dict as an arg. And we specify wich operation to apply to each column
+    # In our case, we just want to calculate the number of unique entries in the theme_id column
+    # by using our old friend, the .nunique() method.
+
+    # Number of themes by year
+    print("\n--- Themes by year")
+    themes_by_year = sets.groupby("year").agg({'theme_id': pd.Series.nunique})
+
+    # Rename column
+    themes_by_year.rename(columns={"theme_id":"themes_count"}, inplace=True)
+    print(themes_by_year)
+    #plt.plot(themes_by_year.index[:-1], themes_by_year.themes_count[:-1])
+    #plt.title("Themes released by year")
+    #plt.show(block=True)
+
+    ############# Plot both in same graph ######################
+
+    """
+    The problem is that they have very different scale in the Y axis
+    The theme number ranges between 0 and 90, while the number of sets ranges between 0 and 900.
+    So what can we do?
+
+    We need to be able to configure and plot our data on two separate axes on the same chart.
+    This involves getting hold of an axis object from Matplotlib.
+    """
+    # With pyplot:
+    #   ax1 = plt.gca()   # get current axis
+    #   ax2 = ax1.twinx() # By using the .twinx() method allows ax1 and ax2 to share the same x-axis
+    #   ax1.plot(sets_by_year_count.index[:-1], sets_by_year_count.set_num[:-1], color='g')
+    #   ax2.plot(themes_by_year.index[:-1], themes_by_year.themes_count[:-1], 'b')
+    # A Chart has the same two axes: "left" is ax1 and "right" is ax2
+    sets_themes_chart = Chart("themes_and_sets_by_year", title="Themes and Sets released by year", xlabel="Year")
+    #sets_themes_chart.line(sets_by_year_count.index[:-1], sets_by_year_count.set_num[:-1], color="g")
+    #sets_themes_chart.line(themes_by_year.index[:-1], themes_by_year.themes_count[:-1], axis="right", color="b")
+    sets_themes_chart.set_axis("left", "Number of sets", color="green")
+    sets_themes_chart.set_axis("right", "Number of themes", color="blue")
+    #report.show(sets_themes_chart)
+
+    ############# Average ######################
+
+    # Has the year as the index and contains the average number of parts per LEGO set in that year
+    print("\n--- Avergate parts per set in each year")
+    parts_per_set = sets.groupby("year").agg({'num_parts': pd.Series.mean})
+    print(parts_per_set)
+
+    # Scatter plot: simply uses dots to represent the values of each data point.
+    #plt.scatter(themes_by_year.index[:-1], themes_by_year.themes_count[:-1])
+    #plt.title("Themes released by year")
+    #plt.show(block=True)
+
+    ############# All year statistics in one pass ######################
+
+    # Each groupby above is a new pass over all the sets. YearStats (year_stats.py) sorts them once
+    # and computes counts, distinct themes, mean/median/p95 parts and cumulative totals together.
+    print("\n--- All year statistics")
+    year_stats = YearStats(sets).table()
+    print(year_stats[["set_count", "themes_count", "mean_parts", "median_parts", "p95_parts"]])
+
+
+    ##############################################################
+    ### Relational Database Schemas: Primary and Foreign Keys ####
+    ##############################################################
+
+    # Number of Sets per LEGO Theme
+    # But we have no idea which theme is, we just see the id
+    print("\n--- set_theme_count")
+    set_theme_count = sets.theme_id.value_counts()
+    print(set_theme_count)
+    """
+    theme_id
+    158    753
+    501    656
+          ...
+    414      1
+    Name: count, Length: 571, dtype: int64
+    """
+
+    """
+    The themes.csv file has the actual theme names.
+    How is this table linked to the others tables? Well,
+    the sets .csv has theme_ids which match the id column in the themes.csv.
+
+    This means that the theme_id is the foreign key inside the sets.csv.
+    Many different sets can be part of the same theme.
+    But inside the themes.csv, each theme_id, which is just called id is unique.
+    This uniqueness makes the id column the primary key inside the themes.csv.
+    To see this in action, explore the themes.csv.
+    """
+
+    print("\n--- Themes structure")
+    themes = read_csv("data/themes.csv", optimize=True)
+    print(themes.head())
+    """
+       id            name  parent_id
+    0   1         Technic        NaN
+    1   2  Arctic Technic        1.0
+    2   3     Competition        1.0
+    """
+
+    print("\n--- Star wars themes")
+    print(themes[themes.name == "Star Wars"])
+    """
+          id       name  parent_id
+    17    18  Star Wars        1.0
+    150  158  Star Wars        NaN
+    174  209  Star Wars      207.0
+    211  261  Star Wars      258.0
+    """
+
+    print("\n--- Sets with star wars themes")
+    sw_theme_ids = themes[themes.name == "Star Wars"].id.values  # array([ 18, 158, 209, 261])
+    print(sets[sets.theme_id.isin(sw_theme_ids)])
+    """
+               set_num                                               name  year  theme_id  num_parts
+    850        11912-1                Star Wars: Build Your Own Adventure  2016       158         73
+    855        11920-1  Parts for Star Wars Build Your Own Adventure: ...  2019       158         70
+    1717       20006-1                            Clone Turbo Tank - Mini  2008       158         64
+    1728       20007-1                     Republic Attack Cruiser - Mini  2009       158         84
+    1738       20009-1                                AT-TE Walker - Mini  2009       158         94
+    ...            ...                                                ...   ...       ...        ...
+    15686         VP-4            Star Wars Co-Pack of 7101 7111 and 7171  2000       158          0
+    15689         VP-8                 Star Wars Co-Pack of 7130 and 7150  2000       158          0
+    15707      XWING-1                                Mini X-Wing Fighter  2019       158         60
+    15708      XWING-2                                  X-Wing Trench Run  2019       158         52
+    15709  YODACHRON-1                    Yoda Chronicles Promotional Set  2013       158        413
+    """
+
+    # Themes are a tree (parent_id), and .isin() only finds sets whose theme is exactly one of those ids.
+    # ThemeHierarchy (theme_hierarchy.py) indexes the tree once, so we also get the sets of sub-themes
+    # (e.g. 171 "Ultimate Collector Series" under 158 "Star Wars") and totals per subtree.
+    print("\n--- Sets with star wars themes, including sub-themes")
+    hierarchy = ThemeHierarchy(themes, sets)
+    sw_sets = pd.concat([hierarchy.sets_under(theme_id) for theme_id in sw_theme_ids])
+    print(f"{len(sw_sets)} sets")
+    theme_rollup = hierarchy.rollup()
+    print(theme_rollup[theme_rollup.id.isin(sw_theme_ids)])
+
+    ##############################################################
+    ############### Merge DataFrames #############################
+    ##############################################################
+
+    """
+    The .merge() method to combine two separate DataFrames into one.
+    The merge method works on columns with the same name in both DataFrames
+    """
+
+    # Convert series into DF
+    set_theme_count = pd.DataFrame({
+      "id": set_theme_count.index,
+      "set_count": set_theme_count.values
+    })
+    """
+        id    set_count
+     0  158    753   
+     1 . . .
+    """
+
+    """
+    To .merge() two DataFrame along a particular column, we need to provide our two DataFrames
+    and then the column name on which to merge. This is why we set on='id'.
+    Both our set_theme_count and our themes DataFrames have a column with this name.
+    """
+    print("\n--- Merged themes info")
+    # Order matters, merge will be in the order of id "id" of the first arg of merge
+    # so if set_theme_count is ordered some way, it will respect that order
+    # in this case, set_count descending
+    merged_df = pd.merge(set_theme_count, themes , on='id')
+    print(merged_df[:3])
+
+    # Every new question would re-run a merge. KeyIndex (key_index.py) indexes the primary key
+    # themes.id once, then each foreign key lookup is just a vectorized take.
+    themes_index = KeyIndex(themes)
+    print(themes_index.take(set_theme_count.id[:3], ["name", "parent_id"]))
+
+    ##### Plot
+
+    themes_chart = Chart("sets_by_theme", figsize=(14,8), dpi=100, xlabel="Theme", tick_fontsize=14, tick_rotation=45)
+    themes_chart.set_axis("left", "Nr of sets", fontsize=14)
+    themes_chart.bar(merged_df.name[:10], merged_df.set_count[:10])
+    #report.show(themes_chart)
+
+    # Report mode: render all the charts above in parallel (does nothing when they were shown)
+    report.export()
+
+
+    """
+    In this lesson we looked at how to:
+
+      combine the groupby() and count() functions to aggregate data
+
+      use the .value_counts() function
+
+      slice DataFrames using the square bracket notation e.g., df[:-2] or df[:10]
+
+      use the .agg() function to run an operation on a particular column
+
+      rename() columns of DataFrames
+
+      create a line chart with two separate axes to visualise data that have different scales.
+
+      create a scatter plot in Matplotlib
+
+      work with tables in a relational database by using primary and foreign keys
+
+      .merge() DataFrames along a particular column
+
+      create a bar chart with Matplotlib  
+    """
+
+
+if __name__ == "__main__":
+    main()
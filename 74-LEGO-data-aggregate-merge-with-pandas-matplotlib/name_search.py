@@ -0,0 +1,174 @@
+"""
+Prefix and typo-tolerant search over LEGO set and theme names.
+
+The only lookup in main.py is themes[themes.name == "Star Wars"]: exact match, full scan.
+NameIndex is built once over sets.name and themes.name and keeps:
+  - every word suffix of every name ("x-wing fighter", "wing fighter", "fighter") in one sorted
+    list, so a prefix query is two binary searches: "wing" finds "Mini X-Wing Fighter",
+  - an inverted index of character trigrams ("sta", "tar", "ar ", ...) -> record ids. A query
+    with typos ("star wras") still shares most trigrams with the right names, and counting the
+    shared trigrams of every record is a single np.bincount over the query's posting lists.
+Matches come ranked, with the theme ancestry of each result, root first (e.g. Technic > Star Wars).
+The index can be saved with save() and loaded back with NameIndex.load() instead of rebuilt;
+save() replaces the file atomically and removes the older versions of the same index.
+"""
+
+import bisect
+import os
+import pickle
+import re
+import uuid
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+from theme_hierarchy import ThemeHierarchy
+
+Match = namedtuple("Match", ["score", "kind", "id", "name", "ancestry"])
+
+# Bumped when the pickled layout of NameIndex changes, so an index saved by older code is rebuilt
+FORMAT = 2
+
+WORD_START = re.compile(r"(?:^|(?<=[\s\-:/(]))\w")
+
+
+def normalize(text):
+    return " ".join(str(text).lower().split())
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """In-memory prefix and trigram index over the names of the sets and the themes."""
+
+    def __init__(self, sets, themes):
+        # One record per theme, then one per set
+        self.kinds = ["theme"] * len(themes) + ["set"] * len(sets)
+        self.ids = [int(i) for i in themes["id"]] + list(sets["set_num"])
+        self.names = list(themes["name"].to_numpy(dtype=object)) + list(sets["name"].to_numpy(dtype=object))
+        self.theme_ids = [int(i) for i in themes["id"]] + [int(i) for i in sets["theme_id"]]
+        self.name_lengths = np.array([len(name) for name in self.names], dtype=np.int64)
+        normalized = [normalize(name) for name in self.names]
+
+        # Ancestry of every theme, computed once: theme id -> ["Root", ..., "Parent"]
+        hierarchy = ThemeHierarchy(themes)
+        theme_names = dict(zip(self.ids[:len(themes)], self.names[:len(themes)]))
+        self.theme_ancestors = {
+            theme_id: [theme_names[ancestor] for ancestor in reversed(hierarchy.ancestors(theme_id))]
+            for theme_id in theme_names
+        }
+        self.theme_names = theme_names
+
+        suffixes = []
+        for record, name in enumerate(normalized):
+            for match in WORD_START.finditer(name):
+                suffixes.append((name[match.start():], record))
+        suffixes.sort()
+        self.suffixes = [suffix for suffix, _ in suffixes]
+        self.suffix_records = np.array([record for _, record in suffixes], dtype=np.int64)
+
+        postings = {}
+        self.trigram_counts = np.zeros(len(normalized), dtype=np.int64)
+        for record, name in enumerate(normalized):
+            grams = trigrams(name)
+            self.trigram_counts[record] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(record)
+        self.postings = {gram: np.array(records, dtype=np.int64) for gram, records in postings.items()}
+
+    def prefix(self, query, limit=10):
+        """Returns the records with a word starting with query, shortest names first."""
+        query = normalize(query)
+        start = bisect.bisect_left(self.suffixes, query)
+        stop = bisect.bisect_left(self.suffixes, query + "\uffff")
+        records = np.unique(self.suffix_records[start:stop])
+        best = records[np.argsort(self.name_lengths[records], kind="stable")[:limit]]
+        return [self._match(record, 1.0) for record in best]
+
+    def fuzzy(self, query, limit=10, min_score=0.3):
+        """Returns the records whose names share the most trigrams with query (Dice score)."""
+        grams = trigrams(normalize(query))
+        hits = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not hits:
+            return []
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.names))
+        scores = 2 * shared / (len(grams) + self.trigram_counts)
+        candidates = np.flatnonzero(scores >= min_score)
+        best = candidates[np.argsort(-scores[candidates], kind="stable")[:limit]]
+        return [self._match(record, float(scores[record])) for record in best]
+
+    def search(self, query, limit=10):
+        """Prefix matches first, then typo-tolerant matches, without duplicates."""
+        results = self.prefix(query, limit)
+        seen = {(match.kind, match.id) for match in results}
+        for match in self.fuzzy(query, limit):
+            if len(results) >= limit:
+                break
+            if (match.kind, match.id) not in seen:
+                results.append(match)
+        return results
+
+    def _match(self, record, score):
+        theme_id = self.theme_ids[record]
+        kind = self.kinds[record]
+        if theme_id not in self.theme_names:
+            lineage = [f"unknown theme {theme_id}"]
+        elif kind == "theme":
+            lineage = self.theme_ancestors[theme_id]
+        else:
+            lineage = self.theme_ancestors[theme_id] + [self.theme_names[theme_id]]
+        return Match(score, kind, self.ids[record], self.names[record], " > ".join(lineage))
+
+    def save(self, path):
+        """Pickles the index to path, then removes the older versions of it: the files of the same
+        folder whose name is the same up to its last "-" (name-<sources>-<version>.pickle)."""
+        path = Path(path)
+        # Written next to it then renamed: an interrupted save never leaves a truncated pickle
+        temporary = path.parent / f".{path.name}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temporary, "wb") as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+        finally:
+            temporary.unlink(missing_ok=True)
+        prefix = path.stem.rsplit("-", 1)[0]
+        for stale in path.parent.glob(f"{prefix}-*{path.suffix}"):
+            if stale != path and stale.stem.rsplit("-", 1)[0] == prefix:
+                stale.unlink(missing_ok=True)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from common.csv_cache import read_csv
+
+    # The file name changes whenever one of the CSVs or FORMAT changes, so a stale index is never loaded
+    sources = [Path("data/sets.csv"), Path("data/themes.csv")]
+    version = max(source.stat().st_mtime_ns for source in sources)
+    stems = "-".join(source.stem for source in sources)
+    index_path = Path(f".csv_cache/name_index-{stems}-{FORMAT}_{version}.pickle")
+    if index_path.exists():
+        index = NameIndex.load(index_path)
+    else:
+        index = NameIndex(read_csv("data/sets.csv"), read_csv("data/themes.csv"))
+        index_path.parent.mkdir(exist_ok=True)
+        index.save(index_path)
+
+    for query in ("x-wing", "star wras", "millenium falcon"):
+        start = time.perf_counter()
+        matches = index.search(query, limit=5)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"--- {query!r} ({elapsed:.2f}ms)")
+        for match in matches:
+            print(f"  {match.score:.2f} {match.kind:<5} {match.id:<10} {match.name}  [{match.ancestry}]")
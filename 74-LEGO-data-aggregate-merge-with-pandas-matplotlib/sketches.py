@@ -0,0 +1,237 @@
+"""
+Approximate distinct counts and most popular values for catalogs too big to load at once.
+
+main.py uses colors['name'].nunique(), sets.theme_id.value_counts() and a per-year nunique, which
+all need the whole column in memory. The sketches here read the data in chunks and keep a
+small, fixed amount of memory instead:
+  - HyperLogLog estimates how many distinct values were seen (standard error 1.04 / sqrt(m)
+    with m = 2 ** precision registers, about 1.6% for the default precision of 12),
+  - CountMinSketch estimates how many times each value was seen. It never underestimates and,
+    with probability 1 - e ** -depth, overestimates by at most e / width * total,
+  - TopK keeps the k values with the highest Count-Min estimates (the heavy hitters).
+All of them are mergeable: sketch every shard (file, process...) separately and merge() the
+results, which gives the same sketch as reading everything in one go.
+
+Values are hashed with pandas.util.hash_array(), which is vectorized and deterministic, so
+sketches built in different processes can be merged.
+"""
+
+import heapq
+import math
+
+import numpy as np
+import pandas as pd
+
+UINT64 = np.uint64
+
+
+def hash_values(values):
+    """Returns a uint64 hash per value, the same for equal values in any process."""
+    values = np.asarray(values)
+    # Same dtype for every shard: an int16 and an int64 theme id must hash the same
+    if values.dtype.kind in "iub":
+        values = values.astype(np.int64)
+    elif values.dtype.kind == "f":
+        values = values.astype(np.float64)
+    else:
+        values = values.astype(object)
+    return pd.util.hash_array(values)
+
+
+def _bit_length(x):
+    """Vectorized int.bit_length() for a uint64 array."""
+    x = x.copy()
+    length = np.zeros(len(x), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = x >= UINT64(1 << shift)
+        length[big] += shift
+        x[big] >>= UINT64(shift)
+    return length + (x > 0)
+
+
+class HyperLogLog:
+    """Distinct count estimate in 2 ** precision bytes."""
+
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"precision must be between 4 and 18, got {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, values):
+        hashes = hash_values(values)
+        index = (hashes >> UINT64(64 - self.precision)).astype(np.int64)
+        rest = hashes & UINT64((1 << (64 - self.precision)) - 1)
+        # Position of the first 1 bit in the remaining 64 - precision bits
+        rank = (64 - self.precision) - _bit_length(rest) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+        return self
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Can only merge HyperLogLogs with the same precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        """Returns the estimated number of distinct values added."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self.registers.astype(np.float64))
+        empty = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and empty:
+            # Small range correction: linear counting is more accurate there
+            estimate = m * math.log(m / empty)
+        return int(round(estimate))
+
+    @property
+    def relative_error(self):
+        """Standard error of count(), relative to the true distinct count."""
+        return 1.04 / math.sqrt(len(self.registers))
+
+
+class CountMinSketch:
+    """Frequency estimate of every value in depth x width counters."""
+
+    def __init__(self, width=2048, depth=5, seed=0):
+        if width & (width - 1):
+            raise ValueError(f"width must be a power of two, got {width}")
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.total = 0
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        # Multiply-shift hashing: one odd multiplier per row
+        rng = np.random.default_rng(seed)
+        self.multipliers = rng.integers(0, 2 ** 64 - 1, size=depth, dtype=np.uint64, endpoint=True) | UINT64(1)
+        self.shift = UINT64(64 - int(math.log2(width)))
+
+    def _columns(self, hashes):
+        with np.errstate(over="ignore"):
+            return [(hashes * a >> self.shift).astype(np.int64) for a in self.multipliers]
+
+    def add(self, values, counts=None):
+        hashes = hash_values(values)
+        for row, columns in enumerate(self._columns(hashes)):
+            self.table[row] += np.bincount(columns, weights=counts, minlength=self.width).astype(np.int64)
+        self.total += len(hashes) if counts is None else int(np.sum(counts))
+        return self
+
+    def estimate(self, values):
+        """Returns the estimated count of each value (never lower than the true count)."""
+        hashes = hash_values(values)
+        rows = [self.table[row, columns] for row, columns in enumerate(self._columns(hashes))]
+        return np.min(rows, axis=0)
+
+    def merge(self, other):
+        if (other.width, other.depth, other.seed) != (self.width, self.depth, self.seed):
+            raise ValueError("Can only merge Count-Min sketches with the same width, depth and seed")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    @property
+    def error_bound(self):
+        """(epsilon, delta): estimate <= true + epsilon * total with probability 1 - delta."""
+        return math.e / self.width, math.exp(-self.depth)
+
+
+class TopK:
+    """The k most frequent values, estimated with a Count-Min sketch."""
+
+    def __init__(self, k=10, width=2048, depth=5, seed=0):
+        self.k = k
+        self.sketch = CountMinSketch(width, depth, seed)
+        self.candidates = {}  # value -> estimated count, at most k entries
+
+    def add(self, values):
+        counts = pd.Series(values).value_counts(sort=False)
+        self.sketch.add(counts.index.to_numpy(), counts.to_numpy())
+        self._refresh(set(self.candidates) | set(counts.index))
+        return self
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        self._refresh(set(self.candidates) | set(other.candidates))
+        return self
+
+    def _refresh(self, values):
+        values = list(values)
+        estimates = self.sketch.estimate(values)
+        self.candidates = dict(heapq.nlargest(self.k, zip(values, estimates.tolist()), key=lambda x: x[1]))
+
+    def top(self):
+        """Returns [(value, estimated count)], most frequent first."""
+        return sorted(self.candidates.items(), key=lambda item: item[1], reverse=True)
+
+
+class CatalogSketch:
+    """Sketches of a LEGO sets catalog: distinct themes overall and per year, most popular themes."""
+
+    def __init__(self, k=10, precision=12, year_precision=10):
+        self.year_precision = year_precision
+        self.themes = HyperLogLog(precision)
+        self.themes_per_year = {}
+        self.popular_themes = TopK(k)
+        self.sets = 0
+
+    def update(self, chunk):
+        """Adds a chunk of sets.csv rows (at least the year and theme_id columns)."""
+        theme_ids = chunk["theme_id"].to_numpy()
+        self.sets += len(chunk)
+        self.themes.add(theme_ids)
+        self.popular_themes.add(theme_ids)
+        for year, themes in chunk.groupby("year")["theme_id"]:
+            self.themes_per_year.setdefault(year, HyperLogLog(self.year_precision)).add(themes.to_numpy())
+        return self
+
+    def merge(self, other):
+        self.sets += other.sets
+        self.themes.merge(other.themes)
+        self.popular_themes.merge(other.popular_themes)
+        for year, hll in other.themes_per_year.items():
+            if year in self.themes_per_year:
+                self.themes_per_year[year].merge(hll)
+            else:
+                # A copy: updating the merged sketch must not change the shard it came from
+                self.themes_per_year[year] = HyperLogLog(hll.precision).merge(hll)
+        return self
+
+    def report(self):
+        epsilon, delta = self.popular_themes.sketch.error_bound
+        lines = [
+            f"Sets: {self.sets}",
+            f"Distinct themes: ~{self.themes.count()} (+/- {self.themes.relative_error:.1%})",
+            f"Most popular themes (counts may be over by up to {epsilon * self.sets:.0f},"
+            f" with probability {1 - delta:.2%}):",
+        ]
+        lines += [f"  {theme}: ~{count}" for theme, count in self.popular_themes.top()]
+        return "\n".join(lines)
+
+    def themes_by_year(self):
+        """Returns a Series with the estimated number of distinct themes per year."""
+        return pd.Series(
+            {year: hll.count() for year, hll in sorted(self.themes_per_year.items())},
+            name="themes_count",
+        )
+
+
+def sketch_csv(path, chunksize=100_000, **kwargs):
+    """Streams a sets.csv-like file in chunks and returns its CatalogSketch."""
+    sketch = CatalogSketch(**kwargs)
+    for chunk in pd.read_csv(path, usecols=["year", "theme_id"], chunksize=chunksize):
+        sketch.update(chunk)
+    return sketch
+
+
+if __name__ == "__main__":
+    # Even and odd chunks sketched separately then merged, as if they came from two feeds
+    shards = [CatalogSketch(), CatalogSketch()]
+    for number, chunk in enumerate(pd.read_csv("data/sets.csv", usecols=["year", "theme_id"], chunksize=1000)):
+        shards[number % 2].update(chunk)
+    catalog = shards[0].merge(shards[1])
+    print(catalog.report())
+    print(catalog.themes_by_year().tail())
+
+    colors = pd.read_csv("data/colors.csv", usecols=["name"])
+    print(f"Distinct colours: ~{HyperLogLog().add(colors['name']).count()}")
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sketches import CatalogSketch, CountMinSketch, HyperLogLog, TopK
+
+
+@pytest.fixture
+def sets():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "year": rng.integers(1990, 2000, 20_000),
+        "theme_id": rng.zipf(1.5, 20_000) % 600,
+    })
+
+
+def test_hyperloglog_merge_is_the_union():
+    a = HyperLogLog().add(np.arange(0, 30_000))
+    b = HyperLogLog().add(np.arange(20_000, 50_000))
+    whole = HyperLogLog().add(np.arange(0, 50_000))
+    np.testing.assert_array_equal(a.merge(b).registers, whole.registers)
+    assert abs(whole.count() - 50_000) < 4 * whole.relative_error * 50_000
+
+
+def test_merge_of_different_precisions_fails():
+    with pytest.raises(ValueError):
+        HyperLogLog(10).merge(HyperLogLog(12))
+    with pytest.raises(ValueError):
+        CountMinSketch(width=1024).merge(CountMinSketch(width=2048))
+
+
+def test_count_min_merge_adds_the_counts(sets):
+    values = sets["theme_id"].to_numpy()
+    a, b = CountMinSketch().add(values[:5000]), CountMinSketch().add(values[5000:])
+    whole = CountMinSketch().add(values)
+    a.merge(b)
+    np.testing.assert_array_equal(a.table, whole.table)
+    assert a.total == whole.total == len(values)
+    true_counts = sets["theme_id"].value_counts()
+    assert (whole.estimate(true_counts.index.to_numpy()) >= true_counts.to_numpy()).all()
+
+
+def test_top_k_merge(sets):
+    values = sets["theme_id"].to_numpy()
+    merged = TopK(5).add(values[::2]).merge(TopK(5).add(values[1::2]))
+    assert merged.top() == TopK(5).add(values).top()
+
+
+def test_catalog_merge_matches_one_pass(sets):
+    shards = [CatalogSketch(), CatalogSketch()]
+    for number, start in enumerate(range(0, len(sets), 1000)):
+        shards[number % 2].update(sets.iloc[start:start + 1000])
+    merged = shards[0].merge(shards[1])
+    whole = CatalogSketch().update(sets)
+    assert merged.sets == whole.sets
+    np.testing.assert_array_equal(merged.themes.registers, whole.themes.registers)
+    pd.testing.assert_series_equal(merged.themes_by_year(), whole.themes_by_year())
+    assert merged.popular_themes.top() == whole.popular_themes.top()
+
+
+def test_catalog_merge_does_not_share_state(sets):
+    a = CatalogSketch().update(sets[sets.year < 1995])
+    b = CatalogSketch().update(sets[sets.year >= 1995])
+    before = b.themes_by_year()
+    a.merge(b)
+    a.update(pd.DataFrame({"year": 1997, "theme_id": np.arange(10_000, 11_000)}))
+    pd.testing.assert_series_equal(b.themes_by_year(), before)
+    assert a.themes_by_year()[1997] > before[1997]
@@ -0,0 +1,131 @@
+"""
+Theme hierarchy index for the LEGO themes.
+
+themes.csv is a tree: every theme has an optional parent_id. main.py only looks at the themes
+named "Star Wars" and does sets.theme_id.isin(...), which misses their sub-themes and scans all
+the sets again for every question.
+
+ThemeHierarchy walks the tree once, depth first, and numbers the themes in visiting order
+(an Euler tour). The whole subtree of a theme then gets consecutive numbers: theme t covers
+[first[t], last[t]]. Sorting the sets by the number of their theme means that "every set under
+theme X, sub-themes included" is one contiguous slice, found with two binary searches, and
+per-subtree totals come from prefix sums computed in one pass.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class ThemeHierarchy:
+    """Ancestor/descendant index over the themes tree, with the sets ordered by theme subtree."""
+
+    def __init__(self, themes, sets=None):
+        self.themes = themes.reset_index(drop=True)
+        self.ids = self.themes["id"].to_numpy()
+        self._id_index = pd.Index(self.ids)
+        self.parent = self._id_index.get_indexer(self.themes["parent_id"])  # -1 for roots
+        dangling = (self.parent < 0) & self.themes["parent_id"].notna().to_numpy()
+        if dangling.any():
+            raise ValueError(f"Themes with an unknown parent_id: {self.ids[dangling].tolist()}")
+        self.first, self.last, self.tour = self._euler_tour()
+        self.sets = None
+        if sets is not None:
+            self.attach_sets(sets)
+
+    def _euler_tour(self):
+        """Depth first numbering: node v's subtree is tour[first[v]:last[v] + 1]."""
+        n = len(self.ids)
+        children = [[] for _ in range(n)]
+        roots = []
+        for node in np.argsort(self.ids, kind="stable"):
+            parent = self.parent[node]
+            (roots if parent < 0 else children[parent]).append(node)
+
+        first = np.full(n, -1, dtype=np.int64)
+        last = np.full(n, -1, dtype=np.int64)
+        tour = []
+        stack = [(root, False) for root in reversed(roots)]
+        while stack:
+            node, done = stack.pop()
+            if done:
+                last[node] = len(tour) - 1
+                continue
+            first[node] = len(tour)
+            tour.append(node)
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(children[node]))
+        if (first < 0).any():
+            # No root above them: their parent_ids go round in a cycle
+            raise ValueError(f"Themes in a parent_id cycle: {self.ids[first < 0].tolist()}")
+        return first, last, np.array(tour, dtype=np.int64)
+
+    def _node(self, theme_id):
+        node = self._id_index.get_indexer([theme_id])[0]
+        if node < 0:
+            raise KeyError(f"Unknown theme id {theme_id}")
+        return node
+
+    def find(self, name):
+        """Returns the ids of the themes called name."""
+        return self.ids[(self.themes["name"] == name).to_numpy()]
+
+    def ancestors(self, theme_id):
+        """Returns the ids from theme_id's parent up to its root theme."""
+        result = []
+        node = self.parent[self._node(theme_id)]
+        while node >= 0:
+            result.append(int(self.ids[node]))
+            node = self.parent[node]
+        return result
+
+    def descendants(self, theme_id, include_self=True):
+        """Returns the ids of every theme in theme_id's subtree."""
+        node = self._node(theme_id)
+        start = self.first[node] + (0 if include_self else 1)
+        return self.ids[self.tour[start:self.last[node] + 1]]
+
+    def is_ancestor(self, ancestor_id, theme_id):
+        """True if theme_id is ancestor_id or one of its descendants."""
+        a, b = self._node(ancestor_id), self._node(theme_id)
+        return self.first[a] <= self.first[b] <= self.last[a]
+
+    def attach_sets(self, sets):
+        """Orders the sets by the tour number of their theme. Sets of unknown themes are dropped."""
+        nodes = self._id_index.get_indexer(sets["theme_id"])
+        known = nodes >= 0
+        tour_numbers = self.first[nodes[known]]
+        order = np.argsort(tour_numbers, kind="stable")
+        self.sets = sets[known].iloc[order]
+        self.set_tour_numbers = tour_numbers[order]
+
+    def sets_under(self, theme_id):
+        """Returns every set of theme_id or of any of its sub-themes."""
+        if self.sets is None:
+            raise ValueError("No sets attached, call attach_sets(sets) first")
+        node = self._node(theme_id)
+        start, stop = np.searchsorted(
+            self.set_tour_numbers, [self.first[node], self.last[node] + 1]
+        )
+        return self.sets.iloc[start:stop]
+
+    def rollup(self):
+        """Returns one row per theme with its own and its whole subtree's set and part counts.
+        Sets without a num_parts count for 0 parts."""
+        if self.sets is None:
+            raise ValueError("No sets attached, call attach_sets(sets) first")
+        n = len(self.ids)
+        parts = self.sets["num_parts"].fillna(0).to_numpy(dtype=np.int64)
+        own_sets = np.bincount(self.set_tour_numbers, minlength=n)
+        own_parts = np.bincount(self.set_tour_numbers, weights=parts, minlength=n).astype(np.int64)
+
+        # Prefix sums in tour order: a subtree total is cumsum[last + 1] - cumsum[first]
+        sets_cumsum = np.concatenate([[0], np.cumsum(own_sets)])
+        parts_cumsum = np.concatenate([[0], np.cumsum(own_parts)])
+        return pd.DataFrame({
+            "id": self.ids,
+            "name": self.themes["name"].to_numpy(),
+            "set_count": own_sets[self.first],
+            "num_parts": own_parts[self.first],
+            "subtree_set_count": sets_cumsum[self.last + 1] - sets_cumsum[self.first],
+            "subtree_num_parts": parts_cumsum[self.last + 1] - parts_cumsum[self.first],
+        })
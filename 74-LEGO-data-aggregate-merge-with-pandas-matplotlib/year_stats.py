@@ -0,0 +1,111 @@
+"""
+Per-year statistics of the LEGO sets, in one pass, with incremental updates.
+
+main.py runs one sets.groupby("year") for the number of sets, another one for the number of
+different themes (.agg({'theme_id': pd.Series.nunique})) and a third one for the average number
+of parts. YearStats sorts a batch of sets by (year, num_parts) once and gets everything from it:
+  - each year is a contiguous segment, so counts and part totals are np.add.reduceat() calls,
+  - inside a segment the parts are already sorted, so the median and the 95th percentile are
+    just an index computation,
+  - the distinct themes come from the unique (year, theme_id) pairs of the batch.
+
+append() keeps, per year, the sorted parts, the themes, the running count and parts total and
+the median and 95th percentile. A new batch merges its parts into the sorted arrays of the
+years it touches and recomputes only their quantiles; the cumulative totals are a cumsum over
+the years, not the sets. table() returns the kept statistics, without going over the sets.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class YearStats:
+    """Count, distinct themes, mean/median/p95 parts and cumulative totals of the sets per year."""
+
+    def __init__(self, sets=None):
+        self.parts = {}   # year -> sorted np.ndarray with num_parts of every set of that year
+        self.themes = {}  # year -> set of theme ids
+        self.stats = {}   # year -> (set count, parts total, median parts, p95 parts)
+        self._table = pd.DataFrame()
+        if sets is not None:
+            self.append(sets)
+
+    def append(self, sets):
+        """Adds a batch of sets (year, theme_id, num_parts columns) to the statistics."""
+        years = sets["year"].to_numpy(dtype=np.int64)
+        parts = sets["num_parts"].to_numpy(dtype=np.int64)
+        theme_ids = sets["theme_id"].to_numpy(dtype=np.int64)
+        if not len(years):
+            return self
+
+        # Unique (year, theme) pairs of the batch, packed in one integer each
+        min_theme = int(theme_ids.min())
+        theme_span = int(theme_ids.max()) - min_theme + 1
+        pairs = np.unique(years * theme_span + (theme_ids - min_theme))
+        for year, theme in zip(pairs // theme_span, pairs % theme_span + min_theme):
+            self.themes.setdefault(int(year), set()).add(int(theme))
+
+        order = np.lexsort((parts, years))
+        years, parts = years[order], parts[order]
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(years)) + 1])
+        stops = np.append(starts[1:], len(years))
+
+        for year, start, stop in zip(years[starts], starts, stops):
+            segment = parts[start:stop]
+            year = int(year)
+            count, total = len(segment), int(segment.sum())
+            if year in self.parts:
+                # Merging two sorted arrays: the new values go in at their positions in the old ones
+                old = self.parts[year]
+                segment = np.insert(old, np.searchsorted(old, segment, side="right"), segment)
+                old_count, old_total = self.stats[year][:2]
+                count, total = old_count + count, old_total + total
+            self.parts[year] = segment
+            first, counts = np.zeros(1, dtype=np.int64), np.array([count])
+            self.stats[year] = (count, total, float(_sorted_quantile(segment, first, counts, 0.5)[0]),
+                                float(_sorted_quantile(segment, first, counts, 0.95)[0]))
+        self._table = self._build_table()
+        return self
+
+    def _build_table(self):
+        """The statistics of every year, from the kept per-year values (one row per year)."""
+        years = sorted(self.stats)
+        counts, totals, medians, p95s = (np.array(column) for column in zip(*(self.stats[year] for year in years)))
+        return pd.DataFrame({
+            "set_count": counts,
+            "themes_count": [len(self.themes[year]) for year in years],
+            "num_parts": totals,
+            "mean_parts": totals / counts,
+            "median_parts": medians,
+            "p95_parts": p95s,
+            "cumulative_sets": np.cumsum(counts),
+            "cumulative_parts": np.cumsum(totals),
+        }, index=pd.Index(years, name="year"))
+
+    def table(self):
+        """Returns a DataFrame indexed by year with all the statistics."""
+        return self._table.copy()
+
+
+def _sorted_quantile(values, starts, counts, q):
+    """Quantile q of each sorted segment values[start:start + count], linear like pandas."""
+    position = q * (counts - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.minimum(low + 1, counts - 1)
+    fraction = position - low
+    low_values = values[starts + low]
+    return low_values + fraction * (values[starts + high] - low_values)
+
+
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from common.csv_cache import read_csv
+
+    sets = read_csv("data/sets.csv")
+    # Build the history without the last year, then append it as if it just arrived
+    stats = YearStats(sets[sets.year < 2021])
+    stats.append(sets[sets.year == 2021])
+    print(stats.table())
@@ -0,0 +1,86 @@
+"""
+Calendar alignment of trend series with different frequencies.
+
+main.py plotted the monthly Bitcoin prices against the Bitcoin search interest by position:
+row i of df_btc_monthly with row i of df_btc_search. That is only right while both start on the
+same month and have no missing month. Here every series is put on a calendar key first (a
+pandas Period, e.g. 2017-12 for monthly data) before being joined:
+  - to_calendar() turns a frame with a date column into one row per period of the chosen
+    frequency, aggregating finer data (daily prices -> last/mean of the month) and listing
+    every period between the first and the last one, so missing months show up as NaN rows,
+  - align() joins several of them on the calendar key and handles the gaps explicitly:
+    keep them (NaN), drop the incomplete periods, or forward fill up to a limit,
+  - find_gaps() lists the missing runs of every column, to see what was filled or dropped.
+"""
+
+import numpy as np
+import pandas as pd
+
+GAP_POLICIES = ("keep", "drop", "ffill")
+
+
+def to_calendar(df, date_column, freq="M", agg="last"):
+    """Returns the columns of df with one row per calendar period, indexed by Period."""
+    periods = pd.PeriodIndex(df[date_column], freq=freq)
+    values = df.drop(columns=date_column)
+    grouped = values.groupby(periods).agg(agg)
+    full = pd.period_range(grouped.index.min(), grouped.index.max(), freq=freq)
+    result = grouped.reindex(full)
+    result.index.name = "period"
+    return result
+
+
+def align(series, how="outer", gaps="keep", limit=None):
+    """Joins calendar series (Series or DataFrames indexed by Period) on their period.
+
+    how is the join ("outer" keeps every period, "inner" only the common ones). gaps says what to
+    do with missing values: "keep" them as NaN, "drop" the periods where any is missing, or
+    "ffill" them from the previous period (at most limit periods in a row).
+    """
+    if gaps not in GAP_POLICIES:
+        raise ValueError(f"gaps must be one of {GAP_POLICIES}, got {gaps!r}")
+    frames = [item.to_frame() if isinstance(item, pd.Series) else item for item in series]
+    freqs = {frame.index.freqstr for frame in frames}
+    if len(freqs) != 1:
+        raise ValueError(f"Can only align series with the same calendar frequency, got {sorted(freqs)}")
+
+    aligned = pd.concat(frames, axis=1, join=how).sort_index()
+    if how == "outer" and len(aligned):
+        aligned = aligned.reindex(pd.period_range(aligned.index.min(), aligned.index.max(), freq=freqs.pop()))
+    aligned.index.name = "period"
+    if gaps == "drop":
+        aligned = aligned.dropna()
+    elif gaps == "ffill":
+        aligned = aligned.ffill(limit=limit)
+    return aligned
+
+
+def find_gaps(aligned):
+    """Returns a DataFrame with one row per run of missing values: column, start, end, periods."""
+    rows = []
+    for column in aligned.columns:
+        missing = aligned[column].isna().to_numpy()
+        # Start and end of every run of True values
+        edges = np.diff(np.concatenate([[0], missing.astype(np.int8), [0]]))
+        for start, stop in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+            rows.append({"column": column, "start": aligned.index[start], "end": aligned.index[stop - 1],
+                         "periods": stop - start})
+    return pd.DataFrame(rows, columns=["column", "start", "end", "periods"])
+
+
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from common.csv_cache import read_csv
+
+    prices = read_csv("Daily Bitcoin Price.csv", parse_dates=["DATE"])
+    search = read_csv("Bitcoin Search Trend.csv", parse_dates=["MONTH"])
+    # Take out a few months of search data to see how the gaps are handled
+    search = search.drop(index=[10, 11, 40])
+
+    btc = align([to_calendar(prices, "DATE")["CLOSE"], to_calendar(search, "MONTH")["BTC_NEWS_SEARCH"]])
+    print(find_gaps(btc))
+    print(align([to_calendar(prices, "DATE")["CLOSE"], to_calendar(search, "MONTH")["BTC_NEWS_SEARCH"]],
+                gaps="ffill", limit=1).iloc[8:13])
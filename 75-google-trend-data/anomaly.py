@@ -0,0 +1,247 @@
+"""
+Streaming anomaly and change-point detection for the daily Bitcoin prices.
+
+main.py only resamples and plots Daily Bitcoin Price.csv. DailyMonitor watches the daily rows
+as they arrive and flags the dates where something unusual happened:
+  - "spike": one day far away from the recent behaviour. Every series keeps an exponentially
+    weighted mean and variance (EWMA) and a day whose z-score is above z_threshold is flagged,
+  - "shift up" / "shift down": a lasting change in the level, found with a two-sided CUSUM on
+    the same z-scores. Small deviations in the same direction pile up until they cross
+    cusum_threshold, then the sums start again from 0.
+The prices are followed as daily log returns and the volumes as log volumes. A value the
+transform can't take (0 or less for a log or a log return, -1 or less for log1p) is skipped
+like a missing one, by update() and update_many() alike: a series that can be 0, like the
+Google search values, should use "log1p" or "none" instead of "log". The state of a
+series is a handful of numbers (count, mean, variance, the two CUSUM sums, the previous value),
+whatever the length of the history.
+
+update() takes one day at a time. update_many() takes a batch (or the whole history, to
+backfill) and gives the same alerts without a Python loop per day:
+  - the EWMA mean and variance are linear recurrences y[t] = w * y[t - 1] + u[t], solved by
+    blocks with cumulative sums (the scaled sum of a block, then one carry per block),
+  - a CUSUM without resets is max(0, S0 + C[t], C[t] - min C[..t]) with C the cumulative sum,
+    so each block is scanned at once. After an alarm the scan restarts right after it.
+"""
+
+import math
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+Alert = namedtuple("Alert", ["date", "column", "kind", "score"])
+
+TRANSFORMS = ("log_return", "log", "log1p", "none")
+# Values at or below these are outside the domain of the transform and skipped
+LOWER_BOUNDS = {"log_return": 0.0, "log": 0.0, "log1p": -1.0, "none": -math.inf}
+# Largest factor 1 / w ** t used inside a block of _linear_filter(), to keep the sums accurate
+MAX_SCALE = 1e6
+
+
+def _linear_filter(weight, inputs, initial):
+    """Returns y with y[t] = weight * y[t - 1] + inputs[t] and y[-1] = initial, vectorized."""
+    n = len(inputs)
+    if n == 0:
+        return np.empty(0)
+    block = max(1, min(n, int(math.log(MAX_SCALE) / -math.log(weight)) if weight < 1 else n))
+    blocks = -(-n // block)
+    padded = np.zeros(blocks * block)
+    padded[:n] = inputs
+    padded = padded.reshape(blocks, block)
+
+    # Inside a block: y[k] = w^(k+1) * (y[-1] + sum_j<=k u[j] / w^(j+1))
+    powers = weight ** np.arange(1, block + 1)
+    local = np.cumsum(padded / powers, axis=1) * powers
+    # Carry the last value of every block into the next one
+    carries = np.empty(blocks)
+    carry = initial
+    for b in range(blocks):
+        carries[b] = carry
+        carry = powers[-1] * carry + local[b, -1]
+    return (local + carries[:, None] * powers).ravel()[:n]
+
+
+def _cusum_alarms(z, drift, threshold, pos, neg, block=4096):
+    """Two-sided CUSUM of z, restarted after every alarm.
+
+    Returns ([(position, +1 or -1)], pos, neg) with the alarms and the final sums.
+    """
+    alarms = []
+    start = 0
+    while start < len(z):
+        chunk = z[start:start + block]
+        # Lindley recursion S[t] = max(0, S[t - 1] + u[t]) in closed form
+        up = np.cumsum(chunk - drift)
+        up = up - np.minimum(np.minimum.accumulate(up), -pos)
+        down = np.cumsum(-chunk - drift)
+        down = down - np.minimum(np.minimum.accumulate(down), -neg)
+        crossed = np.flatnonzero((up > threshold) | (down > threshold))
+        if len(crossed):
+            i = crossed[0]
+            alarms.append((start + i, 1 if up[i] > threshold else -1))
+            pos = neg = 0.0
+            start += i + 1
+        else:
+            pos, neg = float(max(up[-1], 0.0)), float(max(down[-1], 0.0))
+            start += len(chunk)
+    return alarms, pos, neg
+
+
+class SeriesDetector:
+    """EWMA z-score spikes and CUSUM level shifts of one series, with O(1) state."""
+
+    def __init__(self, transform="none", alpha=0.05, z_threshold=4.0, drift=0.5, cusum_threshold=8.0,
+                 warmup=30):
+        if transform not in TRANSFORMS:
+            raise ValueError(f"transform must be one of {TRANSFORMS}, got {transform!r}")
+        self.transform = transform
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.drift = drift
+        self.cusum_threshold = cusum_threshold
+        self.warmup = warmup
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+        self.pos = 0.0
+        self.neg = 0.0
+        self.previous = None  # last raw value, for log returns
+
+    def _transform_one(self, value):
+        if self.transform == "none":
+            return value
+        if self.transform == "log":
+            return math.log(value)
+        if self.transform == "log1p":
+            return math.log1p(value)
+        previous, self.previous = self.previous, value
+        return None if previous is None else math.log(value / previous)
+
+    def update(self, value):
+        """Adds one value, returns the [(kind, score)] it triggers."""
+        if value is None or math.isnan(value) or value <= LOWER_BOUNDS[self.transform]:
+            return []
+        x = self._transform_one(value)
+        if x is None:
+            return []
+        if self.count == 0:
+            self.count, self.mean = 1, x
+            return []
+
+        alerts = []
+        deviation = x - self.mean
+        z = deviation / math.sqrt(self.variance) if self.variance > 0 else 0.0
+        if self.count >= self.warmup:
+            if abs(z) > self.z_threshold:
+                alerts.append(("spike", z))
+            self.pos = max(0.0, self.pos + z - self.drift)
+            self.neg = max(0.0, self.neg - z - self.drift)
+            if self.pos > self.cusum_threshold or self.neg > self.cusum_threshold:
+                alerts.append(("shift up" if self.pos > self.cusum_threshold else "shift down", z))
+                self.pos = self.neg = 0.0
+        self.mean += self.alpha * deviation
+        self.variance = (1 - self.alpha) * (self.variance + self.alpha * deviation ** 2)
+        self.count += 1
+        return alerts
+
+    def _transform_many(self, values):
+        """Transformed values and the positions (in values) they come from."""
+        positions = np.flatnonzero(values > LOWER_BOUNDS[self.transform])  # NaN compares False
+        values = values[positions]
+        if self.transform == "log":
+            return np.log(values), positions
+        if self.transform == "log1p":
+            return np.log1p(values), positions
+        if self.transform == "log_return":
+            if not len(values):
+                return values, positions
+            previous = values[0] if self.previous is None else self.previous
+            returns = np.log(values / np.concatenate([[previous], values[:-1]]))
+            if self.previous is None:
+                returns, positions = returns[1:], positions[1:]
+            self.previous = float(values[-1])
+            return returns, positions
+        return values, positions
+
+    def update_many(self, values):
+        """Adds all the values at once, returns [(position, kind, score)] like update() would."""
+        x, positions = self._transform_many(np.asarray(values, dtype=np.float64))
+        if not len(x):
+            return []
+        if self.count == 0:
+            self.count, self.mean = 1, float(x[0])
+            x, positions = x[1:], positions[1:]
+            if not len(x):
+                return []
+
+        decay = 1 - self.alpha
+        # Mean and variance *before* each value, as used by update()
+        means = _linear_filter(decay, self.alpha * x, self.mean)
+        previous_means = np.concatenate([[self.mean], means[:-1]])
+        deviations = x - previous_means
+        variances = _linear_filter(decay, decay * self.alpha * deviations ** 2, self.variance)
+        previous_variances = np.concatenate([[self.variance], variances[:-1]])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = np.where(previous_variances > 0, deviations / np.sqrt(previous_variances), 0.0)
+        active = self.count + np.arange(len(x)) >= self.warmup
+
+        alerts = [(int(i), "spike", float(z[i])) for i in np.flatnonzero(active & (np.abs(z) > self.z_threshold))]
+        first_active = int(np.argmax(active)) if active.any() else len(x)
+        shifts, self.pos, self.neg = _cusum_alarms(z[first_active:], self.drift, self.cusum_threshold,
+                                                   self.pos, self.neg)
+        alerts += [(first_active + i, "shift up" if sign > 0 else "shift down", float(z[first_active + i]))
+                   for i, sign in shifts]
+
+        self.mean, self.variance = float(means[-1]), float(variances[-1])
+        self.count += len(x)
+        # Spikes come before shifts on the same day, like in update()
+        alerts.sort(key=lambda alert: (alert[0], alert[1] != "spike"))
+        return [(int(positions[i]), kind, score) for i, kind, score in alerts]
+
+
+class DailyMonitor:
+    """Detectors for the CLOSE (log returns) and VOLUME (log) columns of daily rows."""
+
+    def __init__(self, columns=None, date_column="DATE", **options):
+        columns = columns or {"CLOSE": "log_return", "VOLUME": "log"}
+        self.date_column = date_column
+        self.detectors = {column: SeriesDetector(transform, **options) for column, transform in columns.items()}
+
+    def update(self, row):
+        """Adds one day (a dict or Series with the date and the columns), returns its Alerts."""
+        alerts = []
+        for column, detector in self.detectors.items():
+            for kind, score in detector.update(row[column]):
+                alerts.append(Alert(row[self.date_column], column, kind, score))
+        return alerts
+
+    def update_many(self, frame):
+        """Adds a batch of days (or the whole history), returns their Alerts in date order."""
+        dates = frame[self.date_column].to_numpy()
+        alerts = []
+        for column, detector in self.detectors.items():
+            for position, kind, score in detector.update_many(frame[column].to_numpy(dtype=np.float64)):
+                alerts.append((position, column, kind, score))
+        alerts.sort(key=lambda alert: alert[0])
+        return [Alert(pd.Timestamp(dates[position]), column, kind, score) for position, column, kind, score in alerts]
+
+
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from common.csv_cache import read_csv
+
+    prices = read_csv("Daily Bitcoin Price.csv", parse_dates=["DATE"])
+    # Backfill the history up to 2020, then follow 2020 day by day
+    monitor = DailyMonitor()
+    history = prices[prices.DATE < "2020-01-01"]
+    alerts = monitor.update_many(history)
+    print(f"{len(alerts)} alerts in {len(history)} days of history, the last ones:")
+    for alert in alerts[-5:]:
+        print(f"  {alert.date.date()} {alert.column:<6} {alert.kind:<10} z={alert.score:+.1f}")
+    print("2020:")
+    for row in prices[prices.DATE >= "2020-01-01"].to_dict("records"):
+        for alert in monitor.update(row):
+            print(f"  {alert.date.date()} {alert.column:<6} {alert.kind:<10} z={alert.score:+.1f}")
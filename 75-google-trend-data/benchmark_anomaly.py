@@ -0,0 +1,64 @@
+"""
+Benchmark: DailyMonitor throughput, one row at a time vs vectorized backfill.
+
+The daily prices are replaced by synthetic ones: a geometric random walk whose drift changes
+every 500 days, with a few crashes and volume bursts, at 1 to 5 million days. For each size:
+  - update(): the streaming path, timed on the first STREAM_ROWS rows only (it is a Python
+    loop, the rate doesn't depend on the size),
+  - update_many(): the whole history in one call.
+The alerts of both paths are compared on the rows that went through both.
+
+Run it from this folder: python benchmark_anomaly.py
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from anomaly import DailyMonitor
+
+SIZES = [1_000_000, 2_000_000, 5_000_000]
+STREAM_ROWS = 50_000
+
+
+def synthetic_prices(days, seed=0):
+    """Returns a DATE/CLOSE/VOLUME frame that looks like Daily Bitcoin Price.csv."""
+    rng = np.random.default_rng(seed)
+    drift = np.repeat(rng.normal(0, 0.003, days // 500 + 1), 500)[:days]
+    returns = rng.normal(0, 0.03, days) + drift
+    crashes = rng.choice(days, days // 5000, replace=False)
+    returns[crashes] -= rng.uniform(0.2, 0.5, len(crashes))
+    volume = np.exp(rng.normal(20, 0.3, days) + np.cumsum(rng.normal(0, 0.01, days)))
+    volume[crashes] *= 5
+    return pd.DataFrame({
+        # One row per minute: millions of days don't fit in datetime64[ns]
+        "DATE": pd.date_range("2000-01-01", periods=days, freq="min"),
+        "CLOSE": 400 * np.exp(np.cumsum(returns)),
+        "VOLUME": volume,
+    })
+
+
+def main():
+    print(f"{'days':>10} {'update()':>14} {'update_many()':>16} {'speedup':>8} {'alerts':>8}")
+    for days in SIZES:
+        prices = synthetic_prices(days)
+
+        streaming = DailyMonitor()
+        rows = prices[:STREAM_ROWS].to_dict("records")
+        start = time.perf_counter()
+        streamed = [alert for row in rows for alert in streaming.update(row)]
+        stream_rate = len(rows) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        alerts = DailyMonitor().update_many(prices)
+        batch_rate = days / (time.perf_counter() - start)
+
+        head = [alert[:3] for alert in alerts if alert.date < prices.DATE[STREAM_ROWS]]
+        assert head == [alert[:3] for alert in streamed]
+        print(f"{days:>10} {stream_rate:>9,.0f} rows/s {batch_rate:>11,.0f} rows/s "
+              f"{batch_rate / stream_rate:>7.0f}x {len(alerts):>8}")
+
+
+if __name__ == "__main__":
+    main()
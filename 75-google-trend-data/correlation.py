@@ -0,0 +1,175 @@
+"""
+Rolling statistics and lagged correlations between search interest and prices/rates.
+
+main.py lines up the Tesla, Bitcoin and unemployment series with their search interest but
+only plots them. This module measures how they move together:
+  - rolling_stats() and rolling_corr() compute rolling means, standard deviations and Pearson
+    correlations for many window sizes. Every window sum is a difference of two cumulative
+    sums, so each window size costs O(n) whatever its length (pandas' rolling() is also O(n)
+    per window, but runs one window size and one pair of columns per call).
+  - lagged_corr() computes the Pearson correlation of search[t] with target[t + lag] for every
+    lag at once. The products sum_t x[t] * y[t + lag] of all the lags come from one FFT
+    cross-correlation, O(n log n), and the sums and squares over each overlap from cumulative
+    sums, so the result is the exact Pearson correlation of the overlapping rows (the same as
+    x.corr(y.shift(-lag))), not a globally normalized approximation.
+  - analyze_directory() finds every (*_SEARCH column, other numeric column) pair in a folder of
+    trend CSVs and evaluates all of them, one file per worker process.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+WINDOWS = (3, 6, 12, 24)
+MAX_LAG = 12
+# Relative size under which a difference of sums of squares is treated as rounding error
+TOLERANCE = 1e-10
+
+
+def _window_sums(cumulative, window):
+    """Sums of every window of a cumulative sum that starts with 0 (NaN before the first full one)."""
+    sums = np.full(len(cumulative) - 1, np.nan)
+    sums[window - 1:] = cumulative[window:] - cumulative[:-window]
+    return sums
+
+
+def _cumsum(values):
+    return np.concatenate([[0.0], np.cumsum(values)])
+
+
+def rolling_stats(values, windows=WINDOWS):
+    """Returns a DataFrame with the rolling mean and std (ddof=1) of values for every window."""
+    values = np.asarray(values, dtype=np.float64)
+    # Centering first keeps the sums of squares small, so their differences stay accurate
+    centered = values - np.nanmean(values)
+    missing = _cumsum(np.isnan(values))
+    sums = _cumsum(np.nan_to_num(centered))
+    squares = _cumsum(np.nan_to_num(centered) ** 2)
+    result = {}
+    for window in windows:
+        total = _window_sums(sums, window)
+        variance = _spread(window, total, _window_sums(squares, window)) / (window - 1)
+        complete = _window_sums(missing, window) == 0  # like pandas, a window with a NaN gives NaN
+        result[f"mean_{window}"] = np.where(complete, total / window + np.nanmean(values), np.nan)
+        result[f"std_{window}"] = np.where(complete, np.sqrt(variance), np.nan)
+    return pd.DataFrame(result)
+
+
+def _spread(n, total, squares):
+    """n * variance from the sums, 0 when it is only the rounding error of the subtraction."""
+    spread = squares - total ** 2 / n
+    return np.where(spread > TOLERANCE * squares, spread, 0.0)
+
+
+def _pearson(n, sx, sy, sxx, syy, sxy):
+    """Pearson correlation from sums; NaN when one side is constant, like pandas."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        denominator = np.sqrt(_spread(n, sx, sxx) * _spread(n, sy, syy))
+        return np.where(denominator > 0, (sxy - sx * sy / n) / denominator, np.nan)
+
+
+def rolling_corr(x, y, windows=WINDOWS):
+    """Returns a DataFrame with the rolling Pearson correlation of x and y for every window."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    x, y = x - np.nanmean(x), y - np.nanmean(y)
+    missing = _cumsum(np.isnan(x) | np.isnan(y))
+    x, y = np.nan_to_num(x), np.nan_to_num(y)
+    sums = [_cumsum(values) for values in (x, y, x * x, y * y, x * y)]
+    result = {}
+    for window in windows:
+        corr = _pearson(window, *(_window_sums(values, window) for values in sums))
+        result[f"corr_{window}"] = np.where(_window_sums(missing, window) == 0, corr, np.nan)
+    return pd.DataFrame(result)
+
+
+def lagged_corr(x, y, max_lag=MAX_LAG):
+    """Returns a Series, indexed by lag, with the correlation of x[t] and y[t + lag]."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if np.isnan(x).any() or np.isnan(y).any():
+        raise ValueError("lagged_corr() needs series without NaN values")
+    n = len(x)
+    max_lag = min(max_lag, n - 2)
+    x, y = x - x.mean(), y - y.mean()
+
+    # products[lag] = sum_t x[t] * y[t + lag], for positive and negative lags
+    size = 1 << int(2 * n - 1).bit_length()
+    products = np.fft.irfft(np.conj(np.fft.rfft(x, size)) * np.fft.rfft(y, size), size)
+    lags = np.arange(-max_lag, max_lag + 1)
+    sxy = products[lags % size]
+
+    # x[t] overlaps y[t + lag] for t in [max(0, -lag), min(n, n - lag))
+    x_start, x_stop = np.maximum(0, -lags), np.minimum(n, n - lags)
+    y_start, y_stop = x_start + lags, x_stop + lags
+    cx, cxx, cy, cyy = _cumsum(x), _cumsum(x * x), _cumsum(y), _cumsum(y * y)
+    corr = _pearson(
+        x_stop - x_start,
+        cx[x_stop] - cx[x_start],
+        cy[y_stop] - cy[y_start],
+        cxx[x_stop] - cxx[x_start],
+        cyy[y_stop] - cyy[y_start],
+        sxy,
+    )
+    return pd.Series(corr, index=pd.Index(lags, name="lag"), name="corr")
+
+
+def column_pairs(df):
+    """Returns the (search column, target column) pairs of a trend DataFrame."""
+    numeric = [column for column in df.columns if pd.api.types.is_numeric_dtype(df[column])]
+    searches = [column for column in numeric if column.endswith("_SEARCH")]
+    return [(search, target) for search in searches for target in numeric if target not in searches]
+
+
+def analyze_frame(df, name="", windows=WINDOWS, max_lag=MAX_LAG):
+    """Returns one row per search/target pair: lag 0 and best lag correlations, median rolling ones."""
+    rows = []
+    for search, target in column_pairs(df):
+        pair = df[[search, target]].dropna()
+        x, y = pair[search].to_numpy(dtype=np.float64), pair[target].to_numpy(dtype=np.float64)
+        lagged = lagged_corr(x, y, max_lag)
+        best_lag = int(lagged.abs().idxmax())
+        row = {
+            "file": name,
+            "search": search,
+            "target": target,
+            "rows": len(pair),
+            "corr": lagged[0],
+            "best_lag": best_lag,
+            "best_corr": lagged[best_lag],
+        }
+        rolling = rolling_corr(x, y, windows)
+        row.update({f"median_{column}": rolling[column].median() for column in rolling})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def analyze_file(path, windows=WINDOWS, max_lag=MAX_LAG):
+    """analyze_frame() of a trend CSV."""
+    return analyze_frame(pd.read_csv(path), Path(path).name, windows, max_lag)
+
+
+def analyze_directory(directory, windows=WINDOWS, max_lag=MAX_LAG, workers=None):
+    """analyze_file() of every CSV of a directory, in parallel, concatenated."""
+    paths = sorted(Path(directory).glob("*.csv"))
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        results = [analyze_file(path, windows, max_lag) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(analyze_file, paths, [windows] * len(paths), [max_lag] * len(paths)))
+    results = [result for result in results if len(result)]
+    return pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+
+
+if __name__ == "__main__":
+    pd.set_option("display.width", 200)
+    print(analyze_directory(".").round(3).to_string())
+
+    # Does the search interest for unemployment benefits lead the unemployment rate?
+    unemployment = pd.read_csv("UE Benefits Search vs UE Rate 2004-19.csv")
+    lags = lagged_corr(unemployment.UE_BENEFITS_WEB_SEARCH, unemployment.UNRATE, max_lag=6)
+    print(lags.round(3).to_string())
@@ -0,0 +1,218 @@
+"""
+Delta ingestion of trend CSVs that get extended or revised.
+
+The repo has two versions of the unemployment file: 2004-19 and 2004-20. The newer one adds
+the months of 2020, and Google Trends rescaled every search value because the new peak is in
+2020. Reading the new version means parsing the whole file again, even when only a few lines
+were appended at the end.
+
+DeltaIngestor keeps the parsed frame of a file together with a hash of every line (one
+vectorized pd.util.hash_array() call over the lines, without their line break, so rewriting
+CRLF line breaks as LF changes nothing) and the SHA-1 of the whole file. If the previous version
+is a prefix of the new file and ended on a complete line, only the lines after it are parsed and
+appended. Otherwise:
+  - the lines whose hash is already known are taken from the previous frame (a numpy take),
+  - only the new or modified lines are parsed, with the date formats detected the first time,
+  - the changed rows are sorted out by key (e.g. MONTH) into appended, revised and deleted rows,
+    returned as a Delta.
+When the header changes, the file is parsed again in full and the Delta deletes every previous
+row and appends every new one.
+Rollups derived from the frame, like GroupSums below, are updated from the Delta too: the old
+version of revised and deleted rows is subtracted, the new version of revised and appended rows
+added. So the parsing and the rollup work are proportional to the number of changed lines, and
+the rest is hashing and copying, which is much cheaper than parsing.
+"""
+
+import hashlib
+import io
+import pickle
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.dates import detect_date_format, parse_dates
+
+Delta = namedtuple("Delta", ["appended", "revised", "revised_before", "deleted"])
+
+
+def _split_lines(data):
+    """Returns an object array with the lines of some CSV bytes, without their line breaks."""
+    data = data.rstrip(b"\r\n")
+    if not data:
+        return np.array([], dtype=object)
+    return np.array(data.replace(b"\r\n", b"\n").split(b"\n"), dtype=object)
+
+
+def _hash_lines(lines):
+    return pd.util.hash_array(lines, categorize=False)
+
+
+class DeltaIngestor:
+    """Parsed frame of one CSV file, refreshed by parsing only the lines that changed."""
+
+    def __init__(self, key, parse_dates=(), **read_options):
+        self.key = key
+        self.date_columns = list(parse_dates)
+        self.read_options = read_options
+        self.date_formats = {}
+        self.header = None
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.frame = None
+        # Size and SHA-1 of the file at the last ingest, to recognize pure appends quickly
+        self.size = 0
+        self.sha1 = None
+
+    def _parse(self, lines):
+        """Parses a few lines of the file (with its header) into a frame."""
+        data = self.header + b"\n" + b"\n".join(lines) if len(lines) else self.header
+        frame = pd.read_csv(io.BytesIO(data), **self.read_options)
+        for column in self.date_columns:
+            if column not in self.date_formats:
+                self.date_formats[column] = detect_date_format(frame[column])
+            frame[column] = parse_dates(frame[column], self.date_formats[column])
+        return frame
+
+    def ingest(self, path):
+        """Brings the frame up to date with the file, returns the Delta since the last ingest."""
+        with open(path, "rb") as f:
+            data = f.read()
+        previous_size, previous_sha1 = self.size, self.sha1
+        self.size, self.sha1 = len(data), hashlib.sha1(data).hexdigest()
+
+        # The previous version is a prefix of the file: only lines were appended, as long as its
+        # last line was complete (it ended with a line break, or one follows it now)
+        tail = data[previous_size:]
+        complete = not tail or data[previous_size - 1:previous_size] == b"\n" or tail[:1] in (b"\r", b"\n")
+        if (self.frame is not None and complete and len(data) >= previous_size
+                and hashlib.sha1(data[:previous_size]).hexdigest() == previous_sha1):
+            lines = _split_lines(tail.lstrip(b"\r\n"))
+            appended = self._parse(lines) if len(lines) else self.frame.iloc[:0]
+            self.hashes = np.concatenate([self.hashes, _hash_lines(lines)])
+            self.frame = pd.concat([self.frame, appended], ignore_index=True)
+            empty = appended.iloc[:0]
+            return Delta(appended, empty, empty, empty)
+
+        lines = _split_lines(data)
+        header, lines = lines[0], lines[1:]
+        hashes = _hash_lines(lines)
+        if self.frame is None or header != self.header:
+            # First ingest or new columns: every previous row is deleted, every row is appended
+            previous = self.frame
+            self.header, self.hashes = header, hashes
+            self.frame = self._parse(lines)
+            empty = self.frame.iloc[:0]
+            return Delta(self.frame, empty, empty, empty if previous is None else previous)
+
+        # Where each new line was in the previous version (-1 if it's new or modified)
+        old_positions = pd.Index(self.hashes).get_indexer_for(hashes) if len(self.hashes) else np.full(len(hashes), -1)
+        if len(old_positions) != len(hashes):
+            # Duplicate lines: keep the first previous position of each hash
+            first = pd.Series(np.arange(len(self.hashes))).groupby(self.hashes).first()
+            old_positions = first.reindex(hashes).fillna(-1).to_numpy(dtype=np.int64)
+        changed = np.flatnonzero(old_positions < 0)
+        parsed = self._parse(lines[changed])
+
+        # Previous rows whose line is gone: revised (their key is still there) or deleted
+        kept = np.zeros(len(self.hashes), dtype=bool)
+        kept[old_positions[old_positions >= 0]] = True
+        gone = self.frame[~kept]
+        previous_keys = pd.Index(self.frame[self.key])
+        is_revision = previous_keys.isin(parsed[self.key])
+        delta = Delta(
+            appended=parsed[~parsed[self.key].isin(previous_keys)],
+            revised=parsed[parsed[self.key].isin(previous_keys)],
+            revised_before=self.frame[is_revision & ~kept],
+            deleted=gone[~gone[self.key].isin(parsed[self.key])],
+        )
+
+        # New frame, in file order: unchanged rows from the old frame, changed rows from parsed
+        unchanged = np.flatnonzero(old_positions >= 0)
+        order = np.argsort(np.concatenate([unchanged, changed]), kind="stable")
+        combined = pd.concat([self.frame.iloc[old_positions[unchanged]], parsed], ignore_index=True)
+        self.frame = combined.iloc[order].reset_index(drop=True)
+        self.hashes = hashes
+        return delta
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+class GroupSums:
+    """Sum and count of some columns per group (e.g. per year), kept up to date with Deltas."""
+
+    def __init__(self, by, columns):
+        self.by = by  # function of the frame returning the group of every row
+        self.columns = columns
+        self.sums = pd.DataFrame(columns=columns, dtype=np.float64)
+        self.counts = pd.Series(dtype=np.int64)
+
+    def _add(self, frame, sign):
+        if frame.empty:
+            return
+        groups = self.by(frame)
+        sums = frame[self.columns].groupby(groups).sum() * sign
+        counts = frame.groupby(groups).size() * sign
+        self.sums = self.sums.add(sums, fill_value=0)
+        self.counts = self.counts.add(counts, fill_value=0).astype(np.int64)
+
+    def apply(self, delta):
+        """Updates the sums with a Delta: out with the old rows, in with the new ones."""
+        self._add(delta.revised_before, -1)
+        self._add(delta.deleted, -1)
+        self._add(delta.revised, 1)
+        self._add(delta.appended, 1)
+        empty = self.counts[self.counts == 0].index
+        self.sums, self.counts = self.sums.drop(empty), self.counts.drop(empty)
+        return self
+
+    def means(self):
+        return self.sums.div(self.counts, axis=0)
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    def by_year(frame):
+        return frame.MONTH.dt.year.rename("year")
+
+    # The 2004-20 file as a new version of the 2004-19 one
+    ingestor = DeltaIngestor("MONTH", parse_dates=["MONTH"])
+    yearly = GroupSums(by_year, ["UE_BENEFITS_WEB_SEARCH", "UNRATE"])
+    yearly.apply(ingestor.ingest("UE Benefits Search vs UE Rate 2004-19.csv"))
+    delta = ingestor.ingest("UE Benefits Search vs UE Rate 2004-20.csv")
+    print(f"2004-19 -> 2004-20: {len(delta.appended)} appended, {len(delta.revised)} revised, "
+          f"{len(delta.deleted)} deleted rows")
+    print(yearly.apply(delta).means().tail(3))
+
+    # A big file that gets a few new lines at the end, like a daily feed
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "daily.csv"
+        days = pd.date_range("1800-01-01", periods=200_000, freq="D")
+        values = np.random.default_rng(0).normal(size=len(days)).round(4)
+        pd.DataFrame({"DATE": days.strftime("%Y-%m-%d"), "VALUE": values}).to_csv(path, index=False)
+        ingestor = DeltaIngestor("DATE", parse_dates=["DATE"])
+        ingestor.ingest(path)
+        with open(path, "a") as f:
+            f.write("2400-01-01,1.5\n2400-01-02,-0.3\n")
+
+        start = time.perf_counter()
+        delta = ingestor.ingest(path)
+        delta_time = time.perf_counter() - start
+        start = time.perf_counter()
+        full = pd.read_csv(path)
+        full["DATE"] = pd.to_datetime(full["DATE"], format="%Y-%m-%d")
+        full_time = time.perf_counter() - start
+        pd.testing.assert_frame_equal(ingestor.frame, full)
+        print(f"{len(full):,} rows, {len(delta.appended)} appended: delta ingest {delta_time * 1000:.1f}ms, "
+              f"full reload {full_time * 1000:.1f}ms")
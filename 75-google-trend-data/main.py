@@ -27,196 +27,235 @@ Fine-tuning the styling of Matplotlib charts by using limits, labels, linewidth
 Using .grid() to help visually identify seasonality in a time series.
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-
-df_tesla = pd.read_csv('TESLA Search Trend vs Price.csv')
-
-# monthly search volume from Google Trends.
-df_btc_search = pd.read_csv('Bitcoin Search Trend.csv')
-# day-by-day closing price and the trade volume of Bitcoin across 2204 rows. 
-df_btc_price = pd.read_csv('Daily Bitcoin Price.csv')
-
-df_unemployment = pd.read_csv('UE Benefits Search vs UE Rate 2004-19.csv')
+import os
+import sys
+from pathlib import Path
 
+import pandas as pd
 
-print(df_tesla.shape)  # (124,3)
-
-# .describe(). 
-# If you use df_tesla.describe(), you get a whole bunch of descriptive statistics
-print(df_tesla.describe())
-"""
-       TSLA_WEB_SEARCH  TSLA_USD_CLOSE
-count       124.000000      124.000000
-mean          8.725806       50.962145
-std           5.870332       65.908389
-min           2.000000        3.896000
-25%           3.750000        7.352500
-50%           8.000000       44.653000
-75%          12.000000       58.991999
-max          31.000000      498.320007
-"""
-
-
-### Remove missing values
-df_tesla.isna()
-"""
-     MONTH  TSLA_WEB_SEARCH  TSLA_USD_CLOSE
-0    False            False           False
-1    False            False           False
-...
-"""
-df_tesla.isna().values  # convert to list
-"""
-array([[False, False, False],
-       [False, False, False],
-       [False, False, False
-       ...
-"""
-
-print(f'Missing values for Tesla?: {df_tesla.isna().values.any()}') # check if any() of the list is True, i.e is NaN
-print(f'Missing values for U/E?: {df_unemployment.isna().values.any()}')
-print(f'Missing values for BTC Search?: {df_btc_search.isna().values.any()}')
-print(f'Number of missing values: {df_btc_price.isna().values.sum()}')
-# Remove NaN values
-# df_btc_price = df_btc_price.dropna()
-df_btc_price.dropna(inplace=True)  # same as above
-
-
-
-######## Convert string to datetimes
-
-# All the date data in our columns are in the form of strings.
-# To convert this into a Datetime object we're going to use the Pandas .to_datetime() function
-
-print(type(df_tesla.MONTH[0])) # str
-df_tesla.MONTH = pd.to_datetime(df_tesla.MONTH)
-df_btc_search.MONTH = pd.to_datetime(df_btc_search.MONTH)
-df_unemployment.MONTH = pd.to_datetime(df_unemployment.MONTH)
-df_btc_price.DATE = pd.to_datetime(df_btc_price.DATE)
-print(type(df_tesla.MONTH[0])) # <class 'pandas._libs.tslibs.timestamps.Timestamp'>, dtype: datetime64[ns]
-
-
-##########################################################################
-######### Resampling Time Series Data (convert daily data to monthly data)
-
-# Next, we have to think about how to make our Bitcoin price and our Bitcoin search volume comparable.
-# Our Bitcoin price is daily data, but our Bitcoin Search Popularity is monthly data.
-
-# To convert our daily data into monthly data, we're going to use the .resample() function.
-# The only things we need to specify is which column to use (i.e., our DATE column) and what
-# kind of sample frequency we want (i.e., the "rule"). We want a monthly frequency, so we use 'ME'. 
-# If you ever need to resample a time series to a different frequency, 
-# you can find a list of different options here: 
-# https://pandas.pydata.org/pandas-docs/stable/user_guide/timeseries.html#dateoffset-objects 
-# (for example 'Y' for yearly or 'T' for minute).
-
-# resample() is a time-based groupby, followed by a reduction method on each of its groups
-
-# Resample: https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.resample.html
-# https://pandas.pydata.org/pandas-docs/stable/user_guide/timeseries.html#resampling
-# Convenience method for frequency conversion and resampling of time series.
-# The object must have a datetime-like index (DatetimeIndex, PeriodIndex, or TimedeltaIndex),
-# or the caller must pass the label of a datetime-like series/index to the on/level keyword parameter.
-
-
-# Group data by month, and get last price of the month
-df_btc_monthly = df_btc_price.resample('ME', on='DATE').last()
-# Group data by month, and get average price of the month
-df_btc_monthly_mean = df_btc_price.resample('ME', on='DATE').mean()
-
-# Now we have data for each month.. same amount of rows as search data
-
-####################################################################################
-######################## Plot Tesla info ############################################
-
-
-# # Create locators for ticks on the time axis, i.e. a mark for each year and month
-years = mdates.YearLocator()
-months = mdates.MonthLocator()
-years_fmt = mdates.DateFormatter('%Y') # how we see dates in the date labels at the bottom
-
-# # Register date converters to avoid warning messages
-# from pandas.plotting import register_matplotlib_converters
-# register_matplotlib_converters()
-
-# Plot the Tesla stock price against the Tesla search volume using a line chart and two different axes. 
-# Label one axis 'TSLA Stock Price' and the other 'Search Trend'.
-# Increase the figure size (e.g., to 14 by 8). 
-# 2. Increase the font sizes for the labels and the ticks on the x-axis to 14. 
-# 3. Rotate the text on the x-axis by 45 degrees. 
-# 4. Make the lines on the chart thicker. 
-# 5. Add a title that reads 'Tesla Web Search vs Price'
-# 6. Keep the chart looking sharp by changing the dots-per-inch or [DPI value](https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.pyplot.figure.html). 
-# 7. Set minimum and maximum values for the y and x axis. Hint: check out methods like [set_xlim()](https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.axes.Axes.set_xlim.html). 
-# 8. Finally use [plt.show()](https://matplotlib.org/3.2.1/api/_as_gen/matplotlib.pyplot.show.html) to display the chart below the cell instead of relying on the automatic notebook output.
-
-plt.figure(figsize=(10,6), dpi=120) # increases size and resolution
-plt.title('Tesla Web Search vs Price', fontsize=18)
-plt.xticks(fontsize=14, rotation=45)
-
-ax1 = plt.gca()
-ax2 = ax1.twinx()
-
-# format the ticks
-ax1.xaxis.set_major_locator(years)
-ax1.xaxis.set_major_formatter(years_fmt)
-ax1.xaxis.set_minor_locator(months)
-
-# Also, increase fontsize and linewidth for larger charts
-ax1.set_ylabel('TSLA Stock Price', color='#E6232E', fontsize=14)
-ax2.set_ylabel('Search Trend', color='skyblue', fontsize=14)
-
-# Set the minimum and maximum values on the axes
-ax1.set_ylim([0, 600])
-ax1.set_xlim([df_tesla.MONTH.min(), df_tesla.MONTH.max()])
-
-ax1.plot(df_tesla.MONTH, df_tesla.TSLA_USD_CLOSE, color='#E6232E', linewidth=3)
-ax2.plot(df_tesla.MONTH, df_tesla.TSLA_WEB_SEARCH, color='skyblue', linewidth=3)
-
-# Displays chart explicitly
-plt.show(block=True)
-
-
-
-########################################################################
-######################### Plot BTC info ################################
-########################################################################
-
-# Modify the chart title to read 'Bitcoin News Search vs Resampled Price'
-# Change the y-axis label to 'BTC Price'
-# Change the y- and x-axis limits to improve the appearance
-# Investigate the linestyles to make the BTC closing price a dashed line
-# Investigate the marker types to make the search datapoints little circles
-# Were big increases in searches for Bitcoin accompanied by big increases in the price?
-
-
-plt.figure(figsize=(14,8), dpi=120)
- 
-plt.title('Bitcoin News Search vs Resampled Price', fontsize=18)
-plt.xticks(fontsize=14, rotation=45)
- 
-ax1 = plt.gca()
-ax2 = ax1.twinx()
- 
-ax1.set_ylabel('BTC Price', color='#F08F2E', fontsize=14)
-ax2.set_ylabel('Search Trend', color='skyblue', fontsize=14)
- 
-ax1.xaxis.set_major_locator(years)
-ax1.xaxis.set_major_formatter(years_fmt)
-ax1.xaxis.set_minor_locator(months)
- 
-ax1.set_ylim(bottom=0, top=15000)
-ax1.set_xlim([df_btc_monthly.index.min(), df_btc_monthly.index.max()])
-
-# Show the grid lines as dark grey lines
-ax1.grid(color='grey', linestyle='--')
- 
-# Experiment with the linestyle and markers
-ax1.plot(df_btc_monthly.index, df_btc_monthly.CLOSE, 
-         color='#F08F2E', linewidth=3, linestyle='--')
-ax2.plot(df_btc_monthly.index, df_btc_search.BTC_NEWS_SEARCH, 
-         color='skyblue', linewidth=3, marker='o')
- 
-plt.show()
\ No newline at end of file
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.charts import Chart, ChartReport
+from common.csv_cache import read_csv
+from alignment import align, find_gaps, to_calendar
+from timeseries_store import TimeSeriesStore
+
+HERE = Path(__file__).resolve().parent
+
+
+def main(folder=HERE):
+    # folder holds the CSV files (benchmarks/cases.py runs main() on bigger, synthetic ones)
+    # Date columns are parsed while reading (parse_dates), so the parsed datetimes end up
+    # in the binary cache too and later runs skip the string to datetime conversion.
+    df_tesla = read_csv(folder / 'TESLA Search Trend vs Price.csv', parse_dates=['MONTH'], optimize=True)
+
+    # monthly search volume from Google Trends.
+    df_btc_search = read_csv(folder / 'Bitcoin Search Trend.csv', parse_dates=['MONTH'], optimize=True)
+    # day-by-day closing price and the trade volume of Bitcoin across 2204 rows. 
+    df_btc_price = read_csv(folder / 'Daily Bitcoin Price.csv', parse_dates=['DATE'], optimize=True)
+
+    df_unemployment = read_csv(folder / 'UE Benefits Search vs UE Rate 2004-19.csv', parse_dates=['MONTH'], optimize=True)
+
+
+    print(df_tesla.shape)  # (124,3)
+
+    # .describe(). 
+    # If you use df_tesla.describe(), you get a whole bunch of descriptive statistics
+    # MONTH is already a datetime column (parse_dates, see below), so describe() includes it too
+    print(df_tesla.describe())
+    """
+                                MONTH  TSLA_WEB_SEARCH  TSLA_USD_CLOSE
+    count                         124       124.000000      124.000000
+    mean   2015-07-17 05:48:23.225806         8.725806       50.962145
+    min           2010-06-01 00:00:00         2.000000        3.896000
+    25%           2012-12-24 06:00:00         3.750000        7.352500
+    50%           2015-07-16 12:00:00         8.000000       44.653000
+    75%          2018-02-08 00:00:00        12.000000       58.991999
+    max           2020-09-01 00:00:00        31.000000      498.320007
+    std                           NaN         5.870332       65.908389
+    """
+
+
+    ### Remove missing values
+    df_tesla.isna()
+    """
+         MONTH  TSLA_WEB_SEARCH  TSLA_USD_CLOSE
+    0    False            False           False
+    1    False            False           False
+    ...
+    """
+    df_tesla.isna().values  # convert to list
+    """
+    array([[False, False, False],
+           [False, False, False],
+           [False, False, False
+           ...
+    """
+
+    print(f'Missing values for Tesla?: {df_tesla.isna().values.any()}') # check if any() of the list is True, i.e is NaN
+    print(f'Missing values for U/E?: {df_unemployment.isna().values.any()}')
+    print(f'Missing values for BTC Search?: {df_btc_search.isna().values.any()}')
+    print(f'Number of missing values: {df_btc_price.isna().values.sum()}')
+    # Remove NaN values
+    # df_btc_price = df_btc_price.dropna()
+    df_btc_price.dropna(inplace=True)  # same as above
+
+
+
+    ######## Convert string to datetimes
+
+    # All the date data in our CSV columns are in the form of strings.
+    # To convert this into a Datetime object we could use the Pandas .to_datetime() function:
+    #   df_tesla.MONTH = pd.to_datetime(df_tesla.MONTH)
+    # Here we already did it when reading, with read_csv(..., parse_dates=['MONTH']). Without a format
+    # pandas has to guess how the dates are written, so read_csv detects the format of each date
+    # column once ('%Y-%m' for the search data, '%Y-%m-%d' for the prices, see common/dates.py)
+    # and parses the column with it: pd.to_datetime(df_tesla.MONTH, format='%Y-%m-%d')
+
+    print(type(df_tesla.MONTH[0])) # <class 'pandas._libs.tslibs.timestamps.Timestamp'>, dtype: datetime64[ns]
+
+
+    ##########################################################################
+    ######### Resampling Time Series Data (convert daily data to monthly data)
+
+    # Next, we have to think about how to make our Bitcoin price and our Bitcoin search volume comparable.
+    # Our Bitcoin price is daily data, but our Bitcoin Search Popularity is monthly data.
+
+    # To convert our daily data into monthly data, we're going to use the .resample() function.
+    # The only things we need to specify is which column to use (i.e., our DATE column) and what
+    # kind of sample frequency we want (i.e., the "rule"). We want a monthly frequency, so we use 'ME'. 
+    # If you ever need to resample a time series to a different frequency, 
+    # you can find a list of different options here: 
+    # https://pandas.pydata.org/pandas-docs/stable/user_guide/timeseries.html#dateoffset-objects 
+    # (for example 'Y' for yearly or 'T' for minute).
+
+    # resample() is a time-based groupby, followed by a reduction method on each of its groups
+
+    # Resample: https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.resample.html
+    # https://pandas.pydata.org/pandas-docs/stable/user_guide/timeseries.html#resampling
+    # Convenience method for frequency conversion and resampling of time series.
+    # The object must have a datetime-like index (DatetimeIndex, PeriodIndex, or TimedeltaIndex),
+    # or the caller must pass the label of a datetime-like series/index to the on/level keyword parameter.
+
+
+    # Group data by month, and get last price of the month
+    #   df_btc_monthly = df_btc_price.resample('ME', on='DATE').last()
+    # Group data by month, and get average price of the month
+    #   df_btc_monthly_mean = df_btc_price.resample('ME', on='DATE').mean()
+    # Both go over the whole history on every run. The daily prices only ever get new days at
+    # the end, so with TIMESERIES_STORE=some/folder we keep them in a TimeSeriesStore there
+    # (timeseries_store.py): ingest() parses just the lines of the CSV that are new or revised since
+    # the last run (delta_ingest.py), appends the new days, records the revised ones, and keeps
+    # monthly and weekly buckets (last, mean, min, max, volume) up to date, so the same resample() is
+    # answered from the buckets. Without it nothing is written and pandas resamples the prices.
+    if os.environ.get('TIMESERIES_STORE'):
+        btc_store = TimeSeriesStore(Path(os.environ['TIMESERIES_STORE']) / 'Daily Bitcoin Price')
+        btc_store.ingest(folder / 'Daily Bitcoin Price.csv')
+        df_btc_monthly = btc_store.resample('ME', 'last')
+        df_btc_monthly_mean = btc_store.resample('ME', 'mean')
+    else:
+        df_btc_monthly = df_btc_price.resample('ME', on='DATE').last()
+        df_btc_monthly_mean = df_btc_price.resample('ME', on='DATE').mean()
+
+    # Now we have data for each month.. same amount of rows as search data
+    # Same amount of rows doesn't mean the same months though. Instead of pairing the rows by
+    # position, both series go on a calendar key (the month, as a pandas Period) and are joined on
+    # it (alignment.py): a month missing on one side shows up as NaN instead of shifting the rest.
+    df_btc_aligned = align([to_calendar(df_btc_monthly.reset_index(), 'DATE')['CLOSE'],
+                            to_calendar(df_btc_search, 'MONTH')['BTC_NEWS_SEARCH']])
+    print(f'Months missing on one side: {find_gaps(df_btc_aligned).periods.sum()}')
+    # Month ends, the dates resample('ME') gives to the months
+    btc_months = df_btc_aligned.index.to_timestamp(how='end').normalize()
+
+    ####################################################################################
+    ######################## Plot Tesla info ############################################
+
+
+    # The charts are described with common/charts.py (Chart) and shown by a ChartReport:
+    # on screen with pyplot when there is a display, or, in report mode (no display or
+    # CHARTS_DIR=some/folder), saved as PNG/SVG files by worker processes at the end of the script,
+    # without blocking. Chart(...) takes the same settings we would give to pyplot below.
+    report = ChartReport()
+
+    # Date x axes get locators for the ticks on the time axis, i.e. a mark for each year and month:
+    #   years = mdates.YearLocator()
+    #   months = mdates.MonthLocator()
+    #   years_fmt = mdates.DateFormatter('%Y') # how we see dates in the date labels at the bottom
+    # Chart.draw() sets them up on ax1.xaxis (set_major_locator, set_major_formatter, set_minor_locator).
+
+    # Plot the Tesla stock price against the Tesla search volume using a line chart and two different axes. 
+    # Label one axis 'TSLA Stock Price' and the other 'Search Trend'.
+    # Increase the figure size (e.g., to 14 by 8). 
+    # 2. Increase the font sizes for the labels and the ticks on the x-axis to 14. 
+    # 3. Rotate the text on the x-axis by 45 degrees. 
+    # 4. Make the lines on the chart thicker. 
+    # 5. Add a title that reads 'Tesla Web Search vs Price'
+    # 6. Keep the chart looking sharp by changing the dots-per-inch or [DPI value](https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.pyplot.figure.html). 
+    # 7. Set minimum and maximum values for the y and x axis. Hint: check out methods like [set_xlim()](https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.axes.Axes.set_xlim.html). 
+    # 8. Finally use [plt.show()](https://matplotlib.org/3.2.1/api/_as_gen/matplotlib.pyplot.show.html) to display the chart below the cell instead of relying on the automatic notebook output.
+
+    # figsize and dpi increase size and resolution, like plt.figure(figsize=(10,6), dpi=120)
+    tesla_chart = Chart('tesla_search_vs_price', title='Tesla Web Search vs Price', figsize=(10,6), dpi=120,
+                        title_fontsize=18, tick_fontsize=14, tick_rotation=45)
+
+    # The right axis is ax2 = ax1.twinx(), it shares the x axis with the left one.
+    # Also, increase fontsize and linewidth for larger charts
+    tesla_chart.set_axis('left', 'TSLA Stock Price', color='#E6232E', fontsize=14, ylim=(0, 600))
+    tesla_chart.set_axis('right', 'Search Trend', color='skyblue', fontsize=14)
+
+    # Set the minimum and maximum values on the axes
+    tesla_chart.set_xlim(df_tesla.MONTH.min(), df_tesla.MONTH.max())
+
+    tesla_chart.line(df_tesla.MONTH, df_tesla.TSLA_USD_CLOSE, color='#E6232E', linewidth=3)
+    tesla_chart.line(df_tesla.MONTH, df_tesla.TSLA_WEB_SEARCH, axis='right', color='skyblue', linewidth=3)
+
+    # Displays chart explicitly (plt.show(block=True)), or queues it in report mode
+    report.show(tesla_chart)
+
+
+
+    ########################################################################
+    ######################### Plot BTC info ################################
+    ########################################################################
+
+    # Modify the chart title to read 'Bitcoin News Search vs Resampled Price'
+    # Change the y-axis label to 'BTC Price'
+    # Change the y- and x-axis limits to improve the appearance
+    # Investigate the linestyles to make the BTC closing price a dashed line
+    # Investigate the marker types to make the search datapoints little circles
+    # Were big increases in searches for Bitcoin accompanied by big increases in the price?
+
+
+    # Show the grid lines as dark grey lines
+    btc_chart = Chart('bitcoin_search_vs_price', title='Bitcoin News Search vs Resampled Price',
+                      figsize=(14,8), dpi=120, title_fontsize=18, tick_fontsize=14, tick_rotation=45,
+                      grid=dict(color='grey', linestyle='--'))
+
+    btc_chart.set_axis('left', 'BTC Price', color='#F08F2E', fontsize=14, ylim=(0, 15000))
+    btc_chart.set_axis('right', 'Search Trend', color='skyblue', fontsize=14)
+    btc_chart.set_xlim(btc_months.min(), btc_months.max())
+
+    # Experiment with the linestyle and markers
+    btc_chart.line(btc_months, df_btc_aligned.CLOSE,
+                   color='#F08F2E', linewidth=3, linestyle='--')
+    btc_chart.line(btc_months, df_btc_aligned.BTC_NEWS_SEARCH, axis='right',
+                   color='skyblue', linewidth=3, marker='o')
+
+    report.show(btc_chart)
+
+    # The daily prices have 2200+ points, more than the chart is wide in pixels. Chart.line()
+    # decimates long series with Largest-Triangle-Three-Buckets, which keeps the peaks and dips.
+    # It is an extra chart of the report: exported in report mode, never shown on screen.
+    btc_daily_chart = Chart('bitcoin_daily_price', title='Bitcoin Daily Price', figsize=(14,8), dpi=120,
+                            title_fontsize=18, tick_fontsize=14, tick_rotation=45,
+                            grid=dict(color='grey', linestyle='--'))
+    btc_daily_chart.set_axis('left', 'BTC Price', color='#F08F2E', fontsize=14)
+    btc_daily_chart.line(df_btc_price.DATE, df_btc_price.CLOSE, color='#F08F2E', linewidth=2)
+
+    report.save(btc_daily_chart)
+
+    # Report mode: render all the charts above in parallel (does nothing when they were shown)
+    report.export()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly import TRANSFORMS, DailyMonitor, SeriesDetector
+
+
+def streamed(detector, values):
+    return [(position, kind, score) for position, value in enumerate(values)
+            for kind, score in detector.update(value)]
+
+
+def assert_same_alerts(batch, stream):
+    assert [alert[:2] for alert in batch] == [alert[:2] for alert in stream]
+    np.testing.assert_allclose([alert[2] for alert in batch], [alert[2] for alert in stream], rtol=1e-6)
+
+
+def series(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    values = np.exp(np.cumsum(rng.normal(0, 0.03, n))) * 100
+    values[rng.choice(n, n // 100, replace=False)] *= 3  # spikes
+    values[n // 2:] *= 2  # level shift
+    values[rng.choice(n, n // 50, replace=False)] = np.nan
+    values[rng.choice(n, n // 50, replace=False)] = 0.0
+    return values
+
+
+@pytest.mark.parametrize("transform", TRANSFORMS)
+def test_batch_matches_streaming(transform):
+    values = series()
+    stream = streamed(SeriesDetector(transform), values.tolist())
+    batch = SeriesDetector(transform).update_many(values)
+    assert stream
+    assert_same_alerts(batch, stream)
+
+
+@pytest.mark.parametrize("transform", TRANSFORMS)
+def test_batches_continue_the_state(transform):
+    values = series(seed=1)
+    whole = SeriesDetector(transform).update_many(values)
+    detector = SeriesDetector(transform)
+    pieces = []
+    for start in range(0, len(values), 777):
+        pieces += [(start + position, kind, score)
+                   for position, kind, score in detector.update_many(values[start:start + 777])]
+    assert_same_alerts(pieces, whole)
+
+
+@pytest.mark.parametrize("transform", ["log", "log_return"])
+def test_values_outside_the_log_domain_are_skipped(transform):
+    detector = SeriesDetector(transform, warmup=1)
+    for value in [1.0, 2.0, 0.0, -3.0, float("nan"), 2.0]:
+        detector.update(value)
+    assert detector.count == (3 if transform == "log" else 2)
+    assert all(math.isfinite(v) for v in (detector.mean, detector.variance))
+    batch = SeriesDetector(transform, warmup=1)
+    batch.update_many([1.0, 2.0, 0.0, -3.0, float("nan"), 2.0])
+    assert (batch.count, batch.mean, batch.variance) == pytest.approx((detector.count, detector.mean,
+                                                                      detector.variance))
+
+
+def test_daily_monitor_on_bitcoin_prices():
+    prices = pd.read_csv(Path(__file__).parent / "Daily Bitcoin Price.csv", parse_dates=["DATE"])
+    stream = DailyMonitor()
+    streamed_alerts = [alert for row in prices.to_dict("records") for alert in stream.update(row)]
+    batch_alerts = DailyMonitor().update_many(prices)
+    assert [alert[:3] for alert in batch_alerts] == [alert[:3] for alert in streamed_alerts]
@@ -0,0 +1,527 @@
+"""
+Append-only daily time-series store with incremental weekly and monthly rollups.
+
+main.py loads Daily Bitcoin Price.csv and runs resample('ME', on='DATE').last() and .mean() on
+the whole history every time, although only a few days are new since the last run.
+TimeSeriesStore keeps the daily rows in a folder, one binary file per column (the day as an
+int64 number of days since 1970-01-01, the values as float64), sorted by day. New days are
+appended at the end of the files, which are read back with np.memmap.
+
+Next to them it keeps rollups per week (W, weeks ending on Sunday like pandas) and per month
+(ME): for every bucket and column the count, sum, min, max and last value. Appending days only
+updates the last bucket and adds new ones. resample() answers a query from the buckets:
+  - weeks and months come straight from the rollups, quarters (QE) and years (YE) combine
+    the monthly buckets,
+  - with a start/end date only the (at most two) buckets cut by the range are computed again
+    from the daily rows, found with a binary search.
+NaN values are skipped like pandas does: mean() ignores them and last() is the last valid value.
+
+update() only appends the days newer than the last stored one, but first checks that the days
+it already has are unchanged: given the source file, it compares its size, mtime and SHA-1 with
+the ones saved at the last update (like common/csv_cache.py), and otherwise compares the stored
+days with the frame. A revised day rebuilds the store instead of leaving it silently stale.
+
+ingest() reads the source file itself through a DeltaIngestor (delta_ingest.py), saved with the
+store, which parses only the new or modified lines. New days are appended, and only the buckets
+the revised days fall in are computed again. Deleted days, or new days before the last stored
+one, rebuild the store.
+
+Revised values don't rewrite the column files: they go to an overlay, the row positions and new
+values of every revised day (overlay.4.npz), which read() and resample() apply to the rows they
+read. A revision costs the size of the overlay, not of the history. When the overlay holds more
+than COMPACT_FRACTION of the rows it is compacted: written into a new set of column files.
+
+Every write creates new files and meta.json, replaced last, says which files are current, so an
+interrupted append leaves the previous version of the store readable:
+  - the column files of a store are named after the version that created them
+    (CLOSE.3.bin), appends only write past the row count of meta.json, after cutting what an
+    interrupted append may have left there, and a rebuild writes a new set of files,
+  - the rollups and the overlay are written to new files for every version (rollup-ME.4.npz),
+  - the DeltaIngestor is saved for every version too (ingestor.4.pickle),
+  - files that meta.json doesn't point to any more are deleted after it is replaced.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from delta_ingest import DeltaIngestor
+
+BASE_FREQUENCIES = ("W", "ME")
+# Coarser frequencies are built from the monthly buckets: month id -> bucket id
+DERIVED_FREQUENCIES = {"QE": 3, "YE": 12}
+STATS = ("count", "sum", "min", "max", "last")
+AGGREGATIONS = ("count", "sum", "min", "max", "last", "mean")
+# Overlay rows (revised days) past this share of the stored rows are written into the column files
+COMPACT_FRACTION = 0.05
+
+
+def _day_numbers(dates):
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+def _bucket_ids(days, freq):
+    """Bucket of each day: weeks ending on Sunday for W, calendar months for ME."""
+    if freq == "W":
+        return (days + 3) // 7  # 1970-01-01 was a Thursday
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def _bucket_labels(ids, freq):
+    """Last day of each bucket, the label pandas gives to W, ME, QE and YE buckets."""
+    if freq == "W":
+        return (ids * 7 + 3).astype("datetime64[D]")
+    months = DERIVED_FREQUENCIES.get(freq, 1)
+    next_month = ((ids + 1) * months).astype("datetime64[M]")
+    return next_month.astype("datetime64[D]") - np.timedelta64(1, "D")
+
+
+def _bucket_bounds(bucket, freq):
+    """First day of the bucket and first day of the next one, as day numbers."""
+    if freq == "W":
+        return np.array([bucket * 7 - 3, bucket * 7 + 4])
+    return np.array([bucket, bucket + 1]).astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+
+
+def _source_signature(path):
+    """Returns the size, mtime and SHA-1 of a source file."""
+    stat = os.stat(path)
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": digest.hexdigest()}
+
+
+def _bucket_stats(ids, values):
+    """Returns (bucket ids, {stat: array}) of a column already sorted by bucket."""
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(ids)) + 1]).astype(np.int64)
+    valid = ~np.isnan(values)
+    # Index of the last valid value of each bucket (-1 if there is none)
+    positions = np.where(valid, np.arange(len(values)), -1)
+    last_position = np.maximum.reduceat(positions, starts)
+    stats = {
+        "count": np.add.reduceat(valid.astype(np.int64), starts).astype(np.float64),
+        "sum": np.add.reduceat(np.where(valid, values, 0.0), starts),
+        "min": np.fmin.reduceat(values, starts),
+        "max": np.fmax.reduceat(values, starts),
+        "last": np.where(last_position >= 0, values[np.maximum(last_position, 0)], np.nan),
+    }
+    return ids[starts], stats
+
+
+def _combine(ids, stats):
+    """Merges the buckets that share the same (sorted) id, like _bucket_stats() on their rows."""
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(ids)) + 1]).astype(np.int64)
+    positions = np.where(stats["count"] > 0, np.arange(len(ids)), -1)
+    last_position = np.maximum.reduceat(positions, starts)
+    combined = {
+        "count": np.add.reduceat(stats["count"], starts),
+        "sum": np.add.reduceat(stats["sum"], starts),
+        "min": np.fmin.reduceat(stats["min"], starts),
+        "max": np.fmax.reduceat(stats["max"], starts),
+        "last": np.where(last_position >= 0, stats["last"][np.maximum(last_position, 0)], np.nan),
+    }
+    return ids[starts], combined
+
+
+class TimeSeriesStore:
+    """Daily rows of a few float columns on disk, with weekly and monthly rollups."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.meta_path = self.directory / "meta.json"
+        self.date_column = None
+        self.date_dtype = "datetime64[ns]"  # unit of the dates given back, same as the appended ones
+        self.columns = []
+        self.rows = 0
+        self.rollups = {}  # freq -> {"id": ids, column: {stat: array}}
+        self.version = 0  # incremented by every write
+        self.data_version = 0  # version that created the column files
+        self.source = None  # size, mtime and SHA-1 of the file of the last update()
+        self.overlay = None  # revised days: {"position": row positions, column: new values}
+        self.overlay_version = None  # version that wrote the overlay file
+        self._memmaps = None
+        meta = json.loads(self.meta_path.read_text()) if self.meta_path.exists() else {}
+        if "version" in meta:  # stores of the first layout, without versions, are rebuilt
+            self.date_column, self.columns, self.rows = meta["date_column"], meta["columns"], meta["rows"]
+            self.date_dtype = meta["date_dtype"]
+            self.version, self.data_version = meta["version"], meta["data_version"]
+            self.source = meta["source"]
+            for freq in BASE_FREQUENCIES:
+                self.rollups[freq] = self._load_rollup(freq)
+            self.overlay_version = meta.get("overlay_version")
+            if self.overlay_version is not None:
+                with np.load(self._overlay_path()) as data:
+                    self.overlay = {name: data[name] for name in ["position"] + self.columns}
+
+    def _path(self, name):
+        return self.directory / f"{name}.{self.data_version}.bin"
+
+    def _rollup_path(self, freq, version=None):
+        return self.directory / f"rollup-{freq}.{self.version if version is None else version}.npz"
+
+    def _overlay_path(self):
+        return self.directory / f"overlay.{self.overlay_version}.npz"
+
+    def _ingestor_path(self, version=None):
+        return self.directory / f"ingestor.{self.version if version is None else version}.pickle"
+
+    def _load_rollup(self, freq):
+        with np.load(self._rollup_path(freq)) as data:
+            rollup = {"id": data["id"]}
+            for column in self.columns:
+                rollup[column] = {stat: data[f"{column}-{stat}"] for stat in STATS}
+        return rollup
+
+    def _save_rollup(self, freq, version):
+        rollup = self.rollups[freq]
+        arrays = {"id": rollup["id"]}
+        for column in self.columns:
+            arrays.update({f"{column}-{stat}": rollup[column][stat] for stat in STATS})
+        np.savez(self._rollup_path(freq, version), **arrays)
+
+    def _commit(self, version):
+        """Writes the rollups of version, replaces meta.json to point to them, then deletes the
+        older files."""
+        for freq in self.rollups:
+            self._save_rollup(freq, version)
+        self.version = version
+        meta = {"date_column": self.date_column, "date_dtype": self.date_dtype, "columns": self.columns,
+                "rows": self.rows, "version": self.version, "data_version": self.data_version,
+                "overlay_version": self.overlay_version, "source": self.source}
+        temporary = self.meta_path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(meta))
+        os.replace(temporary, self.meta_path)
+        current = {self._path(name).name for name in ["day"] + self.columns}
+        current.update(self._rollup_path(freq).name for freq in BASE_FREQUENCIES)
+        current.add(self._ingestor_path().name)
+        if self.overlay_version is not None:
+            current.add(self._overlay_path().name)
+        for path in [*self.directory.glob("*.bin"), *self.directory.glob("rollup-*.npz"),
+                     *self.directory.glob("overlay.*.npz"), *self.directory.glob("ingestor.*.pickle")]:
+            if path.name not in current:
+                path.unlink(missing_ok=True)
+
+    def _reset(self):
+        """Forgets the stored days, the next append() writes a new set of files."""
+        self.columns, self.rows, self.rollups, self._memmaps = [], 0, {}, None
+        self.overlay = self.overlay_version = None
+
+    @property
+    def last_day(self):
+        """Returns the last stored day as a Timestamp (None when the store is empty)."""
+        if not self.rows:
+            return None
+        return pd.Timestamp(np.datetime64(int(self._columns()["day"][-1]), "D"))
+
+    def _columns(self):
+        """Returns the daily columns as read-only memory maps ({"day": ..., column: ...})."""
+        if self._memmaps is None:
+            names = ["day"] + self.columns
+            if not self.rows:
+                return {name: np.empty(0, dtype=np.int64 if name == "day" else np.float64) for name in names}
+            self._memmaps = {
+                name: np.memmap(self._path(name), dtype=np.int64 if name == "day" else np.float64,
+                                mode="r", shape=(self.rows,))
+                for name in names
+            }
+        return self._memmaps
+
+    def _values(self, column, lo, hi):
+        """Returns the values of a column for rows lo..hi, with the revised values of the overlay."""
+        values = np.array(self._columns()[column][lo:hi])
+        if self.overlay is not None:
+            positions = self.overlay["position"]
+            first, last = np.searchsorted(positions, [lo, hi])
+            values[positions[first:last] - lo] = self.overlay[column][first:last]
+        return values
+
+    def append(self, frame, date_column="DATE", source=None):
+        """Appends daily rows, which must all be after the last stored day. source is the
+        signature of the file they come from (see update())."""
+        version = self.version + 1
+        appended = self._append(frame, date_column, version)
+        if source is not None and source != self.source:
+            self.source = source
+        elif not appended:
+            return self
+        self._commit(version)
+        return self
+
+    def _append(self, frame, date_column, version):
+        """Writes the rows of frame after the stored ones and updates the rollups, without
+        committing them. Returns the number of days appended."""
+        if not self.columns:
+            self.date_column = date_column
+            self.date_dtype = str(frame[date_column].dtype)
+            self.columns = [column for column in frame.columns if column != date_column]
+            self.data_version = version
+            self.directory.mkdir(parents=True, exist_ok=True)
+        frame = frame.sort_values(self.date_column)
+        days = _day_numbers(frame[self.date_column])
+        if not len(days):
+            return 0
+        if np.any(np.diff(days) == 0) or (self.rows and days[0] <= self._columns()["day"][-1]):
+            raise ValueError("Can only append new days, after the last stored one")
+        values = {column: frame[column].to_numpy(dtype=np.float64, na_value=np.nan) for column in self.columns}
+
+        self._memmaps = None  # the files are about to grow
+        for name, array in [("day", days)] + [(column, values[column]) for column in self.columns]:
+            with open(self._path(name), "ab") as f:
+                # Bytes past the stored rows are left over from an interrupted append
+                f.truncate(self.rows * array.itemsize)
+                f.write(array.tobytes())
+
+        for freq in BASE_FREQUENCIES:
+            ids = _bucket_ids(days, freq)
+            new = {"id": None}
+            for column in self.columns:
+                new["id"], new[column] = _bucket_stats(ids, values[column])
+            old = self.rollups.get(freq)
+            if old is not None:
+                # Only the last stored bucket can receive new days: merge it with the first new one
+                merged_ids = np.concatenate([old["id"], new["id"]])
+                for column in self.columns:
+                    stats = {stat: np.concatenate([old[column][stat], new[column][stat]]) for stat in STATS}
+                    new["id"], new[column] = _combine(merged_ids, stats)
+            self.rollups[freq] = new
+
+        self.rows += len(days)
+        return len(days)
+
+    def _revise(self, frame, version):
+        """Writes new values for days already stored into a new overlay (or, past COMPACT_FRACTION
+        of the rows, into a new set of column files) and computes the buckets of those days again."""
+        frame = frame.sort_values(self.date_column)
+        days = _day_numbers(frame[self.date_column])
+        stored_days = self._columns()["day"]
+        positions = np.searchsorted(stored_days, days)
+        revised = {column: frame[column].to_numpy(dtype=np.float64, na_value=np.nan) for column in self.columns}
+
+        # The new values win over the ones of the previous overlay for the same rows
+        overlay = self.overlay or {"position": np.empty(0, dtype=np.int64),
+                                   **{column: np.empty(0) for column in self.columns}}
+        merged_positions = np.concatenate([positions, overlay["position"]])
+        merged_positions, first = np.unique(merged_positions, return_index=True)
+        self.overlay = {"position": merged_positions}
+        for column in self.columns:
+            self.overlay[column] = np.concatenate([revised[column], overlay[column]])[first]
+        self.overlay_version = version
+
+        if len(merged_positions) > COMPACT_FRACTION * self.rows:
+            self._compact(version)
+        else:
+            np.savez(self._overlay_path(), **self.overlay)
+        for freq in BASE_FREQUENCIES:
+            rollup = self.rollups[freq]
+            for bucket in np.unique(_bucket_ids(days, freq)):
+                position = np.searchsorted(rollup["id"], bucket)
+                lo, hi = np.searchsorted(stored_days, _bucket_bounds(bucket, freq))
+                for column in self.columns:
+                    _, stats = _bucket_stats(np.zeros(hi - lo, dtype=np.int64), self._values(column, lo, hi))
+                    for stat in STATS:
+                        rollup[column][stat][position] = stats[stat][0]
+
+    def _compact(self, version):
+        """Writes the columns with the overlay applied into a new set of files, and drops the overlay."""
+        columns = {"day": np.array(self._columns()["day"])}
+        columns.update((column, self._values(column, 0, self.rows)) for column in self.columns)
+        self.data_version, self._memmaps = version, None
+        self.overlay = self.overlay_version = None
+        for name, array in columns.items():
+            with open(self._path(name), "wb") as f:
+                f.write(array.tobytes())
+
+    def ingest(self, path, date_column="DATE", **read_options):
+        """Brings the store up to date with a CSV file, parsing and applying only what changed
+        since the last ingest (see DeltaIngestor). read_options go to pandas.read_csv()."""
+        stat = os.stat(path)
+        has_ingestor = bool(self.rows) and self._ingestor_path().exists()
+        if has_ingestor and self.source and (stat.st_size, stat.st_mtime_ns) == (self.source["size"],
+                                                                                 self.source["mtime_ns"]):
+            return self
+        ingestor = DeltaIngestor.load(self._ingestor_path()) if has_ingestor else None
+        if ingestor is None or ingestor.key != date_column:
+            # Nothing to compare the file with: the store is rebuilt from the whole file
+            ingestor = DeltaIngestor(date_column, parse_dates=[date_column], **read_options)
+            self._reset()
+        delta = ingestor.ingest(path)
+
+        version = self.version + 1
+        appended, revised = delta.appended, delta.revised
+        if self.rows and (len(delta.deleted) or set(ingestor.frame.columns) != {self.date_column, *self.columns}
+                          or (len(appended) and appended[date_column].min() <= self.last_day)):
+            self._reset()
+            appended, revised = ingestor.frame, ingestor.frame.iloc[:0]
+        if len(revised):
+            self._revise(revised, version)
+        self._append(appended, date_column, version)
+        self.source = {"size": ingestor.size, "mtime_ns": stat.st_mtime_ns, "sha1": ingestor.sha1}
+        ingestor.save(self._ingestor_path(version))
+        self._commit(version)
+        return self
+
+    def update(self, frame, date_column="DATE", source=None):
+        """Appends only the rows of frame that are newer than the last stored day.
+
+        When the stored days differ from the ones of frame (a revised or replaced source), the
+        store is rebuilt from frame. With the path of the source file, nothing is compared when
+        the file is the same as at the last update.
+        """
+        signature = None
+        if source is not None:
+            stat = os.stat(source)
+            if (self.source and self.rows and stat.st_size == self.source["size"]
+                    and stat.st_mtime_ns == self.source["mtime_ns"]):
+                return self
+            signature = _source_signature(source)
+            if self.source and self.rows and signature["sha1"] == self.source["sha1"]:
+                return self.append(frame.iloc[:0], date_column, signature)  # touched, not changed
+
+        last_day = self.last_day
+        if last_day is not None:
+            known = frame[frame[self.date_column] <= last_day]
+            if self._same_days(known):
+                frame = frame[frame[self.date_column] > last_day]
+            else:
+                self._reset()
+        return self.append(frame, date_column, signature)
+
+    def _same_days(self, frame):
+        """True when frame has the same columns, days and values as the store."""
+        if sorted(frame.columns) != sorted([self.date_column] + self.columns) or len(frame) != self.rows:
+            return False
+        frame = frame.sort_values(self.date_column)
+        columns = self._columns()
+        if not np.array_equal(_day_numbers(frame[self.date_column]), columns["day"]):
+            return False
+        return all(np.array_equal(frame[column].to_numpy(dtype=np.float64, na_value=np.nan),
+                                  self._values(column, 0, self.rows), equal_nan=True) for column in self.columns)
+
+    def read(self, start=None, end=None):
+        """Returns the daily rows between start and end (inclusive) as a DataFrame."""
+        columns = self._columns()
+        lo, hi = self._row_range(start, end)
+        frame = pd.DataFrame({column: self._values(column, lo, hi) for column in self.columns})
+        frame.insert(0, self.date_column, columns["day"][lo:hi].astype("datetime64[D]").astype(self.date_dtype))
+        return frame
+
+    def _row_range(self, start, end):
+        days = self._columns()["day"]
+        lo = 0 if start is None else int(np.searchsorted(days, _day_numbers(pd.Timestamp(start).to_datetime64())))
+        hi = len(days) if end is None else int(np.searchsorted(days, _day_numbers(pd.Timestamp(end).to_datetime64()), "right"))
+        return lo, max(lo, hi)
+
+    def resample(self, freq="ME", how="last", start=None, end=None):
+        """Returns the daily rows resampled to W, ME, QE or YE buckets, like
+        frame.resample(freq, on=DATE).<how>(), optionally limited to the days start..end."""
+        if freq not in BASE_FREQUENCIES and freq not in DERIVED_FREQUENCIES:
+            raise ValueError(f"freq must be one of {BASE_FREQUENCIES + tuple(DERIVED_FREQUENCIES)}, got {freq!r}")
+        if how not in AGGREGATIONS:
+            raise ValueError(f"how must be one of {AGGREGATIONS}, got {how!r}")
+        base = "W" if freq == "W" else "ME"
+        rollup = self.rollups.get(base)
+        lo, hi = self._row_range(start, end)
+        if rollup is None or lo == hi:
+            return pd.DataFrame(columns=self.columns, index=pd.DatetimeIndex([], dtype=self.date_dtype, name=self.date_column))
+
+        days = self._columns()["day"]
+        first_bucket, last_bucket = _bucket_ids(days[[lo, hi - 1]], base)
+        keep = slice(*np.searchsorted(rollup["id"], [first_bucket, last_bucket + 1]))
+        ids = rollup["id"][keep]
+        table = {column: {stat: rollup[column][stat][keep].copy() for stat in STATS} for column in self.columns}
+
+        # Buckets cut by start/end are computed again from their days inside the range
+        for position, bucket in ((0, first_bucket), (len(ids) - 1, last_bucket)):
+            bucket_lo, bucket_hi = np.searchsorted(days, _bucket_bounds(bucket, base))
+            if lo <= bucket_lo and bucket_hi <= hi:
+                continue  # the whole bucket is inside the range
+            bucket_lo, bucket_hi = max(bucket_lo, lo), min(bucket_hi, hi)
+            for column in self.columns:
+                values = self._values(column, bucket_lo, bucket_hi)
+                _, stats = _bucket_stats(np.zeros(len(values), dtype=np.int64), values)
+                for stat in STATS:
+                    table[column][stat][position] = stats[stat][0]
+
+        if freq in DERIVED_FREQUENCIES:
+            grouped = ids // DERIVED_FREQUENCIES[freq]
+            for column in self.columns:
+                _, table[column] = _combine(grouped, table[column])
+            ids = np.unique(grouped)
+
+        # Every bucket between the first and the last one, empty ones included, like pandas
+        all_ids = np.arange(ids[0], ids[-1] + 1)
+        where = ids - ids[0]
+        result = {}
+        for column in self.columns:
+            stats = table[column]
+            if how == "mean":
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    values = np.where(stats["count"] > 0, stats["sum"] / stats["count"], np.nan)
+            elif how == "sum":
+                values = stats["sum"]
+            else:
+                values = stats[how]
+            filled = np.full(len(all_ids), 0.0 if how in ("count", "sum") else np.nan)
+            filled[where] = values
+            result[column] = filled.astype(np.int64) if how == "count" else filled
+        index = pd.DatetimeIndex(_bucket_labels(all_ids, freq).astype(self.date_dtype), name=self.date_column)
+        return pd.DataFrame(result, index=index)
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    import time
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from common.csv_cache import read_csv
+
+    prices = read_csv("Daily Bitcoin Price.csv", parse_dates=["DATE"]).dropna()
+    with tempfile.TemporaryDirectory() as directory:
+        # Load all but the last 30 days, then append them as if they just arrived
+        store = TimeSeriesStore(directory).append(prices[:-30])
+        TimeSeriesStore(directory).update(prices)
+        store = TimeSeriesStore(directory)
+        print(f"{store.rows} days, last one {store.last_day.date()}")
+
+        # A revised day rebuilds the store
+        revised = prices.copy()
+        revised.loc[revised.index[-100], "CLOSE"] = 1.0
+        pd.testing.assert_frame_equal(TimeSeriesStore(directory).update(revised).resample("ME", "min"),
+                                      revised.resample("ME", on="DATE").min(), check_freq=False)
+        store = TimeSeriesStore(directory).update(prices)
+
+        for freq in ("W", "ME", "QE", "YE"):
+            for how in ("last", "mean", "min", "max", "sum"):
+                expected = getattr(prices.resample(freq, on="DATE"), how)()
+                pd.testing.assert_frame_equal(store.resample(freq, how), expected, check_freq=False)
+        print("Same results as DataFrame.resample()")
+
+        start = time.perf_counter()
+        monthly = store.resample("ME", "mean", start="2017-03-15", end="2018-02-10")
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"Monthly means between 2017-03-15 and 2018-02-10 ({elapsed:.2f}ms):")
+        print(monthly)
+
+    # The same through ingest(): a new day, then a revised one, applied as deltas
+    with tempfile.TemporaryDirectory() as directory:
+        csv = Path(directory) / "prices.csv"
+        header, *rows = Path("Daily Bitcoin Price.csv").read_bytes().split(b"\r\n")
+        csv.write_bytes(b"\r\n".join([header, *rows[:-1]]))
+        TimeSeriesStore(directory).ingest(csv)
+        # The last day arrives and the price of the day before is revised
+        day, _, volume = rows[-2].split(b",")
+        rows[-2] = b",".join([day, b"1.0", volume])
+        csv.write_bytes(b"\r\n".join([header, *rows]))
+        store = TimeSeriesStore(directory).ingest(csv)
+        expected = pd.read_csv(csv, parse_dates=["DATE"])
+        for how in ("last", "mean", "max"):
+            pd.testing.assert_frame_equal(store.resample("W", how), getattr(expected.resample("W", on="DATE"), how)(),
+                                          check_freq=False, check_index_type=False)
+        print(f"ingest(): {store.rows} days, same results as reading the revised file")
@@ -0,0 +1,69 @@
+"""
+The analysis scripts themselves, run on a folder of (synthetic) data.
+
+Each case imports a script from its project folder (with its sibling modules: the pipeline,
+the indexes, the time-series store) and calls its main() inside the data folder, which
+generators.py lays out like the project folder. Nothing is copied from the scripts, so the
+benchmark measures the code that actually runs, and follows it when it changes.
+
+Before every run the .csv_cache folders of the data folder are removed, so every run reads
+and parses the CSVs like a first run. The opt-in time-series store of google_trends is turned
+on, inside that .csv_cache folder. The prints are thrown away and the charts are rendered
+to files (run.py sets a non-interactive matplotlib backend).
+"""
+
+import contextlib
+import importlib.util
+import os
+import shutil
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# takes_folder: main() reads its files from the folder it is given instead of the current one
+Case = namedtuple("Case", ["folder", "script", "takes_folder"])
+
+CASES = {
+    "college_salaries": Case("72-college-data-exploration-with-pandas", "main.py", False),
+    "squirrel_colors": Case("25-csv-panda", "squirrel.py", False),
+    "lego_sets": Case("74-LEGO-data-aggregate-merge-with-pandas-matplotlib", "main.py", False),
+    "google_trends": Case("75-google-trend-data", "main.py", True),
+}
+
+# Imported scripts: case name -> module
+_MODULES = {}
+
+
+def load(name):
+    """Imports the script of a case from its project folder (once) and returns it."""
+    if name not in _MODULES:
+        case = CASES[name]
+        folder = ROOT / case.folder
+        sys.path.insert(0, str(folder))
+        spec = importlib.util.spec_from_file_location(f"{name}_script", folder / case.script)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _MODULES[name] = module
+    return _MODULES[name]
+
+
+def run(name, directory):
+    """Runs the main() of a case from directory, without its caches and its prints."""
+    directory = Path(directory).resolve()
+    main = load(name).main
+    for cache in directory.rglob(".csv_cache"):
+        shutil.rmtree(cache)
+    cwd, store = os.getcwd(), os.environ.get("TIMESERIES_STORE")
+    os.chdir(directory)
+    os.environ["TIMESERIES_STORE"] = str(directory / ".csv_cache")
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            main(directory) if CASES[name].takes_folder else main()
+    finally:
+        os.chdir(cwd)
+        if store is None:
+            del os.environ["TIMESERIES_STORE"]
+        else:
+            os.environ["TIMESERIES_STORE"] = store
@@ -0,0 +1,179 @@
+"""
+Synthetic, bigger versions of the datasets used by the analysis scripts.
+
+The bundled CSVs are tiny (50 majors, 3,000 squirrels, 16,000 LEGO sets), so they can't tell
+how the scripts behave on real-sized data. Every generator here takes a real dataset and a
+scale factor and returns a frame with scale times more rows that looks like it:
+  - tables (LEGO sets/themes, squirrels, salaries) are bootstrapped: rows are sampled with
+    replacement from the real ones, ids are made unique, and numbers get a little noise so the
+    distributions stay the same without exact duplicates. Theme ids of the sets point to one of
+    the scale copies of the themes, like benchmark_join.py in the LEGO folder,
+  - the daily prices get scale times more days, going back before the real first day, with
+    returns bootstrapped from the real ones (the time-series store of the trend folder only
+    keeps one row per day),
+  - monthly series keep the same calendar span but get scale times more points, interpolated
+    with noise in between.
+
+No file gets more than MAX_ROWS rows: at 10,000x the LEGO sets alone would be 157M rows (and
+the daily prices would go back further than pandas dates can), which no script could load.
+The files that hit the limit are smaller than the scale asks for: generate() prints the row
+count of every file it writes.
+
+generate() writes all of them as CSVs in one folder per scale, laid out like the project
+folders (the LEGO tables in data/ with colors.csv) so the scripts can run inside it.
+"""
+
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+LEGO = ROOT / "74-LEGO-data-aggregate-merge-with-pandas-matplotlib" / "data"
+SQUIRRELS = ROOT / "25-csv-panda" / "squirrel_data_main.csv"
+SALARIES = ROOT / "72-college-data-exploration-with-pandas" / "salaries_by_college_major.csv"
+TRENDS = ROOT / "75-google-trend-data"
+MONTHLY_TRENDS = [
+    "TESLA Search Trend vs Price.csv",
+    "Bitcoin Search Trend.csv",
+    "UE Benefits Search vs UE Rate 2004-19.csv",
+]
+DAILY_PRICES = "Daily Bitcoin Price.csv"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Largest number of rows of a generated file
+MAX_ROWS = 5_000_000
+# Daily prices can't start before the first date pandas handles (1677-09-21)
+MAX_DAYS = 100_000
+
+# Bump when the generators change, so the files generated before aren't reused
+VERSION = 2
+
+
+def _rows(real_rows, scale, limit=MAX_ROWS):
+    """Returns the number of rows of a generated file: scale times real_rows, at most limit."""
+    return min(real_rows * scale, max(limit, real_rows))
+
+
+def _unique_ids(ids, suffix_start=0):
+    """Makes sampled ids unique by appending the row number."""
+    numbers = pd.Series(np.arange(suffix_start, suffix_start + len(ids))).astype(str)
+    return pd.Series(ids).astype(str).reset_index(drop=True) + "." + numbers
+
+
+def lego(scale, rng):
+    """Returns (sets, themes): scale copies of the themes and scale times more sets."""
+    sets = pd.read_csv(LEGO / "sets.csv")
+    themes = pd.read_csv(LEGO / "themes.csv")
+
+    theme_copies = _rows(len(themes), scale) // len(themes)
+    id_step = int(themes.id.max()) + 1
+    offsets = np.repeat(np.arange(theme_copies) * id_step, len(themes))
+    big_themes = pd.DataFrame({
+        "id": np.tile(themes.id.to_numpy(), theme_copies) + offsets,
+        "name": np.tile(themes.name.to_numpy(dtype=object), theme_copies),
+        "parent_id": np.tile(themes.parent_id.to_numpy(), theme_copies) + offsets,
+    })
+
+    sample = sets.iloc[rng.integers(0, len(sets), _rows(len(sets), scale))].reset_index(drop=True)
+    copies = rng.integers(0, theme_copies, len(sample))
+    big_sets = pd.DataFrame({
+        "set_num": _unique_ids(sample.set_num),
+        "name": sample.name,
+        "year": sample.year,
+        "theme_id": sample.theme_id + copies * id_step,
+        # Parts bootstrapped independently of the rest, within the same year
+        "num_parts": sample.groupby("year")["num_parts"].transform(lambda parts: rng.permutation(parts.to_numpy())),
+    })
+    return big_sets, big_themes
+
+
+def squirrels(scale, rng):
+    """Returns scale times more squirrel sightings, moved a few meters from real ones."""
+    data = pd.read_csv(SQUIRRELS)
+    sample = data.iloc[rng.integers(0, len(data), _rows(len(data), scale))].reset_index(drop=True)
+    # ~10 m of noise, kept inside the park's bounding box
+    for column in ("X", "Y"):
+        noise = rng.normal(0, 1e-4, len(sample))
+        sample[column] = np.clip(sample[column] + noise, data[column].min(), data[column].max())
+    sample["Unique Squirrel ID"] = _unique_ids(sample["Unique Squirrel ID"])
+    sample["Lat/Long"] = "POINT (" + sample.X.astype(str) + " " + sample.Y.astype(str) + ")"
+    return sample
+
+
+def salaries(scale, rng):
+    """Returns scale times more majors, with salaries within ~5% of real ones."""
+    data = pd.read_csv(SALARIES).dropna()
+    sample = data.iloc[rng.integers(0, len(data), _rows(len(data), scale))].reset_index(drop=True)
+    for column in sample.columns:
+        if column.endswith("Salary"):
+            noisy = sample[column] * rng.lognormal(0, 0.05, len(sample))
+            sample[column] = (noisy / 100).round() * 100
+    sample["Undergraduate Major"] = _unique_ids(sample["Undergraduate Major"])
+    return sample
+
+
+def daily_prices(scale, rng):
+    """Returns scale times more days of Bitcoin prices, ending on the real last day, with the
+    same daily volatility."""
+    data = pd.read_csv(TRENDS / DAILY_PRICES, parse_dates=["DATE"]).dropna()
+    n = _rows(len(data), scale, MAX_DAYS)
+    returns = np.diff(np.log(data.CLOSE.to_numpy()))
+    sampled = rng.choice(returns, n - 1)
+    log_volume = rng.choice(np.log(data.VOLUME.to_numpy()), n)
+    days = pd.date_range(end=data.DATE.iloc[-1], periods=n, freq="D")
+    return pd.DataFrame({
+        "DATE": days.strftime("%Y-%m-%d"),
+        "CLOSE": data.CLOSE.iloc[-1] * np.exp(np.concatenate([[0], np.cumsum(sampled)]) - sampled.sum()),
+        "VOLUME": np.exp(log_volume).round(),
+    })
+
+
+def monthly_trend(name, scale, rng):
+    """Returns a monthly trend file with scale points per month, interpolated with noise."""
+    data = pd.read_csv(TRENDS / name)
+    dates = pd.to_datetime(data.MONTH)
+    times = pd.date_range(dates.iloc[0], dates.iloc[-1], periods=_rows(len(data), scale))
+    result = {"MONTH": times.strftime(TIMESTAMP_FORMAT)}
+    x, new_x = dates.to_numpy().astype(np.float64), times.to_numpy().astype(np.float64)
+    for column in data.columns.drop("MONTH"):
+        values = data[column].to_numpy(dtype=np.float64)
+        noise = rng.normal(0, np.std(np.diff(values)) / 2, len(times))
+        series = np.interp(new_x, x, values) + noise
+        if column.endswith("_SEARCH"):
+            series = np.clip(series.round(), 0, 100).astype(np.int64)  # search interest is 0-100
+        result[column] = series
+    return pd.DataFrame(result)
+
+
+def _write(frame, path):
+    frame.to_csv(path, index=False)
+    print(f"   {path.name}: {len(frame):,} rows")
+
+
+def generate(scale, directory, seed=0):
+    """Writes every synthetic dataset at this scale into directory/<scale>x, returns that folder.
+
+    The files are reused if they were already generated with the same scale, seed and VERSION.
+    """
+    folder = Path(directory) / f"{scale}x"
+    done = folder / f".done-{seed}-v{VERSION}"
+    if done.exists():
+        return folder
+    (folder / "data").mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    # One file at a time, so only one big frame is in memory
+    sets, themes = lego(scale, rng)
+    _write(sets, folder / "data" / "sets.csv")
+    _write(themes, folder / "data" / "themes.csv")
+    del sets, themes
+    shutil.copyfile(LEGO / "colors.csv", folder / "data" / "colors.csv")
+    _write(squirrels(scale, rng), folder / "squirrel_data_main.csv")
+    _write(salaries(scale, rng), folder / "salaries_by_college_major.csv")
+    _write(daily_prices(scale, rng), folder / DAILY_PRICES)
+    for name in MONTHLY_TRENDS:
+        _write(monthly_trend(name, scale, rng), folder / name)
+    done.touch()
+    return folder
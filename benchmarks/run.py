@@ -0,0 +1,157 @@
+"""
+Scaling benchmark of the analysis scripts on synthetic data, with regression checks.
+
+For every scale (10x the real data by default, then 100x, ... up to 10,000x) the datasets are
+generated once by generators.py (no file gets more than generators.MAX_ROWS rows), then every
+case of cases.py, one of the analysis scripts, is run in a fresh process:
+  - time: the best of --repeat runs,
+  - peak RSS: the peak resident memory of that process, minus what it used before the first
+    run (Python, pandas, numpy, matplotlib and the script's own imports).
+A fresh process per case keeps the memory of one case out of the next one. The peak is read
+from VmHWM in /proc/self/status on Linux: unlike ru_maxrss, it starts again at exec, so the
+memory used by the parent to generate the data isn't counted. On Windows it is the peak
+working set of the process.
+
+The results can be saved as a baseline (--save-baseline) and every later run is compared to
+it: a case that got slower or bigger than the baseline by more than --tolerance (25% by
+default) is flagged as a REGRESSION, and the exit code is 1 so it can fail a CI job.
+The baseline depends on the machine, so it is kept locally and not committed.
+
+Run it from the root of the repo: python -m benchmarks.run --scales 10 100
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks import cases
+from benchmarks.cases import CASES
+from benchmarks.generators import generate
+
+HERE = Path(__file__).resolve().parent
+DATA_DIR = HERE / ".data"
+BASELINE = HERE / "baseline.json"
+# Differences smaller than this are noise, whatever the tolerance
+NOISE = {"seconds": 0.01, "peak_rss": 2**20}
+
+
+def _peak_rss():
+    """Peak resident memory of this process in bytes."""
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    if resource is None:
+        return _peak_working_set()
+    # ru_maxrss is in bytes on macOS, KB elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _peak_working_set():
+    """Peak working set of this process in bytes (Windows)."""
+    import ctypes
+    from ctypes import wintypes
+
+    class Counters(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in (
+                "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+    counters = Counters()
+    counters.cb = ctypes.sizeof(counters)
+    ctypes.windll.kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    get_info = ctypes.windll.psapi.GetProcessMemoryInfo
+    get_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(Counters), wintypes.DWORD]
+    get_info(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+    return counters.PeakWorkingSetSize
+
+
+def _measure(case, folder, repeat):
+    """Runs a case repeat times in this process, returns (best seconds, peak RSS bytes)."""
+    cases.load(case)
+    before = _peak_rss()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cases.run(case, folder)
+        times.append(time.perf_counter() - start)
+    return min(times), _peak_rss() - before
+
+
+def run_case(case, folder, repeat):
+    """Measures a case in a new process."""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(_measure, (case, folder, repeat))
+
+
+def compare(results, baseline, tolerance):
+    """Returns the keys of the results more than tolerance above the baseline, with the reason."""
+    regressions = {}
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        reasons = [metric for metric in ("seconds", "peak_rss")
+                   if result[metric] > baseline[key][metric] * (1 + tolerance) + NOISE[metric]]
+        if reasons:
+            regressions[key] = reasons
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100],
+                        help="scale factors of the synthetic data (e.g. 10 100 1000 10000)")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store these results as the new baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+    # The scripts save their charts to files instead of opening windows (common/charts.py)
+    os.environ["MPLBACKEND"] = "Agg"
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    results = {}
+    print(f"{'case':<18} {'scale':>6} {'time':>10} {'peak RSS':>10} {'baseline':>10}")
+    for scale in args.scales:
+        start = time.perf_counter()
+        folder = generate(scale, args.data_dir)
+        print(f"-- {scale}x data ready in {time.perf_counter() - start:.1f}s ({folder})")
+        for case in args.cases:
+            seconds, peak_rss = run_case(case, folder, args.repeat)
+            key = f"{case}@{scale}x"
+            results[key] = {"seconds": seconds, "peak_rss": peak_rss}
+            previous = f"{baseline[key]['seconds']:.3f}s" if key in baseline else "-"
+            print(f"{case:<18} {scale:>5}x {seconds:>9.3f}s {peak_rss / 2**20:>7.1f} MB {previous:>10}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({**baseline, **results}, indent=2, sort_keys=True) + "\n")
+        print(f"Saved the baseline of {len(results)} results to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for key, reasons in regressions.items():
+        details = ", ".join(f"{metric} {results[key][metric]:.6g} vs {baseline[key][metric]:.6g}" for metric in reasons)
+        print(f"REGRESSION {key}: {details}")
+    if not baseline:
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
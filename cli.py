@@ -0,0 +1,98 @@
+"""
+One entry point for all the projects: python cli.py <command>
+
+Every project is a folder with its own script, run from inside the folder. Those scripts import
+pandas, matplotlib or turtle at the top, which takes hundreds of milliseconds. This file only
+imports the standard library: the script of a command is imported when the command runs, from
+its folder (so its data files and sibling modules are found like before), and then its main()
+is called. Running one command never pays for the imports of the others.
+
+With --timing the time spent importing the script (its heavy imports included) and running it
+is printed on stderr, with the installed packages it pulled in (outside the standard library
+and this repo).
+For a detailed breakdown of the imports: python -X importtime cli.py <command>
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+Command = namedtuple("Command", ["folder", "script", "help"])
+
+COMMANDS = {
+    "coffee": Command("16-coffe-machine-oop", "main.py", "coffee machine: order drinks, 'report' or 'off'"),
+    "quiz": Command("17-quiz", "main.py", "true/false quiz"),
+    "race": Command("19-turtle-sketch-and-race", "main-race.py", "turtle race, bet on the winner"),
+    "snake": Command("21-snake-game", "main.py", "snake game"),
+    "squirrel": Command("25-csv-panda", "squirrel.py", "count the Central Park squirrels by fur color"),
+    "college": Command("72-college-data-exploration-with-pandas", "main.py", "salaries by college major"),
+    "lego": Command("74-LEGO-data-aggregate-merge-with-pandas-matplotlib", "main.py", "LEGO sets, themes and parts"),
+    "trends": Command("75-google-trend-data", "main.py", "Google search trends vs prices"),
+}
+
+
+def load(name):
+    """Imports the script of a command from its folder, which becomes the working directory.
+    Returns (module, seconds)."""
+    command = COMMANDS[name]
+    folder = ROOT / command.folder
+    os.chdir(folder)
+    sys.path.insert(0, str(folder))
+    start = time.perf_counter()
+    spec = importlib.util.spec_from_file_location(f"{name}_script", folder / command.script)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module, time.perf_counter() - start
+
+
+def packages_since(before):
+    """Returns the packages outside the standard library and this repo imported since the
+    sys.modules names of before."""
+    packages = {module_name.split(".")[0] for module_name in set(sys.modules) - before}
+    return sorted(package for package in packages
+                  if package not in sys.stdlib_module_names and not package.startswith("_")
+                  and not _in_repo(sys.modules.get(package)))
+
+
+def _in_repo(module):
+    """True for the modules of this repo (common, the sibling modules of a script), which aren't
+    installed packages."""
+    path = getattr(module, "__file__", None)
+    if not path:
+        return False
+    path = Path(path).resolve()
+    return path.is_relative_to(ROOT) and "site-packages" not in path.parts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run one of the projects.")
+    parser.add_argument("--timing", action="store_true", help="print the import and run time on stderr")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+    for name, command in COMMANDS.items():
+        commands.add_parser(name, help=command.help)
+    args = parser.parse_args(argv)
+
+    cwd, before = os.getcwd(), set(sys.modules)
+    try:
+        module, import_seconds = load(args.command)
+        start = time.perf_counter()
+        try:
+            module.main()
+        finally:
+            if args.timing:
+                run_seconds = time.perf_counter() - start
+                print(f"{args.command}: import {import_seconds * 1000:.0f} ms, run {run_seconds * 1000:.0f} ms",
+                      file=sys.stderr)
+                print(f"  imported: {', '.join(packages_since(before))}", file=sys.stderr)
+    finally:
+        os.chdir(cwd)  # load() moved into the folder of the project
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Charts that can be shown on screen or exported headless, in parallel, by the analysis scripts.
+
+The scripts used to build their figures with pyplot and call plt.show(block=True), which waits
+for a window to be closed and needs a display, so a batch run just hangs (or does nothing on
+a server). Here a chart is described by a Chart object (title, labels, limits and the series
+of the left and right axes) instead of being drawn right away. A ChartReport then either:
+  - shows it with pyplot, like before, when there is a screen, or
+  - in report mode (no display, a non-interactive backend or CHARTS_DIR set), queues it and
+    export() renders all the queued charts to PNG/SVG files in worker processes (forked, so
+    the scripts don't need a __main__ guard; one after the other where fork isn't available).
+
+Rendering uses the Agg canvas directly (no pyplot, no GUI). Every worker keeps one figure per
+(figsize, dpi) with its two axes and only swaps the plotted artists between charts, which is
+cheaper than creating a figure (or calling cla()) for every chart.
+
+matplotlib takes a few hundred milliseconds to import, so it is only imported when a chart is
+drawn: describing charts, or importing this module, costs nothing when none is drawn.
+
+Long series are decimated with lttb() before being plotted: a 1200 pixels wide chart can't
+show more than ~1200 points anyway, and Largest-Triangle-Three-Buckets keeps the peaks and
+dips that plain every-nth-row sampling would miss.
+"""
+
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+NON_INTERACTIVE_BACKENDS = {"agg", "cairo", "pdf", "pgf", "ps", "svg", "template"}
+DEFAULT_FORMATS = ("png", "svg")
+# Longest date range drawn with a tick per year (and a minor tick per month)
+MAX_YEAR_TICKS = 50
+
+
+def lttb(x, y, threshold):
+    """Returns the indices of the threshold points of (x, y) picked by Largest-Triangle-Three-Buckets."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # First and last points are always kept, the rest is split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        # Average of the next bucket (or the last point) is the third corner of the triangle
+        next_start, next_stop = stop, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[next_start:next_stop].mean()
+        next_y = y[next_start:next_stop].mean()
+        # Twice the area of the triangles (previous point, candidate, next average)
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def _numeric_x(x):
+    """Returns x as floats (dates as matplotlib date numbers) and whether they were dates."""
+    x = np.asarray(x)
+    if x.dtype.kind == "O" and len(x) and hasattr(x[0], "year"):
+        x = x.astype("datetime64[ns]")  # Timestamp / datetime objects
+    if x.dtype.kind == "M":
+        import matplotlib.dates as mdates
+        return mdates.date2num(x.astype("datetime64[ns]")), True
+    return x.astype(np.float64), False
+
+
+class Chart:
+    """Description of a chart with a left and an optional right (twin) y axis."""
+
+    def __init__(self, name, title="", figsize=(10, 6), dpi=120, xlabel="", title_fontsize=None,
+                 tick_fontsize=None, tick_rotation=0, grid=None):
+        self.name = name
+        self.title = title
+        self.figsize = tuple(figsize)
+        self.dpi = dpi
+        self.xlabel = xlabel
+        self.title_fontsize = title_fontsize
+        self.tick_fontsize = tick_fontsize
+        self.tick_rotation = tick_rotation
+        self.grid = grid  # None, or the keyword arguments of Axes.grid() for the left axis
+        self.xlim = None
+        self.dates = False
+        self.categories = None
+        self.series = []  # (kind, axis, x, y, style)
+        self.axes = {"left": {}, "right": {}}
+
+    def line(self, x, y, axis="left", max_points=None, **style):
+        """Adds a line, downsampled to max_points (default: the chart width in pixels)."""
+        x, self.dates = _numeric_x(x)
+        y = np.asarray(y, dtype=np.float64)
+        keep = lttb(x, y, max_points or int(self.figsize[0] * self.dpi))
+        self.series.append(("line", axis, x[keep], y[keep], style))
+        return self
+
+    def bar(self, labels, heights, **style):
+        """Adds a bar chart with one bar per label, on the left axis."""
+        self.categories = [str(label) for label in labels]
+        positions = np.arange(len(self.categories), dtype=np.float64)
+        self.series.append(("bar", "left", positions, np.asarray(heights, dtype=np.float64), style))
+        return self
+
+    def set_axis(self, axis="left", label="", color=None, fontsize=None, ylim=None):
+        """Sets the label, label colour, font size and limits of the left or right y axis."""
+        self.axes[axis] = {"label": label, "color": color, "fontsize": fontsize, "ylim": ylim}
+        return self
+
+    def set_xlim(self, left, right):
+        values, _ = _numeric_x([left, right])
+        self.xlim = tuple(values)
+        return self
+
+    def _years(self):
+        """Returns the number of years between the first and the last date of the series."""
+        x = np.concatenate([x for _, _, x, _, _ in self.series]) if self.series else np.zeros(1)
+        return (x.max() - x.min()) / 365.25
+
+    def draw(self, figure, ax1, ax2):
+        """Draws the chart on a figure whose two axes share the x axis (ax2 = ax1.twinx())."""
+        import matplotlib.dates as mdates
+        from matplotlib import rcParams
+        from matplotlib.ticker import AutoLocator, FixedLocator, NullLocator, ScalarFormatter
+
+        ax1.set_title(self.title, fontsize=self.title_fontsize or rcParams["axes.titlesize"])
+        ax1.set_xlabel(self.xlabel)
+        ax2.set_visible(any(axis == "right" for _, axis, _, _, _ in self.series))
+
+        for kind, axis, x, y, style in self.series:
+            ax = ax1 if axis == "left" else ax2
+            if kind == "line":
+                ax.plot(x, y, **style)
+            else:
+                ax.bar(x, y, **style)
+
+        for ax, name in ((ax1, "left"), (ax2, "right")):
+            settings = self.axes[name]
+            ax.set_ylabel(settings.get("label", ""),
+                          color=settings.get("color") or rcParams["axes.labelcolor"],
+                          fontsize=settings.get("fontsize") or rcParams["axes.labelsize"])
+            ax.set_autoscale_on(True)
+            ax.relim()
+            ax.autoscale_view()
+            if settings.get("ylim") is not None:
+                ax.set_ylim(*settings["ylim"])
+
+        if self.categories is not None:
+            ax1.xaxis.set_major_locator(FixedLocator(np.arange(len(self.categories))))
+            ax1.set_xticklabels(self.categories)
+            ax1.xaxis.set_minor_locator(NullLocator())
+        elif self.dates and self._years() <= MAX_YEAR_TICKS:
+            ax1.xaxis.set_major_locator(mdates.YearLocator())
+            ax1.xaxis.set_major_formatter(mdates.DateFormatter("%Y"))
+            ax1.xaxis.set_minor_locator(mdates.MonthLocator())
+        elif self.dates:
+            locator = mdates.AutoDateLocator()
+            ax1.xaxis.set_major_locator(locator)
+            ax1.xaxis.set_major_formatter(mdates.AutoDateFormatter(locator))
+            ax1.xaxis.set_minor_locator(NullLocator())
+        else:
+            ax1.xaxis.set_major_locator(AutoLocator())
+            ax1.xaxis.set_major_formatter(ScalarFormatter())
+            ax1.xaxis.set_minor_locator(NullLocator())
+        if self.xlim is not None:
+            ax1.set_xlim(*self.xlim)
+
+        ax1.tick_params(axis="x", labelrotation=self.tick_rotation,
+                        labelsize=self.tick_fontsize or rcParams["xtick.labelsize"])
+        if self.grid is None:
+            ax1.grid(False)
+        else:
+            ax1.grid(True, **self.grid)
+
+
+def _clear(ax):
+    """Removes the plotted artists of ax but keeps the axes themselves."""
+    for container in list(ax.containers):
+        container.remove()
+    for artist in list(ax.lines) + list(ax.patches) + list(ax.collections):
+        artist.remove()
+    ax.set_prop_cycle(None)  # the next line gets the first colour again
+
+
+# Figures of the current process, reused across charts: (figsize, dpi) -> (figure, ax1, ax2)
+_FIGURES = {}
+
+
+def render(chart, directory, formats=DEFAULT_FORMATS):
+    """Renders a chart to directory/<name>.<format> files and returns their paths."""
+    key = (chart.figsize, chart.dpi)
+    if key not in _FIGURES:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        figure = Figure(figsize=chart.figsize, dpi=chart.dpi)
+        FigureCanvasAgg(figure)
+        ax1 = figure.add_subplot()
+        _FIGURES[key] = (figure, ax1, ax1.twinx())
+    figure, ax1, ax2 = _FIGURES[key]
+    _clear(ax1)
+    _clear(ax2)
+    chart.draw(figure, ax1, ax2)
+
+    paths = []
+    for fmt in formats:
+        path = Path(directory) / f"{chart.name}.{fmt}"
+        figure.savefig(path, format=fmt, dpi=chart.dpi, bbox_inches="tight")
+        paths.append(str(path))
+    return paths
+
+
+def _fork_context():
+    """Returns the "fork" multiprocessing context, or None where forking isn't available or safe.
+
+    Spawned (or forkserver) workers import the __main__ module again, which re-runs a whole
+    script that calls export() without an `if __name__ == "__main__":` guard. Forked workers
+    start from a copy of the process instead, so they are safe to use from any script."""
+    if sys.platform == "darwin" or "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context("fork")
+
+
+def export(charts, directory, formats=DEFAULT_FORMATS, workers=None):
+    """Renders the charts to files in parallel worker processes, returns all the paths."""
+    charts = list(charts)
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    workers = min(workers or os.cpu_count() or 1, len(charts))
+    context = _fork_context()
+    if workers <= 1 or context is None:
+        return [path for chart in charts for path in render(chart, directory, formats)]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        results = pool.map(render, charts, [directory] * len(charts), [formats] * len(charts))
+        return [path for paths in results for path in paths]
+
+
+def is_headless():
+    """True when charts can't (or shouldn't) be shown on screen."""
+    if os.environ.get("CHARTS_DIR"):
+        return True
+    import matplotlib.pyplot as plt
+    return plt.get_backend().lower() in NON_INTERACTIVE_BACKENDS
+
+
+class ChartReport:
+    """Shows charts on screen, or in report mode collects them and exports them to files."""
+
+    def __init__(self, directory=None, formats=DEFAULT_FORMATS, workers=None, headless=None):
+        self.headless = is_headless() if headless is None else headless
+        self.directory = directory or os.environ.get("CHARTS_DIR") or "charts"
+        self.formats = formats
+        self.workers = workers
+        self.pending = []
+
+    def show(self, chart, block=True):
+        """Displays the chart with pyplot, or queues it for export() in report mode."""
+        if self.headless:
+            self.pending.append(chart)
+            return
+        import matplotlib.pyplot as plt
+        figure = plt.figure(figsize=chart.figsize, dpi=chart.dpi)
+        ax1 = figure.add_subplot()
+        chart.draw(figure, ax1, ax1.twinx())
+        plt.show(block=block)
+
+    def save(self, chart):
+        """Queues the chart for export() in report mode, and leaves it out on screen."""
+        if self.headless:
+            self.pending.append(chart)
+
+    def export(self):
+        """Renders the queued charts to files and returns their paths (nothing to do on screen)."""
+        if not self.pending:
+            return []
+        paths = export(self.pending, self.directory, self.formats, self.workers)
+        self.pending = []
+        print(f"Saved {len(paths)} chart files to {self.directory}/")
+        return paths
@@ -0,0 +1,321 @@
+"""
+Columnar binary cache for the CSV datasets used by the analysis scripts.
+
+read_csv() is a drop-in replacement for pandas.read_csv(). The first time a file is read it is
+parsed as usual and every column is stored as a .npy file inside a ".csv_cache" folder next to
+the source. Later runs memory-map those files instead of parsing the CSV again, so loading a
+frame costs almost nothing until the data is actually touched.
+
+Each cache entry is keyed by the source path and the read options, and remembers the source
+mtime, size and SHA-1. If the mtime changed but the contents did not (e.g. after a git checkout)
+the entry is kept; otherwise the CSV is parsed again and the entry rebuilt.
+
+With optimize=True frames go through common.dtypes.optimize_dtypes() before being cached, so
+the cache holds the downcast numbers, booleans and categoricals, and the memory saved is
+recorded in the manifest (read_csv(..., report=True) prints it). optimize can also be a dict of
+optimize_dtypes() options, e.g. {"parse_booleans": False}. It is opt-in: by default the frames
+have the same dtypes as with pandas.read_csv(); every analysis script turns it on.
+
+Columns named in parse_dates are parsed with the format common.dates detects for them, instead
+of letting pandas guess it. The formats are kept in the manifest: when the entry is rebuilt
+after the CSV changed, the format of the previous version is tried first and detected again
+only if it doesn't fit any more. A column in a format common.dates doesn't know is parsed by
+pd.to_datetime() without a format, like pandas.read_csv(parse_dates=...) would.
+
+Strings are stored as categorical codes plus an array of unique values, datetimes as
+datetime64 and pandas nullable columns as data plus mask, so all of them can be memory-mapped.
+
+An entry is written in a temporary folder next to it and renamed into place when complete, so
+a process reading (or memory-mapping) the cache never sees a half-written entry, even while
+another one rebuilds it. An entry that can't be read (a corrupt manifest, files gone) is a
+cache miss.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from common.dates import detect_date_format, parse_dates
+from common.dtypes import memory_report, memory_usage, optimize_dtypes
+
+CACHE_DIR_NAME = ".csv_cache"
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 3
+
+
+def file_sha1(path, block_size=1 << 20):
+    """Returns the SHA-1 hex digest of a file, read in blocks."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_entry_dir(path, read_options, cache_dir=None):
+    """Returns the folder holding the cache entry for this source path and read options."""
+    path = Path(path).resolve()
+    key = json.dumps({"path": str(path), "options": read_options}, sort_keys=True, default=str)
+    key_hash = hashlib.sha1(key.encode()).hexdigest()[:12]
+    root = Path(cache_dir) if cache_dir else path.parent / CACHE_DIR_NAME
+    return root / f"{path.stem}-{key_hash}"
+
+
+def read_csv(path, cache=True, cache_dir=None, optimize=False, report=False, **read_options):
+    """Reads a CSV like pandas.read_csv(), going through the columnar cache when possible.
+
+    optimize shrinks the dtypes with common.dtypes.optimize_dtypes() (True, or a dict of its
+    options), report prints how much memory that saved.
+    """
+    optimize_options = optimize if isinstance(optimize, dict) else {}
+    if not cache:
+        df, _ = _read_source(path, read_options)
+        before = memory_usage(df)
+        if optimize:
+            df = optimize_dtypes(df, **optimize_options)
+        if report:
+            print(memory_report(Path(path).name, before, memory_usage(df)))
+        return df
+
+    entry = cache_entry_dir(path, {"optimize": optimize, **read_options}, cache_dir)
+    manifest = _valid_manifest(path, entry)
+    df = None
+    if manifest is not None:
+        try:
+            df = _load_frame(entry, manifest)
+        except (OSError, ValueError, KeyError):
+            df = None  # replaced or damaged while we read it: parse the CSV instead
+    if df is None:
+        df, date_formats = _read_source(path, read_options, _previous_date_formats(entry))
+        before = memory_usage(df)
+        if optimize:
+            df = optimize_dtypes(df, **optimize_options)
+        try:
+            manifest = save_frame(df, path, entry, memory_before=before, date_formats=date_formats)
+        except TypeError:
+            # A column we can't store as plain arrays (e.g. mixed types): just skip caching.
+            manifest = {"memory_before": before, "memory_after": memory_usage(df)}
+
+    if report:
+        print(memory_report(Path(path).name, manifest["memory_before"], manifest["memory_after"]))
+    return df
+
+
+def _previous_date_formats(entry):
+    """Returns the date formats recorded by the entry, even when it is out of date."""
+    try:
+        return json.loads((entry / MANIFEST).read_text()).get("date_formats") or {}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def _parse_date_column(values, known_format=None):
+    """Returns (datetimes, format): with known_format when all the values fit it, else with the
+    detected format, else inferred by pandas (format None, the values as they are if even
+    pandas can't parse them)."""
+    if known_format:
+        try:
+            return parse_dates(values, known_format), known_format
+        except ValueError:
+            pass
+    try:
+        fmt = detect_date_format(values)
+    except ValueError:
+        try:
+            return pd.to_datetime(values), None
+        except (ValueError, TypeError):
+            return values, None  # pandas.read_csv() leaves the column as text too
+    return parse_dates(values, fmt), fmt
+
+
+def _read_source(path, read_options, known_formats=None):
+    """Parses the CSV. Returns the frame and the format used for each parse_dates column."""
+    date_columns = read_options.get("parse_dates")
+    if not isinstance(date_columns, (list, tuple)) or not all(isinstance(c, str) for c in date_columns):
+        return pd.read_csv(path, **read_options), {}
+    # Named date columns: read them as text, then parse each one with its detected format
+    options = {key: value for key, value in read_options.items() if key != "parse_dates"}
+    df = pd.read_csv(path, **options)
+    date_formats = {}
+    for column in date_columns:
+        df[column], date_formats[column] = _parse_date_column(df[column], (known_formats or {}).get(column))
+    return df, date_formats
+
+
+def _valid_manifest(path, entry):
+    """Returns the manifest of the cache entry if it still matches the source, otherwise None."""
+    manifest_path = entry / MANIFEST
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        return None  # missing or corrupt
+    if not isinstance(manifest, dict) or manifest.get("version") != FORMAT_VERSION:
+        return None
+
+    stat = os.stat(path)
+    if stat.st_mtime_ns == manifest["mtime_ns"] and stat.st_size == manifest["size"]:
+        return manifest
+    if stat.st_size == manifest["size"] and file_sha1(path) == manifest["sha1"]:
+        # Touched but unchanged: remember the new mtime so we skip hashing next time.
+        manifest["mtime_ns"] = stat.st_mtime_ns
+        _write_manifest(entry, manifest)
+        return manifest
+    return None
+
+
+def _write_manifest(entry, manifest):
+    """Replaces the manifest of an entry in one step (write a temporary file, then rename)."""
+    temporary = entry / f"{MANIFEST}.{uuid.uuid4().hex}.tmp"
+    temporary.write_text(json.dumps(manifest, indent=2, default=str))
+    os.replace(temporary, entry / MANIFEST)
+
+
+def save_frame(df, source, entry, memory_before=None, date_formats=None):
+    """Writes every column of df into a temporary folder, then its manifest, and renames the
+    folder to the cache entry. Returns the manifest."""
+    entry = Path(entry)
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    building = entry.parent / f".{entry.name}.{uuid.uuid4().hex}.tmp"
+    building.mkdir()
+    try:
+        manifest = _write_entry(df, source, building, memory_before, date_formats)
+        _swap_entry(building, entry)
+    finally:
+        shutil.rmtree(building, ignore_errors=True)
+    return manifest
+
+
+def _swap_entry(building, entry):
+    """Renames the finished folder to entry, moving the previous entry out of the way first.
+    Readers that memory-mapped its files keep them: they are only unlinked."""
+    old = entry.parent / f".{entry.name}.{uuid.uuid4().hex}.old"
+    try:
+        os.replace(entry, old)
+    except FileNotFoundError:
+        old = None
+    try:
+        os.replace(building, entry)
+    except OSError:
+        pass  # another process put its own entry there first: keep it
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def _write_entry(df, source, entry, memory_before, date_formats):
+    memory_after = memory_usage(df)
+
+    # The index is saved as columns with placeholder names (an unnamed index has None)
+    index_columns = index_names = None
+    if not isinstance(df.index, pd.RangeIndex):
+        index_names = list(df.index.names)
+        index_columns = [f"__index_level_{level}__" for level in range(df.index.nlevels)]
+        df = df.set_axis(df.index.set_names(index_columns), axis=0).reset_index()
+
+    columns = []
+    for position, name in enumerate(df.columns):
+        # By position: with duplicate names df[name] would be a frame
+        columns.append({"name": name, **_save_column(df.iloc[:, position], entry, f"c{position}")})
+
+    stat = os.stat(source)
+    manifest = {
+        "version": FORMAT_VERSION,
+        "source": str(Path(source).resolve()),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha1": file_sha1(source),
+        "rows": len(df),
+        "memory_before": memory_before if memory_before is not None else memory_after,
+        "memory_after": memory_after,
+        "index": index_columns,
+        "index_names": index_names,
+        "date_formats": date_formats or {},
+        "columns": columns,
+    }
+    # The manifest is written last: an entry without one is never read.
+    _write_manifest(entry, manifest)
+    return manifest
+
+
+def _save_column(series, entry, prefix):
+    """Stores one column as .npy files and returns how to rebuild it."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        _save_categories(series.cat.categories, entry, prefix)
+        np.save(entry / f"{prefix}.codes.npy", series.cat.codes.to_numpy())
+        return {"kind": "category", "ordered": bool(dtype.ordered)}
+
+    if pd.api.types.is_string_dtype(dtype) or dtype == object:
+        if pd.api.types.infer_dtype(series, skipna=True) not in ("string", "empty"):
+            raise TypeError(f"Column {series.name!r} mixes strings with other values")
+        codes, uniques = pd.factorize(series)
+        _save_categories(pd.Index(uniques), entry, prefix)
+        np.save(entry / f"{prefix}.codes.npy", codes.astype(_smallest_code_dtype(len(uniques))))
+        return {"kind": "string", "dtype": str(dtype)}
+
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        if not hasattr(dtype, "numpy_dtype"):
+            raise TypeError(f"Column {series.name!r} has unsupported dtype {dtype}")
+        # Nullable Int/Float/boolean columns: data and mask, both plain NumPy arrays.
+        mask = series.isna().to_numpy()
+        data = series.to_numpy(dtype=dtype.numpy_dtype, na_value=0)
+        np.save(entry / f"{prefix}.npy", data)
+        np.save(entry / f"{prefix}.mask.npy", mask)
+        return {"kind": "masked", "dtype": str(dtype)}
+
+    np.save(entry / f"{prefix}.npy", series.to_numpy())
+    return {"kind": "numpy"}
+
+
+def _save_categories(categories, entry, prefix):
+    values = categories.to_numpy()
+    if values.dtype == object:
+        values = values.astype(str)
+    np.save(entry / f"{prefix}.categories.npy", values)
+
+
+def _smallest_code_dtype(n):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _load_frame(entry, manifest):
+    """Builds a DataFrame on top of the memory-mapped column files of a cache entry."""
+    # Columns by position, then their names: two columns may have the same name
+    data = {position: _load_column(entry, f"c{position}", column) for position, column in enumerate(manifest["columns"])}
+    df = pd.DataFrame(data, copy=False)
+    df.columns = [column["name"] for column in manifest["columns"]]
+    if manifest["index"] is not None:
+        df = df.set_index(manifest["index"])
+        df.index.names = manifest["index_names"]
+    return df
+
+
+def _load_column(entry, prefix, column):
+    # mmap_mode="c" maps the file copy-on-write: pages are shared until someone modifies them.
+    # The plain ndarray view keeps the mapping alive without leaking np.memmap into pandas.
+    def load(suffix):
+        return np.load(entry / f"{prefix}{suffix}", mmap_mode="c").view(np.ndarray)
+
+    kind = column["kind"]
+    if kind == "numpy":
+        return load(".npy")
+    if kind == "masked":
+        array_type = pd.api.types.pandas_dtype(column["dtype"]).construct_array_type()
+        return array_type(load(".npy"), load(".mask.npy"))
+
+    categories = np.load(entry / f"{prefix}.categories.npy")
+    if kind == "category":
+        return pd.Categorical.from_codes(load(".codes.npy"), categories, ordered=column["ordered"])
+    # Plain strings have to be materialized; -1 codes are missing values.
+    codes = load(".codes.npy")
+    values = categories.astype(object).take(codes, mode="clip")
+    values[codes < 0] = np.nan
+    return pd.Series(values, dtype=column["dtype"]).array
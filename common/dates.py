@@ -0,0 +1,54 @@
+"""
+Date format detection for the date columns of the CSV datasets.
+
+Without a format, pandas has to guess how every date column is written. detect_date_format()
+looks at the distinct values of a column once and returns the first known format they all
+match, checked with one vectorized regular expression per candidate. parse_dates() then
+converts the whole column with pd.to_datetime(format=...), the fixed-format fast path, instead
+of inferring. An unknown or ambiguous layout raises a ValueError rather than being guessed.
+
+common.csv_cache.read_csv() uses both for its parse_dates columns and records the detected
+formats in the cache manifest, so the parsed dates are cached together with the data.
+"""
+
+import pandas as pd
+
+# (format, regular expression of the values written with it), most specific first
+DATE_FORMATS = [
+    ("%Y-%m-%d %H:%M:%S", r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}"),
+    ("%Y-%m-%dT%H:%M:%S", r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}"),
+    ("%Y-%m-%d", r"\d{4}-\d{2}-\d{2}"),
+    ("%Y-%m", r"\d{4}-\d{2}"),
+    ("%Y/%m/%d", r"\d{4}/\d{2}/\d{2}"),
+    ("%Y%m%d", r"\d{8}"),
+    ("%d/%m/%Y", r"\d{1,2}/\d{1,2}/\d{4}"),
+    ("%m/%d/%Y", r"\d{1,2}/\d{1,2}/\d{4}"),
+]
+
+
+def detect_date_format(values):
+    """Returns the strftime format shared by all the non-null values."""
+    values = pd.Series(pd.unique(pd.Series(values).dropna().astype(str).str.strip()))
+    if values.empty:
+        raise ValueError("Can't detect the date format of an empty column")
+    for fmt, pattern in DATE_FORMATS:
+        if not values.str.fullmatch(pattern).all():
+            continue
+        if pd.to_datetime(values, format=fmt, errors="coerce").notna().all():
+            if fmt in ("%d/%m/%Y", "%m/%d/%Y") and not _day_first_is_known(values):
+                raise ValueError(f"Ambiguous dates, could be %d/%m/%Y or %m/%d/%Y: {values.iloc[0]!r}")
+            return fmt
+    raise ValueError(f"Unknown date format: {values.iloc[0]!r}")
+
+
+def _day_first_is_known(values):
+    """True when some value has a first or second field above 12, so only one order works."""
+    fields = values.str.split("/", expand=True).iloc[:, :2].astype(int)
+    return bool((fields > 12).any().any())
+
+
+def parse_dates(values, fmt=None):
+    """Converts date strings to datetimes with one fixed format (detected when not given)."""
+    if fmt is None:
+        fmt = detect_date_format(values)
+    return pd.to_datetime(values, format=fmt)
@@ -0,0 +1,113 @@
+"""
+Schema inference that shrinks the memory used by the DataFrames of the analysis scripts.
+
+pandas.read_csv() gives every integer column int64, every decimal column float64 and every
+text column a Python string per row. Most of our datasets don't need that:
+  - integers like year, theme_id or num_parts fit in int32. Smaller integers are opt-in
+    (downcast_ints=True): an int8 or int16 column wraps around on arithmetic that leaves its
+    range (a temperature difference, a sum of parts),
+  - floats like the salaries could be float32 without losing any digit. That one is opt-in
+    (downcast_floats=True): sums and means of float32 columns are computed in float32 and
+    would change the printed results,
+  - text columns with few distinct values (Primary Fur Color, Shift, Age...) are much smaller
+    as categoricals: one small integer code per row plus the unique values. Only really low
+    cardinality columns are converted (at most 5% distinct values and MAX_CATEGORIES of them):
+    with more, the categories cost memory themselves and slow down groupby and merge,
+  - "true"/"false" and "t"/"f" columns (the squirrel activities, is_trans) are really booleans.
+    parse_booleans=False leaves them as text, for code that compares them with "t" and "f".
+"""
+
+import numpy as np
+import pandas as pd
+
+BOOLEAN_STRINGS = {"true": True, "false": False, "t": True, "f": False}
+
+# A text column becomes categorical when it has at most this many distinct values per row,
+# and at most MAX_CATEGORIES of them.
+MAX_CATEGORY_RATIO = 0.05
+MAX_CATEGORIES = 1000
+
+
+def memory_usage(df):
+    """Returns the number of bytes used by df, including the Python strings it holds."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def memory_report(name, before, after):
+    """Returns a one-line summary of the memory saved, e.g. 'sets.csv: 2.9 MB -> 0.9 MB (-69%)'."""
+    saved = 1 - after / before if before else 0
+    return f"{name}: {format_bytes(before)} -> {format_bytes(after)} (-{saved:.0%})"
+
+
+def optimize_dtypes(df, max_category_ratio=MAX_CATEGORY_RATIO, downcast_floats=False, downcast_ints=False,
+                    parse_booleans=True):
+    """Returns a copy of df with every column converted to the smallest dtype that holds it."""
+    return pd.DataFrame(
+        {
+            name: optimize_series(series, max_category_ratio, downcast_floats, downcast_ints, parse_booleans)
+            for name, series in df.items()
+        },
+        index=df.index,
+    )
+
+
+def optimize_series(series, max_category_ratio=MAX_CATEGORY_RATIO, downcast_floats=False, downcast_ints=False,
+                    parse_booleans=True):
+    """Returns series converted to the smallest dtype that holds its values, or series itself."""
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return series
+    if pd.api.types.is_integer_dtype(dtype):
+        return pd.to_numeric(series, downcast="integer") if downcast_ints else _downcast_int32(series)
+    if pd.api.types.is_float_dtype(dtype):
+        return _downcast_float(series) if downcast_floats else series
+    if pd.api.types.is_string_dtype(dtype) or dtype == object:
+        if pd.api.types.infer_dtype(series, skipna=True) != "string":
+            return series
+        as_bool = _parse_booleans(series) if parse_booleans else None
+        if as_bool is not None:
+            return as_bool
+        if series.nunique() <= min(max_category_ratio * len(series), MAX_CATEGORIES):
+            return series.astype("category")
+    return series
+
+
+def _downcast_int32(series):
+    """int64 -> int32 when every value fits, never smaller."""
+    if series.dtype.itemsize <= 4 or series.empty:
+        return series
+    info = np.iinfo(np.int32)
+    if info.min <= series.min() and series.max() <= info.max:
+        return series.astype(np.int32 if isinstance(series.dtype, np.dtype) else "Int32")
+    return series
+
+
+def _downcast_float(series):
+    """float64 -> float32 only when every value survives the round trip unchanged."""
+    values = series.to_numpy()
+    as_float32 = values.astype(np.float32)
+    if np.array_equal(as_float32.astype(values.dtype), values, equal_nan=True):
+        return pd.Series(as_float32, index=series.index, name=series.name)
+    return series
+
+
+def _parse_booleans(series):
+    """Returns series as booleans if all its values are true/false or t/f, otherwise None."""
+    uniques = series.dropna().unique()
+    if len(uniques) == 0:
+        return None
+    lowered = {str(value).lower() for value in uniques}
+    if not (lowered <= {"true", "false"} or lowered <= {"t", "f"}):
+        return None
+    mapping = {value: BOOLEAN_STRINGS[str(value).lower()] for value in uniques}
+    if series.isna().any():
+        return series.map(mapping).astype("boolean")
+    return series.map(mapping).astype(bool)
@@ -0,0 +1,413 @@
+"""
+SQL over the datasets of the repo, reading only the columns and rows a query needs.
+
+Every question asked of the datasets is a new pandas snippet that loads the whole CSVs first.
+Database registers them as tables (sets, themes, colors, squirrels, salaries and the trend
+files) of an in-memory SQLite database, which does the filters, joins, group by, order by and
+limit. The tables are loaded when a query runs, and only with what it needs:
+  - projection pushdown: the query is compiled first (EXPLAIN) against empty tables with all
+    the columns, and SQLite's authorizer reports every (table, column) it reads. Only those
+    columns are read from the CSVs (usecols: the other columns are never converted),
+  - predicate pushdown: the top-level AND terms of the WHERE clause that compare a column with a
+    literal (=, !=, <, <=, >, >=, IN, BETWEEN) are applied while the CSV is read in chunks, so
+    the rows they reject never reach SQLite. CASE ... END counts as a nested expression, like
+    parentheses, so the conditions of a WHEN are never taken for top-level terms.
+The loaded tables are TEMP tables with the same names, which SQLite looks up before the empty
+ones, and are dropped after the query. The whole WHERE clause is still run by SQLite: pushdown
+only removes rows it would have removed anyway (a comparison with NULL is never true). When a
+term can't be pushed safely (an OR at the top level, a subquery, a table used twice, a literal
+of another type than the column) it is simply left to SQLite.
+"""
+
+import re
+import sqlite3
+from collections import namedtuple
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+LEGO = "74-LEGO-data-aggregate-merge-with-pandas-matplotlib/data"
+TRENDS = "75-google-trend-data"
+TABLES = {
+    "sets": f"{LEGO}/sets.csv",
+    "themes": f"{LEGO}/themes.csv",
+    "colors": f"{LEGO}/colors.csv",
+    "squirrels": "25-csv-panda/squirrel_data_main.csv",
+    "salaries": "72-college-data-exploration-with-pandas/salaries_by_college_major.csv",
+    "tesla": f"{TRENDS}/TESLA Search Trend vs Price.csv",
+    "bitcoin_search": f"{TRENDS}/Bitcoin Search Trend.csv",
+    "bitcoin_price": f"{TRENDS}/Daily Bitcoin Price.csv",
+    "unemployment": f"{TRENDS}/UE Benefits Search vs UE Rate 2004-19.csv",
+    "unemployment_2020": f"{TRENDS}/UE Benefits Search vs UE Rate 2004-20.csv",
+}
+CHUNK_ROWS = 100_000
+
+Filter = namedtuple("Filter", ["column", "op", "value"])
+Scan = namedtuple("Scan", ["columns", "filters"])
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+      (?P<comment>--[^\n]*|/\*[\s\S]*?(?:\*/|\Z))
+    | (?P<string>'(?:[^']|'')*')
+    | (?P<ident>"(?:[^"]|"")*"|\[[^\]]*\]|`[^`]*`)
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+    | (?P<word>[A-Za-z_][\w$]*)
+    | (?P<op><=|>=|<>|!=|==|\|\||[-+*/%<>=(),.;?])
+    )""", re.VERBOSE)
+_CLAUSE_END = {"GROUP", "ORDER", "LIMIT", "HAVING", "WINDOW"}
+_KEYWORDS = _CLAUSE_END | {"WHERE", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "OUTER", "NATURAL", "ON",
+                           "USING", "UNION", "EXCEPT", "INTERSECT"}
+_FLIPPED = {"=": "=", "==": "=", "!=": "!=", "<>": "!=", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+
+def _tokenize(sql):
+    """Returns [(kind, text)] for the tokens of sql, or None if it has something unexpected.
+    Comments (-- to the end of the line, /* ... */) are left out, like SQLite ignores them."""
+    tokens, position = [], 0
+    sql = sql.rstrip()
+    while position < len(sql):
+        match = _TOKEN.match(sql, position)
+        if not match or match.end() == position:
+            return None
+        if match.lastgroup != "comment":
+            tokens.append((match.lastgroup, match.group(match.lastgroup)))
+        position = match.end()
+    return tokens
+
+
+def _name(token):
+    """The identifier of a word or quoted identifier token, None for anything else."""
+    kind, text = token
+    if kind == "word":
+        return text
+    if kind == "ident":
+        return text[1:-1].replace('""', '"') if text[0] == '"' else text[1:-1]
+    return None
+
+
+def _literal(tokens, i):
+    """Returns (value, next position) if a literal starts at tokens[i], else (None, i)."""
+    sign = 1
+    if i < len(tokens) and tokens[i] == ("op", "-"):
+        sign, i = -1, i + 1
+    if i >= len(tokens):
+        return None, i
+    kind, text = tokens[i]
+    if kind == "number":
+        value = float(text) if any(c in text for c in ".eE") else int(text)
+        return sign * value, i + 1
+    if kind == "string" and sign == 1:
+        return text[1:-1].replace("''", "'"), i + 1
+    return None, i
+
+
+def _column_ref(tokens, i):
+    """Returns ((qualifier or None, column), next position) if a column starts at tokens[i]."""
+    if i >= len(tokens) or tokens[i][0] not in ("word", "ident"):
+        return None, i
+    if tokens[i][0] == "word" and tokens[i][1].upper() in _KEYWORDS | {"NOT", "NULL", "AND", "OR"}:
+        return None, i
+    if i + 2 < len(tokens) and tokens[i + 1] == ("op", ".") and tokens[i + 2][0] in ("word", "ident"):
+        return (_name(tokens[i]), _name(tokens[i + 2])), i + 3
+    return (None, _name(tokens[i])), i + 1
+
+
+def _parse_term(tokens):
+    """Returns [((qualifier, column), op, value)] for a simple comparison term, else []."""
+    ref, i = _column_ref(tokens, 0)
+    if ref is not None and i < len(tokens):
+        kind, text = tokens[i]
+        upper = text.upper() if kind == "word" else None
+        if kind == "op" and text in _FLIPPED:
+            value, end = _literal(tokens, i + 1)
+            if value is not None and end == len(tokens):
+                return [(ref, _FLIPPED[text] if text in ("==", "<>") else text, value)]
+        if upper == "BETWEEN":
+            low, j = _literal(tokens, i + 1)
+            if low is not None and j < len(tokens) and tokens[j][1].upper() == "AND":
+                high, end = _literal(tokens, j + 1)
+                if high is not None and end == len(tokens):
+                    return [(ref, ">=", low), (ref, "<=", high)]
+        if upper == "IN" and i + 1 < len(tokens) and tokens[i + 1] == ("op", "(") and tokens[-1] == ("op", ")"):
+            values, j = [], i + 2
+            while j < len(tokens) - 1:
+                value, j = _literal(tokens, j)
+                if value is None:
+                    return []
+                values.append(value)
+                if tokens[j] == ("op", ","):
+                    j += 1
+                elif j != len(tokens) - 1:
+                    return []
+            return [(ref, "in", values)] if values else []
+        return []
+    # literal op column
+    value, i = _literal(tokens, 0)
+    if value is not None and i < len(tokens) and tokens[i][0] == "op" and tokens[i][1] in _FLIPPED:
+        ref, end = _column_ref(tokens, i + 1)
+        if ref is not None and end == len(tokens):
+            return [(ref, _FLIPPED[tokens[i][1]], value)]
+    return []
+
+
+def _nesting(kind, text):
+    """+1 for a token that opens a nested expression (a parenthesis or CASE), -1 for one that
+    closes it (END), 0 otherwise. The ANDs inside CASE WHEN ... END aren't top-level terms."""
+    if kind == "op":
+        return (text == "(") - (text == ")")
+    if kind == "word":
+        upper = text.upper()
+        return (upper == "CASE") - (upper == "END")
+    return 0
+
+
+def _where_terms(tokens):
+    """Returns the token lists of the top-level AND terms of the WHERE clause ([] if there are none)."""
+    depth, start = 0, None
+    for i, (kind, text) in enumerate(tokens):
+        depth += _nesting(kind, text)
+        if depth == 0 and kind == "word" and text.upper() == "WHERE":
+            start = i + 1
+            break
+    if start is None:
+        return []
+
+    terms, term, depth, in_between = [], [], 0, False
+    for kind, text in tokens[start:]:
+        upper = text.upper() if kind == "word" else None
+        depth += _nesting(kind, text)
+        if depth == 0 and (upper in _CLAUSE_END or text == ";"):
+            break
+        if depth == 0 and upper == "OR":
+            return []  # AND binds tighter than OR: the top-level terms aren't conjuncts
+        if depth == 0 and upper == "BETWEEN":
+            in_between = True
+        if depth == 0 and upper == "AND":
+            if in_between:
+                in_between = False
+            else:
+                terms.append(term)
+                term = []
+                continue
+        term.append((kind, text))
+    terms.append(term)
+    return terms
+
+
+def _table_aliases(tokens, tables):
+    """Returns {alias or name (lowercase): table} for the tables of the FROM and JOIN clauses,
+    and the set of tables used more than once."""
+    aliases, seen, repeated = {}, set(), set()
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        if kind == "word" and text.upper() in ("FROM", "JOIN") or (tokens[i] == ("op", ",") and aliases):
+            name = _name(tokens[i + 1]) if i + 1 < len(tokens) else None
+            table = tables.get(name.lower()) if name else None
+            if table is not None:
+                (repeated if table in seen else seen).add(table)
+                aliases[table.lower()] = table
+                i += 2
+                if i < len(tokens) and tokens[i][1].upper() == "AS":
+                    i += 1
+                alias = _name(tokens[i]) if i < len(tokens) else None
+                if alias and not (tokens[i][0] == "word" and alias.upper() in _KEYWORDS):
+                    aliases[alias.lower()] = table
+                    i += 1
+                continue
+        i += 1
+    return aliases, repeated
+
+
+def pushdown_filters(sql, columns):
+    """Returns {table: [Filter]} for the WHERE terms of sql that can be applied while reading.
+
+    columns is {table: [column names]} of the tables the query reads.
+    """
+    tokens = _tokenize(sql)
+    if not tokens:
+        return {}
+    words = [text.upper() for kind, text in tokens if kind == "word"]
+    if words.count("SELECT") != 1 or {"WITH", "UNION", "EXCEPT", "INTERSECT"} & set(words):
+        return {}
+    tables = {table.lower(): table for table in columns}
+    aliases, repeated = _table_aliases(tokens, tables)
+
+    filters = {}
+    for term in _where_terms(tokens):
+        for (qualifier, column), op, value in _parse_term(term):
+            if qualifier is not None:
+                candidates = [aliases[qualifier.lower()]] if qualifier.lower() in aliases else []
+            else:
+                candidates = [table for table in set(aliases.values())
+                              if column.lower() in (c.lower() for c in columns[table])]
+            if len(candidates) != 1 or candidates[0] in repeated:
+                continue
+            table = candidates[0]
+            name = next((c for c in columns[table] if c.lower() == column.lower()), None)
+            if name is not None:
+                filters.setdefault(table, []).append(Filter(name, op, value))
+    return filters
+
+
+def _comparable(series, value):
+    """True if pandas compares series and value like SQLite would (numbers or strings)."""
+    values = value if isinstance(value, list) else [value]
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series)
+    if all(isinstance(v, str) for v in values):
+        return pd.api.types.is_string_dtype(series) or pd.api.types.is_object_dtype(series)
+    return False
+
+
+def _mask(frame, filters):
+    """Rows of frame that pass every filter that can be checked with pandas."""
+    mask = pd.Series(True, index=frame.index)
+    for column, op, value in filters:
+        series = frame[column]
+        if not _comparable(series, value):
+            continue
+        if op == "in":
+            mask &= series.isin(value)
+        elif op == "!=":
+            mask &= series.notna() & (series != value)
+        else:
+            mask &= {"=": series.eq, "<": series.lt, "<=": series.le, ">": series.gt, ">=": series.ge}[op](value)
+    return mask.fillna(False).astype(bool)
+
+
+def _sql_type(series):
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(series):
+        return "REAL"
+    return "TEXT"
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class Database:
+    """SQL queries over CSV files, loading only the columns and rows each query needs."""
+
+    def __init__(self, tables=None, root=ROOT, chunk_rows=CHUNK_ROWS, pushdown=True):
+        self.connection = sqlite3.connect(":memory:")
+        self.chunk_rows = chunk_rows
+        # False reads every row of the needed columns, to check the filters pushed down
+        self.pushdown = pushdown
+        self.paths = {}
+        self.columns = {}
+        # Rows loaded into SQLite per table by the last query
+        self.loaded = {}
+        for name, path in (TABLES if tables is None else tables).items():
+            self.register(name, Path(root) / path)
+
+    def register(self, name, path):
+        """Adds a CSV file as a table (only its header is read now)."""
+        columns = list(pd.read_csv(path, nrows=0).columns)
+        self.paths[name] = Path(path)
+        self.columns[name] = columns
+        # Empty table with every column, for compiling queries
+        self.connection.execute(f"CREATE TABLE {_quote(name)} ({', '.join(map(_quote, columns))})")
+
+    def plan(self, sql, params=()):
+        """Returns {table: Scan(columns, filters)}: what the query will read from each file."""
+        reads = {}
+
+        def authorizer(action, table, column, database, source):
+            if action == sqlite3.SQLITE_READ and table in self.columns:
+                reads.setdefault(table, set())
+                if column:
+                    reads[table].add(column)
+            return sqlite3.SQLITE_OK
+
+        self.connection.set_authorizer(authorizer)
+        try:
+            self.connection.execute("EXPLAIN " + sql, params)
+        finally:
+            self.connection.set_authorizer(None)
+
+        scans = {}
+        for table, columns in reads.items():
+            # count(*) reads no column, one is still needed for the number of rows
+            columns = [c for c in self.columns[table] if c in columns] or self.columns[table][:1]
+            scans[table] = Scan(columns, [])
+        if self.pushdown:
+            for table, filters in pushdown_filters(sql, {table: self.columns[table] for table in scans}).items():
+                # A column SQLite doesn't read can't be in the WHERE clause it runs: never filter on it
+                filters = [f for f in filters if f.column in scans[table].columns]
+                scans[table] = Scan(scans[table].columns, filters)
+        return scans
+
+    def _load(self, table, scan):
+        """Reads the columns of a scan into a TEMP table, keeping the rows that pass its filters."""
+        created = False
+        rows = 0
+        for chunk in pd.read_csv(self.paths[table], usecols=scan.columns, chunksize=self.chunk_rows):
+            chunk = chunk[scan.columns]
+            if scan.filters:
+                chunk = chunk[_mask(chunk, scan.filters)]
+            if not created:
+                definitions = ", ".join(f"{_quote(c)} {_sql_type(chunk[c])}" for c in scan.columns)
+                self.connection.execute(f"CREATE TEMP TABLE {_quote(table)} ({definitions})")
+                created = True
+            values = chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+            placeholders = ", ".join("?" * len(scan.columns))
+            self.connection.executemany(f"INSERT INTO temp.{_quote(table)} VALUES ({placeholders})", values)
+            rows += len(chunk)
+        return rows
+
+    def query(self, sql, params=()):
+        """Runs a SELECT and returns its result as a DataFrame."""
+        scans = self.plan(sql, params)
+        self.loaded = {}
+        try:
+            for table, scan in scans.items():
+                self.loaded[table] = self._load(table, scan)
+            return pd.read_sql_query(sql, self.connection, params=params)
+        finally:
+            for table in scans:
+                self.connection.execute(f"DROP TABLE IF EXISTS temp.{_quote(table)}")
+
+
+if __name__ == "__main__":
+    db = Database()
+    queries = [
+        "SELECT year, COUNT(*) AS sets, AVG(num_parts) AS parts FROM sets WHERE year >= 2015 GROUP BY year",
+        "SELECT t.name, COUNT(*) AS set_count FROM sets s JOIN themes t ON s.theme_id = t.id "
+        "GROUP BY t.name ORDER BY set_count DESC LIMIT 5",
+        'SELECT "Primary Fur Color", COUNT(*) AS squirrels FROM squirrels '
+        "WHERE Shift = 'AM' AND \"Primary Fur Color\" IN ('Gray', 'Cinnamon') GROUP BY 1",
+        'SELECT "Undergraduate Major", "Starting Median Salary" FROM salaries '
+        'WHERE "Starting Median Salary" BETWEEN 50000 AND 60000 ORDER BY 2 DESC LIMIT 3',
+        "SELECT substr(DATE, 1, 4) AS year, MAX(CLOSE) AS high FROM bitcoin_price "
+        "WHERE DATE >= '2019-01-01' GROUP BY year",
+        "SELECT COUNT(*) AS sets FROM sets "
+        "WHERE CASE WHEN num_parts > 0 AND year = 2000 AND theme_id > 0 THEN 0 ELSE 1 END = 1",
+    ]
+    for sql in queries:
+        print(sql)
+        for table, scan in db.plan(sql).items():
+            filters = ", ".join(f"{f.column} {f.op} {f.value!r}" for f in scan.filters) or "-"
+            print(f"  {table}: columns {scan.columns}, filters: {filters}")
+        result = db.query(sql)
+        print(f"  rows loaded: {db.loaded}")
+        print(result.to_string(index=False), end="\n\n")
+
+    # The filters pushed down must not change any result
+    db_without_pushdown = Database(pushdown=False)
+    checks = queries + [
+        "SELECT COUNT(*) AS n FROM sets WHERE year BETWEEN 1990 AND 1999 AND "
+        "(CASE WHEN num_parts > 100 AND theme_id = 158 THEN 1 END) IS NULL",
+        "SELECT COUNT(*) AS n FROM sets WHERE year = 2000 AND CASE year WHEN 2000 THEN num_parts > 50 END",
+        "SELECT COUNT(*) AS n FROM sets WHERE year = 2000 OR num_parts > 5000",
+        "SELECT COUNT(*) AS n FROM sets s JOIN themes t ON s.theme_id = t.id WHERE t.parent_id = 158 AND s.year < 2010",
+        "SELECT COUNT(year) AS n FROM sets -- was WHERE year = 2000",
+        "SELECT COUNT(*) AS n FROM sets -- WHERE year = 2000",
+        "SELECT COUNT(*) AS n FROM sets /* WHERE year = 2000 */ WHERE num_parts > 100 -- AND year = 2000",
+    ]
+    for sql in checks:
+        pd.testing.assert_frame_equal(db.query(sql), db_without_pushdown.query(sql))
+    print(f"Same results with and without pushdown for {len(checks)} queries")
@@ -0,0 +1,77 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from common.csv_cache import MANIFEST, cache_entry_dir, read_csv
+from common.dtypes import optimize_dtypes
+
+CSV = """day,temp,rain,condition,windy,note,date
+Monday,12,0.5,Sunny,t,,2021-01-04
+Tuesday,14,,Rain,f,umbrella,2021-01-05
+Wednesday,15,1.25,Rain,f,,2021-01-06
+Thursday,-3,0.0,Cloudy,t,"a, quoted note",2021-01-07
+"""
+
+
+@pytest.fixture
+def csv(tmp_path):
+    path = tmp_path / "weather.csv"
+    path.write_text(CSV)
+    return path
+
+
+def test_round_trip(csv):
+    expected = pd.read_csv(csv, parse_dates=["date"])
+    first = read_csv(csv, parse_dates=["date"])
+    entry = cache_entry_dir(csv, {"optimize": False, "parse_dates": ["date"]})
+    assert (entry / MANIFEST).exists()
+    second = read_csv(csv, parse_dates=["date"])
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(second, expected)
+
+
+def test_round_trip_optimized(csv):
+    expected = optimize_dtypes(pd.read_csv(csv))
+    read_csv(csv, optimize=True)
+    cached = read_csv(csv, optimize=True)
+    pd.testing.assert_frame_equal(cached, expected)
+    assert cached["windy"].dtype == bool
+
+
+def test_index_and_duplicate_columns(tmp_path):
+    path = tmp_path / "duplicates.csv"
+    path.write_text("key,a,a\nx,1,2\ny,3,4\n")
+    expected = pd.read_csv(path, index_col="key")
+    read_csv(path, index_col="key")
+    pd.testing.assert_frame_equal(read_csv(path, index_col="key"), expected)
+
+
+def test_changed_source_is_read_again(csv):
+    read_csv(csv)
+    csv.write_text(CSV.replace("Monday,12", "Monday,99"))
+    assert read_csv(csv)["temp"].iloc[0] == 99
+
+
+def test_touched_source_keeps_the_entry(csv):
+    read_csv(csv)
+    entry = cache_entry_dir(csv, {"optimize": False})
+    folder = entry.stat().st_ino  # a rebuilt entry is a new folder renamed into place
+    stat = csv.stat()
+    os.utime(csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    pd.testing.assert_frame_equal(read_csv(csv), pd.read_csv(csv))
+    assert entry.stat().st_ino == folder
+    assert json.loads((entry / MANIFEST).read_text())["mtime_ns"] == stat.st_mtime_ns + 10**9
+
+
+def test_corrupt_manifest_is_a_miss(csv):
+    read_csv(csv)
+    entry = cache_entry_dir(csv, {"optimize": False})
+    (entry / MANIFEST).write_text("{not json")
+    pd.testing.assert_frame_equal(read_csv(csv), pd.read_csv(csv))
+
+
+def test_without_cache(csv):
+    pd.testing.assert_frame_equal(read_csv(csv, cache=False), pd.read_csv(csv))
+    assert not (csv.parent / ".csv_cache").exists()
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from common.query import Database, Filter, pushdown_filters
+
+SETS = {"sets": ["set_num", "name", "year", "theme_id", "num_parts"]}
+
+
+@pytest.fixture(scope="module")
+def databases():
+    return Database(), Database(pushdown=False)
+
+
+def test_pushdown_of_simple_terms():
+    sql = "SELECT name FROM sets WHERE year >= 2015 AND 100 < num_parts AND theme_id IN (158, 209)"
+    assert pushdown_filters(sql, SETS) == {"sets": [
+        Filter("year", ">=", 2015), Filter("num_parts", ">", 100), Filter("theme_id", "in", [158, 209])]}
+
+
+def test_no_pushdown_of_or_and_case():
+    assert pushdown_filters("SELECT name FROM sets WHERE year = 2000 OR num_parts > 10", SETS) == {}
+    sql = "SELECT name FROM sets WHERE CASE WHEN year = 2000 AND num_parts > 0 THEN 0 ELSE 1 END = 1"
+    assert pushdown_filters(sql, SETS) == {}
+
+
+def test_comments_are_not_pushed_down():
+    assert pushdown_filters("SELECT name FROM sets -- WHERE year = 2000", SETS) == {}
+    assert pushdown_filters("SELECT name FROM sets /* WHERE year = 2000 */", SETS) == {}
+    sql = "SELECT name FROM sets WHERE num_parts > 10 /* AND year = 2000 */ -- AND year = 2001"
+    assert pushdown_filters(sql, SETS) == {"sets": [Filter("num_parts", ">", 10)]}
+    sql = "SELECT name FROM sets WHERE name = '-- not a comment' AND year = 2000"
+    assert pushdown_filters(sql, SETS) == {"sets": [Filter("name", "=", "-- not a comment"), Filter("year", "=", 2000)]}
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT year, COUNT(*) AS n FROM sets WHERE year >= 2015 GROUP BY year",
+    "SELECT COUNT(*) AS n FROM sets WHERE year BETWEEN 1990 AND 1999 AND num_parts > 100",
+    "SELECT COUNT(*) AS n FROM sets WHERE year = 2000 AND CASE year WHEN 2000 THEN num_parts > 50 END",
+    "SELECT COUNT(*) AS n FROM sets s JOIN themes t ON s.theme_id = t.id WHERE t.parent_id = 158 AND s.year < 2010",
+    "SELECT COUNT(year) AS n FROM sets -- was WHERE year = 2000",
+    "SELECT COUNT(*) AS n FROM sets -- WHERE year = 2000",
+    "SELECT COUNT(*) AS n FROM sets /* WHERE year = 2000 */ WHERE num_parts > 100",
+])
+def test_same_result_without_pushdown(databases, sql):
+    with_pushdown, without_pushdown = databases
+    pd.testing.assert_frame_equal(with_pushdown.query(sql), without_pushdown.query(sql))
+
+
+def test_filters_only_on_read_columns(databases):
+    with_pushdown, _ = databases
+    scans = with_pushdown.plan("SELECT COUNT(*) AS n FROM sets -- WHERE year = 2000")
+    assert scans["sets"].filters == []
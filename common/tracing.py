@@ -0,0 +1,260 @@
+"""
+Step-level tracing of the analysis scripts: time, CPU, memory and DataFrame sizes per step.
+
+The scripts are long sequences of steps separated by prints, so there is no way to tell which
+step is slow or allocates the most. step() wraps a named step, as a context manager or as a
+decorator, and records for it:
+  - the wall time (perf_counter) and the CPU time (process_time),
+  - the peak of the memory allocated during the step above what was allocated at its start
+    (tracemalloc, the peak counter is reset at every step and passed on to the enclosing one),
+  - the bytes of the DataFrames/Series it produced: the return value of a decorated function, or
+    what is given to record() inside a with block.
+section() is for the linear scripts: it ends the previous section and starts the next one, so a
+script can be split in steps with one call per heading instead of re-indenting it in with blocks.
+Steps can be nested and a step that runs several times (a decorated function) is summed up.
+
+Tracing is off unless the TRACE_STEPS environment variable is set (or enable() is called):
+  - TRACE_STEPS=flame prints a tree of the steps with bars proportional to their time on stderr
+    when the script exits, and writes the folded stacks ("read;clean 1234" in microseconds, the
+    input of flamegraph.pl or speedscope) to TRACE_FILE if it is set,
+  - TRACE_STEPS=json writes the steps as JSON to TRACE_FILE, or stderr,
+  - TRACE_STEPS=0, false, no or off leaves it off, and any other value (1, true...) means flame.
+When it's off, step() and section() return a shared object that does nothing and the decorator
+returns the function itself, so the instrumentation can stay in the scripts.
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+OUTPUTS = ("flame", "json")
+OFF_VALUES = ("", "0", "false", "no", "off")
+BAR_WIDTH = 30
+
+_tracer = None
+
+
+def _frame_bytes(value):
+    """Bytes of the DataFrames, Series and arrays in value (or in a tuple/list/dict of them)."""
+    if isinstance(value, (tuple, list)):
+        return sum(_frame_bytes(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_frame_bytes(item) for item in value.values())
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    return int(getattr(value, "nbytes", 0))
+
+
+class _NullStep:
+    """What step() returns when tracing is off: does nothing, as cheaply as possible."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __call__(self, func):
+        return func
+
+    def record(self, *values):
+        pass
+
+
+_NULL_STEP = _NullStep()
+
+
+class _Step:
+    """One running step of a Tracer."""
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+        self.frame_bytes = 0
+
+    def __enter__(self):
+        self.tracer._push(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer._pop(self)
+        return False
+
+    def __call__(self, func):
+        tracer, name = self.tracer, self.name
+
+        @functools.wraps(func)
+        def traced(*args, **kwargs):
+            with _Step(tracer, name) as step:
+                result = func(*args, **kwargs)
+                step.record(result)
+                return result
+
+        return traced
+
+    def record(self, *values):
+        """Counts the DataFrames/Series in values as produced by this step."""
+        self.frame_bytes += sum(_frame_bytes(value) for value in values)
+
+
+class Tracer:
+    """Totals of the traced steps, by path of nested step names."""
+
+    def __init__(self, output="flame", path=None, memory=True):
+        if output not in OUTPUTS:
+            raise ValueError(f"output must be one of {OUTPUTS}, got {output!r}")
+        self.output = output
+        self.path = path
+        self.memory = memory
+        self.stack = []
+        self.section = None
+        # (name, name, ...) -> [calls, wall, cpu, peak bytes, frame bytes], in the order they started
+        self.totals = {}
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _push(self, step):
+        self.stack.append(step)
+        step.key = tuple(s.name for s in self.stack)
+        self.totals.setdefault(step.key, [0, 0.0, 0.0, 0, 0])
+        step.memory_start = step.peak = 0
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if len(self.stack) > 1:
+                parent = self.stack[-2]
+                parent.peak = max(parent.peak, peak)
+            tracemalloc.reset_peak()
+            step.memory_start = step.peak = current
+        step.cpu = time.process_time()
+        step.wall = time.perf_counter()
+
+    def _pop(self, step):
+        wall = time.perf_counter() - step.wall
+        cpu = time.process_time() - step.cpu
+        if self.stack[-1] is not step:
+            raise RuntimeError(f"Step {step.name!r} ended while {self.stack[-1].name!r} is still running")
+        self.stack.pop()
+        if self.memory:
+            step.peak = max(step.peak, tracemalloc.get_traced_memory()[1])
+            if self.stack:
+                self.stack[-1].peak = max(self.stack[-1].peak, step.peak)
+        totals = self.totals[step.key]
+        totals[0] += 1
+        totals[1] += wall
+        totals[2] += cpu
+        totals[3] = max(totals[3], step.peak - step.memory_start)
+        totals[4] += step.frame_bytes
+
+    def start_section(self, name):
+        """Ends the current section (if any) and starts a new one."""
+        self.end_section()
+        self.section = _Step(self, name).__enter__()
+        return self.section
+
+    def end_section(self):
+        if self.section is not None:
+            section, self.section = self.section, None
+            section.__exit__(None, None, None)
+
+    def records(self):
+        """Returns the totals as a list of dicts, one per step path."""
+        return [
+            {"path": list(key), "calls": calls, "wall_s": wall, "cpu_s": cpu, "peak_bytes": peak,
+             "frame_bytes": frame_bytes}
+            for key, (calls, wall, cpu, peak, frame_bytes) in self.totals.items()
+        ]
+
+    def folded(self):
+        """Returns the folded stacks: one "parent;child microseconds" line per step, self time only."""
+        lines = []
+        for key, totals in self.totals.items():
+            children = sum(other[1] for other_key, other in self.totals.items()
+                           if len(other_key) == len(key) + 1 and other_key[:-1] == key)
+            lines.append(f"{';'.join(key)} {max(0, round((totals[1] - children) * 1e6))}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Returns the tree of the steps with their totals and a bar for their wall time."""
+        total = sum(totals[1] for key, totals in self.totals.items() if len(key) == 1) or 1.0
+        width = max([len(key[-1]) + 2 * (len(key) - 1) for key in self.totals] + [4])
+        lines = [f"{'step':<{width}} {'calls':>6} {'wall ms':>9} {'cpu ms':>9} {'peak MB':>8} "
+                 f"{'frames MB':>9}  time"]
+        for key, (calls, wall, cpu, peak, frame_bytes) in self.totals.items():
+            name = "  " * (len(key) - 1) + key[-1]
+            bar = "#" * round(BAR_WIDTH * wall / total)
+            lines.append(f"{name:<{width}} {calls:>6} {wall * 1000:>9.1f} {cpu * 1000:>9.1f} "
+                         f"{peak / 2**20:>8.2f} {frame_bytes / 2**20:>9.2f}  {bar}")
+        return "\n".join(lines) + "\n"
+
+    def report(self):
+        """Writes the output chosen at creation (called at exit)."""
+        self.end_section()
+        if not self.totals:
+            return
+        if self.output == "json":
+            text = json.dumps(self.records(), indent=2) + "\n"
+            if self.path:
+                with open(self.path, "w") as f:
+                    f.write(text)
+            else:
+                sys.stderr.write(text)
+            return
+        sys.stderr.write(self.summary())
+        if self.path:
+            with open(self.path, "w") as f:
+                f.write(self.folded())
+
+
+def enable(output="flame", path=None, memory=True):
+    """Turns tracing on, the report is written at exit. Returns the Tracer."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(output, path, memory)
+        atexit.register(_tracer.report)
+    return _tracer
+
+
+def disable():
+    """Turns tracing off without a report, returns the Tracer that was on (or None)."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        atexit.unregister(tracer.report)
+        tracer.end_section()
+    return tracer
+
+
+def step(name):
+    """A named step, as a context manager (with step("clean") as s: ...) or a decorator.
+
+    @step also works without a name, the function's name is used then.
+    """
+    if _tracer is None:
+        return name if callable(name) else _NULL_STEP
+    if callable(name):
+        return _Step(_tracer, name.__qualname__)(name)
+    return _Step(_tracer, name)
+
+
+def section(name):
+    """Ends the previous section of the script and starts this one."""
+    if _tracer is None:
+        return _NULL_STEP
+    return _tracer.start_section(name)
+
+
+def _output_from_environment(value):
+    """The output asked for by a TRACE_STEPS value, None when tracing stays off."""
+    value = value.strip().lower()
+    if value in OFF_VALUES:
+        return None
+    return value if value in OUTPUTS else "flame"
+
+
+if _output_from_environment(os.environ.get("TRACE_STEPS", "")):
+    enable(_output_from_environment(os.environ["TRACE_STEPS"]), os.environ.get("TRACE_FILE"))